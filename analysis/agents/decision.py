@@ -10,11 +10,14 @@ A股自选股智能分析系统 - 决策 Agent (大模型)
 3. 解析大模型返回的 JSON 格式结果
 """
 
+import hashlib
 import json
 import logging
+import threading
 import time
 from dataclasses import dataclass
-from typing import Optional, Dict, Any, List
+from datetime import timedelta
+from typing import Optional, Dict, Any, Iterable, List, Tuple, Callable
 
 from tenacity import (
     retry_if_exception_type,
@@ -22,11 +25,48 @@ from tenacity import (
 
 # 导入配置和提示词
 from config import get_config, Config
-from analysis.prompts import DECISION_AGENT_SYSTEM_PROMPT
+from llm_cache import LLMResponseCache, get_llm_cache
+from analysis.prompts import DECISION_AGENT_SYSTEM_PROMPT, DECISION_COMPACT_INPUT_GUIDE
 from analysis.utils import STOCK_NAME_MAP, format_volume, format_amount # 新增导入
+from analysis.streaming import IncrementalJSONParser
 
 logger = logging.getLogger(__name__)
 
+# Gemini 上下文缓存（按 模型+系统提示词 在进程内共享）：{key: (CachedContent, 过期时间戳)}
+_context_caches: Dict[str, Tuple[Any, float]] = {}
+_context_caches_lock = threading.Lock()
+# 距过期不足该秒数时重新创建上下文缓存
+CONTEXT_CACHE_REFRESH_MARGIN = 60
+
+
+def _get_context_cache(model_name: str, system_prompt: str, ttl: int) -> Tuple[Optional[Any], float]:
+    """
+    获取（必要时创建）缓存了系统提示词的 Gemini CachedContent
+    
+    Returns:
+        (CachedContent, 过期时间戳)；创建失败（模型不支持、提示词低于最小缓存长度等）时返回 (None, 0)
+    """
+    key = f"{model_name}:{hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()}"
+    with _context_caches_lock:
+        cached, expires_at = _context_caches.get(key, (None, 0.0))
+        if cached is not None and time.time() < expires_at - CONTEXT_CACHE_REFRESH_MARGIN:
+            return cached, expires_at
+        try:
+            from google.generativeai import caching
+            cached = caching.CachedContent.create(
+                model=model_name,
+                system_instruction=system_prompt,
+                ttl=timedelta(seconds=ttl),
+                display_name='decision-agent-system-prompt',
+            )
+        except Exception as e:
+            logger.warning(f"[Gemini] 创建上下文缓存失败 ({model_name}): {e}，系统提示词随请求发送")
+            return None, 0.0
+        expires_at = time.time() + ttl
+        _context_caches[key] = (cached, expires_at)
+        logger.info(f"[Gemini] 系统提示词上下文缓存已创建 ({model_name}, 有效期 {ttl} 秒)")
+        return cached, expires_at
+
 
 @dataclass
 class AnalysisResult:
@@ -80,6 +120,8 @@ class AnalysisResult:
     data_sources: str = ""  # 数据来源说明
     success: bool = True
     error_message: Optional[str] = None
+    partial: bool = False  # 流式输出中仅含核心字段的预览结果（叙述类字段稍后随完整结果返回）
+    route: str = ""  # 工作流实际经过的节点，如 "search>summarize>decision"、"intel_cache>decision"、"rule"
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
@@ -109,6 +151,7 @@ class AnalysisResult:
             'risk_warning': self.risk_warning,
             'buy_reason': self.buy_reason,
             'search_performed': self.search_performed,
+            'route': self.route,
             'success': self.success,
             'error_message': self.error_message,
         }
@@ -178,6 +221,12 @@ class DecisionAgent:
     
     SYSTEM_PROMPT = DECISION_AGENT_SYSTEM_PROMPT # 从 prompts.py 导入
     
+    # 流式输出时，这些字段全部到达即可给出核心结论预览
+    CORE_FIELDS = ('sentiment_score', 'operation_advice', 'trend_prediction')
+    
+    # 批量决策时为每只股票预留的输出 Token（完整决策仪表盘 JSON 约 1.5~2K Token）
+    BATCH_OUTPUT_TOKENS_PER_STOCK = 2048
+    
     def __init__(self, config: Optional[Config] = None):
         """
         初始化决策 Agent
@@ -191,6 +240,11 @@ class DecisionAgent:
         self._using_fallback = False  # 是否正在使用备选模型
         self._use_openai = False  # 是否使用 OpenAI 兼容 API
         self._openai_client = None  # OpenAI 客户端
+        self._context_cache_expires: Optional[float] = None  # 当前 Gemini 模型所用上下文缓存的过期时间
+        
+        # 紧凑格式：字段说明和固定的分析要求并入系统提示词（各请求相同，可被上下文缓存/前缀缓存复用）
+        if self.config.decision_prompt_format == 'compact':
+            self.SYSTEM_PROMPT = DECISION_AGENT_SYSTEM_PROMPT + DECISION_COMPACT_INPUT_GUIDE
         
         # 检查 Gemini API Key 是否有效（过滤占位符）
         gemini_key_valid = self._api_key and not self._api_key.startswith('your_') and len(self._api_key) > 10
@@ -283,20 +337,14 @@ class DecisionAgent:
             
             # 尝试初始化主模型
             try:
-                self._model = genai.GenerativeModel(
-                    model_name=model_name,
-                    system_instruction=self.SYSTEM_PROMPT,
-                )
+                self._model = self._build_gemini_model(model_name)
                 self._current_model_name = model_name
                 self._using_fallback = False
                 logger.info(f"Gemini 模型初始化成功 (模型: {model_name})")
             except Exception as model_error:
                 # 尝试备选模型
                 logger.warning(f"主模型 {model_name} 初始化失败: {model_error}，尝试备选模型 {fallback_model}")
-                self._model = genai.GenerativeModel(
-                    model_name=fallback_model,
-                    system_instruction=self.SYSTEM_PROMPT,
-                )
+                self._model = self._build_gemini_model(fallback_model)
                 self._current_model_name = fallback_model
                 self._using_fallback = True
                 logger.info(f"Gemini 备选模型初始化成功 (模型: {fallback_model})")
@@ -313,15 +361,11 @@ class DecisionAgent:
             是否成功切换
         """
         try:
-            import google.generativeai as genai
             config = self.config
             fallback_model = config.gemini_model_fallback
             
             logger.warning(f"[LLM] 切换到备选模型: {fallback_model}")
-            self._model = genai.GenerativeModel(
-                model_name=fallback_model,
-                system_instruction=self.SYSTEM_PROMPT,
-            )
+            self._model = self._build_gemini_model(fallback_model)
             self._current_model_name = fallback_model
             self._using_fallback = True
             logger.info(f"[LLM] 备选模型 {fallback_model} 初始化成功")
@@ -330,17 +374,43 @@ class DecisionAgent:
             logger.error(f"[LLM] 切换备选模型失败: {e}")
             return False
     
+    def _build_gemini_model(self, model_name: str):
+        """
+        创建 Gemini 模型
+        
+        启用 GEMINI_CONTEXT_CACHE 时系统提示词从上下文缓存读取（按缓存 Token 计费），
+        缓存不可用时回退为普通模型（系统提示词随每次请求发送）。
+        """
+        import google.generativeai as genai
+        
+        self._context_cache_expires = None
+        if self.config.gemini_context_cache:
+            cached, expires_at = _get_context_cache(model_name, self.SYSTEM_PROMPT, self.config.gemini_context_cache_ttl)
+            if cached is not None:
+                self._context_cache_expires = expires_at
+                return genai.GenerativeModel.from_cached_content(cached_content=cached)
+        return genai.GenerativeModel(
+            model_name=model_name,
+            system_instruction=self.SYSTEM_PROMPT,
+        )
+    
     def is_available(self) -> bool:
         """检查分析器是否可用"""
         return self._model is not None or self._openai_client is not None
     
-    def _call_openai_api(self, prompt: str, generation_config: dict) -> str:
+    def _call_openai_api(
+        self,
+        prompt: str,
+        generation_config: dict,
+        stream_parser: Optional[IncrementalJSONParser] = None
+    ) -> str:
         """
         调用 OpenAI 兼容 API
         
         Args:
             prompt: 提示词
             generation_config: 生成配置
+            stream_parser: 提供时使用流式输出，边接收边增量解析
             
         Returns:
             响应文本
@@ -365,8 +435,15 @@ class DecisionAgent:
                     ],
                     temperature=generation_config.get('temperature', 0.7),
                     max_tokens=generation_config.get('max_output_tokens', 8192),
+                    stream=stream_parser is not None,
                 )
                 
+                if stream_parser is not None:
+                    return self._consume_stream(
+                        (chunk.choices[0].delta.content for chunk in response if chunk.choices),
+                        stream_parser
+                    )
+                
                 if response and response.choices and response.choices[0].message.content:
                     return response.choices[0].message.content
                 else:
@@ -386,15 +463,21 @@ class DecisionAgent:
         
         raise Exception("OpenAI API 调用失败，已达最大重试次数")
     
-    def _call_api_with_retry(self, prompt: str, generation_config: dict) -> str:
+    def _call_api_with_retry(
+        self,
+        prompt: str,
+        generation_config: dict,
+        stream_parser: Optional[IncrementalJSONParser] = None
+    ) -> str:
         """
         调用 AI API，带有重试和模型切换机制
         
         优先级：Gemini > Gemini 备选模型 > OpenAI 兼容 API
+        提供 stream_parser 时使用流式输出，每次重试前重置解析状态
         """
         # 如果已经在使用 OpenAI 模式，直接调用 OpenAI
         if self._use_openai:
-            return self._call_openai_api(prompt, generation_config)
+            return self._call_openai_api(prompt, generation_config, stream_parser)
         
         config = self.config
         max_retries = config.gemini_max_retries
@@ -412,12 +495,20 @@ class DecisionAgent:
                     logger.info(f"[Gemini] 第 {attempt + 1} 次重试，等待 {delay:.1f} 秒...")
                     time.sleep(delay)
                 
+                # 上下文缓存即将过期时重建模型
+                if self._context_cache_expires and time.time() >= self._context_cache_expires - CONTEXT_CACHE_REFRESH_MARGIN:
+                    self._model = self._build_gemini_model(self._current_model_name)
+                
                 response = self._model.generate_content(
                     prompt,
                     generation_config=generation_config,
-                    request_options={"timeout": 120}
+                    request_options={"timeout": 120},
+                    stream=stream_parser is not None,
                 )
                 
+                if stream_parser is not None:
+                    return self._consume_stream(self._gemini_stream_text(response), stream_parser)
+                
                 if response and response.text:
                     return response.text
                 else:
@@ -448,7 +539,7 @@ class DecisionAgent:
         if self._openai_client:
             logger.warning("[Gemini] 所有重试失败，切换到 OpenAI 兼容 API")
             try:
-                return self._call_openai_api(prompt, generation_config)
+                return self._call_openai_api(prompt, generation_config, stream_parser)
             except Exception as openai_error:
                 logger.error(f"[OpenAI] 备选 API 也失败: {openai_error}")
                 raise last_error or openai_error
@@ -458,7 +549,7 @@ class DecisionAgent:
             self._init_openai_fallback()
             if self._openai_client:
                 try:
-                    return self._call_api_with_retry(prompt, generation_config) # 注意这里是 _call_api_with_retry，因为它已经处理了 OpenAI 的调用
+                    return self._call_api_with_retry(prompt, generation_config, stream_parser) # 注意这里是 _call_api_with_retry，因为它已经处理了 OpenAI 的调用
                 except Exception as openai_error:
                     logger.error(f"[OpenAI] 备选 API 也失败: {openai_error}")
                     raise last_error or openai_error
@@ -466,31 +557,68 @@ class DecisionAgent:
         # 所有方式都失败
         raise last_error or Exception("所有 AI API 调用失败，已达最大重试次数")
     
-    def analyze(self, context: Dict[str, Any], news_summary: Optional[str] = None) -> AnalysisResult:
+    @staticmethod
+    def _gemini_stream_text(response) -> Iterable[Optional[str]]:
+        """逐块取出 Gemini 流式响应的文本（不含文本的块，如结束/安全信息块，跳过）"""
+        for chunk in response:
+            try:
+                yield chunk.text
+            except ValueError:
+                continue
+    
+    @staticmethod
+    def _consume_stream(pieces: Iterable[Optional[str]], stream_parser: IncrementalJSONParser) -> str:
+        """读取流式文本片段，边接收边增量解析，返回完整响应文本"""
+        stream_parser.reset()
+        parts = []
+        for piece in pieces:
+            if piece:
+                parts.append(piece)
+                stream_parser.feed(piece)
+        if not parts:
+            raise ValueError("流式响应为空")
+        return "".join(parts)
+    
+    def analyze(
+        self,
+        context: Dict[str, Any],
+        news_summary: Optional[str] = None,
+        use_cache: bool = True,
+        on_core_ready: Optional[Callable[[AnalysisResult], None]] = None
+    ) -> AnalysisResult:
         """
         分析单只股票
         
         流程：
         1. 格式化输入数据（技术面 + 预摘要新闻）
-        2. 调用大模型 API（带重试和模型切换）
+        2. 查询 LLM 响应缓存，未命中时调用大模型 API（带重试和模型切换）
         3. 解析 JSON 响应
         4. 返回结构化结果
         
         Args:
             context: 从 storage.get_analysis_context() 获取的上下文数据
             news_summary: 预摘要后的新闻内容（可选）
+            use_cache: 是否使用 LLM 响应缓存（False 时强制重新调用 API，结果仍会写入缓存）
+            on_core_ready: 核心结论预览回调，仅在启用 LLM_STREAMING 且实际调用 API 时生效：
+                sentiment_score/operation_advice/trend_prediction 流式到达后以预览结果（partial=True）
+                调用，至多一次。预览未经完整响应校验，请求失败重试时可能与最终结果不一致，
+                只能用于提示/推送；交易等不可撤销的操作必须基于返回的完整结果
             
         Returns:
             AnalysisResult 对象
         """
         code = context.get('code', 'Unknown')
         config = self.config
+        core_result: List[AnalysisResult] = []
         
-        # 请求前增加延时（防止连续请求触发限流）
-        request_delay = config.gemini_request_delay
-        if request_delay > 0:
-            logger.debug(f"[LLM] 请求前等待 {request_delay:.1f} 秒...")
-            time.sleep(request_delay)
+        def emit_core(result: AnalysisResult) -> None:
+            if on_core_ready is None or core_result:
+                return
+            core_result.append(result)
+            try:
+                on_core_ready(result)
+            except Exception as e:
+                logger.error(f"[{code}] 核心结论回调失败: {e}")
         
         # 优先从上下文获取股票名称
         name = context.get('stock_name', STOCK_NAME_MAP.get(code, f'股票{code}'))
@@ -515,19 +643,11 @@ class DecisionAgent:
             prompt = self._format_prompt(context, name, news_summary)
             
             # 获取模型名称
-            model_name = getattr(self, '_current_model_name', None)
-            if not model_name:
-                # 尝试从模型对象获取名称
-                if self._model and hasattr(self._model, 'model_name'):
-                    model_name = self._model.model_name
-                elif self._openai_client and hasattr(self._openai_client, 'model'): # OpenAI client usually doesn't have model_name directly
-                    model_name = self.config.openai_model # Fallback to config if client doesn't expose
-                else:
-                    model_name = 'unknown'
+            model_name = self._resolve_model_name()
             
             logger.info(f"========== 决策 Agent 分析 {name}({code}) ==========")
             logger.info(f"[LLM配置] 模型: {model_name}")
-            logger.info(f"[LLM配置] Prompt 长度: {len(prompt)} 字符")
+            logger.info(f"[LLM配置] Prompt 长度: {len(prompt)} 字符 (格式: {config.decision_prompt_format})")
             logger.info(f"[LLM配置] 是否包含新闻摘要: {'是' if news_summary else '否'}")
             
             # 记录完整 prompt 到日志（INFO级别记录摘要，DEBUG记录完整）
@@ -541,15 +661,43 @@ class DecisionAgent:
                 "max_output_tokens": 8192,
             }
             
-            logger.info(f"[LLM调用] 开始调用决策 Agent API (temperature={generation_config['temperature']}, max_tokens={generation_config['max_output_tokens']})...")
+            # 查询响应缓存（命中时不等待、不调用 API）
+            cache = get_llm_cache()
+            cache_key = LLMResponseCache.make_key(model_name, self.SYSTEM_PROMPT, generation_config, prompt) if cache else None
+            response_text = cache.get(cache_key) if cache and use_cache else None
             
-            # 使用带重试的 API 调用
-            start_time = time.time()
-            response_text = self._call_api_with_retry(prompt, generation_config)
-            elapsed = time.time() - start_time
-            
-            # 记录响应信息
-            logger.info(f"[LLM返回] 决策 Agent API 响应成功, 耗时 {elapsed:.2f}s, 响应长度 {len(response_text)} 字符")
+            if response_text is not None:
+                logger.info(f"[LLM缓存] 决策 Agent 命中缓存, 响应长度 {len(response_text)} 字符")
+            else:
+                # 请求前增加延时（防止连续请求触发限流）
+                request_delay = config.gemini_request_delay
+                if request_delay > 0:
+                    logger.debug(f"[LLM] 请求前等待 {request_delay:.1f} 秒...")
+                    time.sleep(request_delay)
+                
+                # 流式输出：核心字段到达后立即回调预览结果
+                stream_parser = None
+                if on_core_ready is not None and config.llm_streaming:
+                    def on_field(key: str, value: Any) -> None:
+                        if key in self.CORE_FIELDS and all(f in stream_parser.fields for f in self.CORE_FIELDS):
+                            preview = self._result_from_dict(dict(stream_parser.fields), code, name)
+                            preview.partial = True
+                            logger.info(f"[LLM流式] {name}({code}) 核心结论已到达 ({time.time() - start_time:.2f}s): "
+                                        f"{preview.operation_advice}, 评分 {preview.sentiment_score}")
+                            emit_core(preview)
+                    stream_parser = IncrementalJSONParser(on_field)
+                
+                logger.info(f"[LLM调用] 开始调用决策 Agent API (temperature={generation_config['temperature']}, max_tokens={generation_config['max_output_tokens']}{', 流式' if stream_parser else ''})...")
+                
+                # 使用带重试的 API 调用
+                start_time = time.time()
+                response_text = self._call_api_with_retry(prompt, generation_config, stream_parser)
+                elapsed = time.time() - start_time
+                
+                # 记录响应信息
+                logger.info(f"[LLM返回] 决策 Agent API 响应成功, 耗时 {elapsed:.2f}s, 响应长度 {len(response_text)} 字符")
+                if cache:
+                    cache.put(cache_key, response_text, model=model_name)
             
             # 记录响应预览（INFO级别）和完整响应（DEBUG级别）
             response_preview = response_text[:300] + "..." if len(response_text) > 300 else response_text
@@ -564,6 +712,10 @@ class DecisionAgent:
             
             logger.info(f"[LLM解析] {name}({code}) 分析完成: {result.trend_prediction}, 评分 {result.sentiment_score}")
             
+            if core_result and any(getattr(core_result[0], f) != getattr(result, f) for f in self.CORE_FIELDS):
+                # 流式请求中途失败重试时，预览结果可能来自前一次尝试
+                logger.warning(f"[LLM流式] {name}({code}) 完整结果的核心结论与预览不一致: "
+                               f"预览 {core_result[0].operation_advice}, 完整 {result.operation_advice}")
             return result
             
         except Exception as e:
@@ -581,12 +733,291 @@ class DecisionAgent:
                 error_message=str(e),
             )
     
+    def _resolve_model_name(self) -> str:
+        """当前使用的模型名称（用于日志和缓存键）"""
+        model_name = getattr(self, '_current_model_name', None)
+        if not model_name:
+            # 尝试从模型对象获取名称
+            if self._model and hasattr(self._model, 'model_name'):
+                model_name = self._model.model_name
+            elif self._openai_client and hasattr(self._openai_client, 'model'): # OpenAI client usually doesn't have model_name directly
+                model_name = self.config.openai_model # Fallback to config if client doesn't expose
+            else:
+                model_name = 'unknown'
+        return model_name
+    
+    def analyze_batch(
+        self,
+        items: List[Tuple[Dict[str, Any], Optional[str]]],
+        use_cache: bool = True
+    ) -> List[AnalysisResult]:
+        """
+        批量分析多只股票（一次请求返回 JSON 数组）
+        
+        流程：
+        1. 按 DECISION_BATCH_SIZE、Prompt 长度上限和输出 Token 上限把股票打包成若干批
+        2. 每批用紧凑格式拼接各股数据，一次调用大模型，要求按输入顺序返回 JSON 数组
+        3. 按 code 字段把数组元素还原为各自的 AnalysisResult
+        4. 请求失败或响应被截断（JSON 不完整）时把该批一分为二重试，单只股票时回退到 analyze()
+        
+        Args:
+            items: [(context, news_summary), ...]，context 同 analyze()
+            use_cache: 是否使用 LLM 响应缓存
+            
+        Returns:
+            与 items 顺序一致的 AnalysisResult 列表
+        """
+        results: List[Optional[AnalysisResult]] = [None] * len(items)
+        indexed = list(enumerate(items))
+        
+        if not self.is_available() or len(items) <= 1:
+            for i, (context, news_summary) in indexed:
+                results[i] = self.analyze(context, news_summary, use_cache=use_cache)
+            return results
+        
+        for chunk in self._pack_batches(indexed):
+            for i, result in self._analyze_chunk(chunk, use_cache).items():
+                results[i] = result
+        return results
+    
+    def _pack_batches(
+        self,
+        indexed: List[Tuple[int, Tuple[Dict[str, Any], Optional[str]]]]
+    ) -> List[List[Tuple[int, Tuple[Dict[str, Any], Optional[str]]]]]:
+        """按数量、Prompt 长度和输出 Token 上限依次装批"""
+        config = self.config
+        max_stocks = max(1, min(
+            config.decision_batch_size,
+            config.decision_batch_max_output_tokens // self.BATCH_OUTPUT_TOKENS_PER_STOCK
+        ))
+        batches, current, current_chars = [], [], 0
+        for item in indexed:
+            context, news_summary = item[1]
+            chars = len(self._format_compact_context(context, self._stock_name(context), news_summary))
+            if current and (len(current) >= max_stocks or current_chars + chars > config.decision_batch_max_prompt_chars):
+                batches.append(current)
+                current, current_chars = [], 0
+            current.append(item)
+            current_chars += chars
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _analyze_chunk(
+        self,
+        chunk: List[Tuple[int, Tuple[Dict[str, Any], Optional[str]]]],
+        use_cache: bool
+    ) -> Dict[int, AnalysisResult]:
+        """分析一批股票，失败或缺失的股票拆小后重试"""
+        if len(chunk) == 1:
+            i, (context, news_summary) = chunk[0]
+            return {i: self.analyze(context, news_summary, use_cache=use_cache)}
+        
+        codes = [context.get('code', 'Unknown') for _, (context, _) in chunk]
+        try:
+            parsed = self._call_batch(chunk, use_cache)
+        except Exception as e:
+            half = len(chunk) // 2
+            logger.warning(f"[LLM批量] {len(chunk)} 只股票批量决策失败（{str(e)[:100]}），拆分为 {half}+{len(chunk) - half} 重试")
+            results = self._analyze_chunk(chunk[:half], use_cache)
+            results.update(self._analyze_chunk(chunk[half:], use_cache))
+            return results
+        
+        results = {}
+        missing = []
+        for (i, item), code in zip(chunk, codes):
+            if code in parsed:
+                results[i] = parsed[code]
+            else:
+                missing.append((i, item))
+        if missing:
+            logger.warning(f"[LLM批量] 响应缺少 {len(missing)} 只股票，单独重试: {', '.join(context.get('code', '') for _, (context, _) in missing)}")
+            if len(missing) < len(chunk):
+                results.update(self._analyze_chunk(missing, use_cache))
+            else:
+                # 整批都没有解析出结果：拆半重试，避免重复同一请求
+                half = len(missing) // 2
+                results.update(self._analyze_chunk(missing[:half], use_cache))
+                results.update(self._analyze_chunk(missing[half:], use_cache))
+        return results
+    
+    def _call_batch(
+        self,
+        chunk: List[Tuple[int, Tuple[Dict[str, Any], Optional[str]]]],
+        use_cache: bool
+    ) -> Dict[str, AnalysisResult]:
+        """
+        对一批股票发起一次请求并解析
+        
+        Returns:
+            {股票代码: AnalysisResult}（只含响应中出现的股票）
+        
+        Raises:
+            API 调用失败或响应不是完整的 JSON 数组（如输出被截断）时抛出异常
+        """
+        stocks = [(context, self._stock_name(context), news_summary) for _, (context, news_summary) in chunk]
+        prompt = self._format_batch_prompt(stocks)
+        model_name = self._resolve_model_name()
+        generation_config = {
+            "temperature": 0.7,
+            "max_output_tokens": self.config.decision_batch_max_output_tokens,
+        }
+        
+        cache = get_llm_cache()
+        cache_key = LLMResponseCache.make_key(model_name, self.SYSTEM_PROMPT, generation_config, prompt) if cache else None
+        response_text = cache.get(cache_key) if cache and use_cache else None
+        
+        if response_text is not None:
+            logger.info(f"[LLM缓存] 批量决策命中缓存 ({len(stocks)} 只股票)")
+        else:
+            request_delay = self.config.gemini_request_delay
+            if request_delay > 0:
+                logger.debug(f"[LLM] 请求前等待 {request_delay:.1f} 秒...")
+                time.sleep(request_delay)
+            
+            logger.info(f"[LLM批量] 模型 {model_name}, {len(stocks)} 只股票, Prompt 长度 {len(prompt)} 字符")
+            logger.debug(f"=== 批量决策 Prompt ({len(prompt)}字符) ===\n{prompt}\n=== End Prompt ===")
+            start_time = time.time()
+            response_text = self._call_api_with_retry(prompt, generation_config)
+            logger.info(f"[LLM批量] 响应成功, 耗时 {time.time() - start_time:.2f}s, 响应长度 {len(response_text)} 字符")
+        
+        parsed = self._parse_batch_response(response_text, stocks)
+        if cache and parsed:
+            cache.put(cache_key, response_text, model=model_name)
+        return parsed
+    
+    @staticmethod
+    def _stock_name(context: Dict[str, Any]) -> str:
+        code = context.get('code', 'Unknown')
+        return context.get('stock_name', STOCK_NAME_MAP.get(code, f'股票{code}'))
+    
+    def _format_compact_context(self, context: Dict[str, Any], name: str, news_summary: Optional[str] = None) -> str:
+        """
+        紧凑格式的单股数据（键=值，每类指标一行）
+        
+        内容与 _format_prompt 相同，去掉表格和说明文字，用于批量请求
+        """
+        code = context.get('code', 'Unknown')
+        today = context.get('today', {})
+        lines = [
+            f"### {code} {name} 日期={context.get('date', '未知')}",
+            f"行情: 收={today.get('close', 'N/A')} 开={today.get('open', 'N/A')} 高={today.get('high', 'N/A')} "
+            f"低={today.get('low', 'N/A')} 涨跌={today.get('pct_chg', 'N/A')}% "
+            f"量={format_volume(today.get('volume'))} 额={format_amount(today.get('amount'))}",
+            f"均线: MA5={today.get('ma5', 'N/A')} MA10={today.get('ma10', 'N/A')} MA20={today.get('ma20', 'N/A')} "
+            f"形态={context.get('ma_status', '未知')}",
+        ]
+        if 'realtime' in context:
+            rt = context['realtime']
+            lines.append(
+                f"实时: 价={rt.get('price', 'N/A')} 盘中MA5/10/20={rt.get('ma5', 'N/A')}/{rt.get('ma10', 'N/A')}/{rt.get('ma20', 'N/A')} "
+                f"量比={rt.get('volume_ratio', 'N/A')}({rt.get('volume_ratio_desc', '')}) 换手={rt.get('turnover_rate', 'N/A')}% "
+                f"PE={rt.get('pe_ratio', 'N/A')} PB={rt.get('pb_ratio', 'N/A')} "
+                f"总市值={format_amount(rt.get('total_mv'))} 流通市值={format_amount(rt.get('circ_mv'))} "
+                f"60日={rt.get('change_60d', 'N/A')}%"
+            )
+        if 'chip' in context:
+            chip = context['chip']
+            lines.append(
+                f"筹码: 获利={chip.get('profit_ratio', 0):.1%} 均价={chip.get('avg_cost', 'N/A')} "
+                f"集中度90={chip.get('concentration_90', 0):.2%} 集中度70={chip.get('concentration_70', 0):.2%} "
+                f"状态={chip.get('chip_status', '未知')}"
+            )
+        if 'trend_analysis' in context:
+            trend = context['trend_analysis']
+            lines.append(
+                f"趋势: 状态={trend.get('trend_status', '未知')} 排列={trend.get('ma_alignment', '未知')} "
+                f"强度={trend.get('trend_strength', 0)} 乖离MA5={trend.get('bias_ma5', 0):+.2f}% "
+                f"乖离MA10={trend.get('bias_ma10', 0):+.2f}% 量能={trend.get('volume_status', '未知')}({trend.get('volume_trend', '')}) "
+                f"信号={trend.get('buy_signal', '未知')} 评分={trend.get('signal_score', 0)}"
+            )
+            lines.append(f"买入理由: {'; '.join(trend.get('signal_reasons') or ['无'])}")
+            lines.append(f"风险因素: {'; '.join(trend.get('risk_factors') or ['无'])}")
+        lines.append(f"舆情: {news_summary.strip() if news_summary else '无'}")
+        return "\n".join(lines)
+    
+    def _format_compact_prompt(self, context: Dict[str, Any], name: str, news_summary: Optional[str] = None) -> str:
+        """
+        紧凑格式的单股分析提示词
+        
+        只包含 "键=值" 数据，字段说明和分析要求已并入系统提示词（DECISION_COMPACT_INPUT_GUIDE）
+        """
+        code = context.get('code', 'Unknown')
+        stock_name = context.get('stock_name', name)
+        return (
+            f"{self._format_compact_context(context, stock_name, news_summary)}\n\n"
+            f"请为 {stock_name}({code}) 输出完整的 JSON 格式决策仪表盘。"
+        )
+    
+    def _format_batch_prompt(self, stocks: List[Tuple[Dict[str, Any], str, Optional[str]]]) -> str:
+        """批量决策提示词：各股紧凑数据 + JSON 数组输出要求"""
+        blocks = "\n\n".join(
+            self._format_compact_context(context, name, news_summary)
+            for context, name, news_summary in stocks
+        )
+        return f"""# 批量决策仪表盘分析请求（{len(stocks)} 只股票）
+
+以下各股数据为 "键=值" 紧凑格式，指标含义与单股决策仪表盘请求相同。
+
+{blocks}
+
+---
+
+## ✅ 分析任务
+
+请分别为以上 {len(stocks)} 只股票生成【决策仪表盘】，只输出一个 JSON 数组：
+- 数组元素按输入顺序排列，每个元素是一只股票的完整决策仪表盘 JSON，字段与单股分析相同
+- 每个元素必须包含 "code" 字段，值为对应的股票代码
+- 逐只独立判断：多头排列、乖离率（超过5%必须标注"严禁追高"）、量能配合、筹码结构、消息面利空
+- 不要输出数组以外的任何文字"""
+    
+    def _parse_batch_response(
+        self,
+        response_text: str,
+        stocks: List[Tuple[Dict[str, Any], str, Optional[str]]]
+    ) -> Dict[str, AnalysisResult]:
+        """
+        解析批量响应（JSON 数组）
+        
+        Raises:
+            ValueError / json.JSONDecodeError: 响应中没有完整的 JSON 数组
+        """
+        cleaned_text = response_text.replace('```json', '').replace('```', '')
+        json_start = cleaned_text.find('[')
+        json_end = cleaned_text.rfind(']') + 1
+        if json_start < 0 or json_end <= json_start:
+            raise ValueError("批量响应中没有 JSON 数组")
+        data = json.loads(self._fix_json_string(cleaned_text[json_start:json_end]))
+        if not isinstance(data, list):
+            raise ValueError("批量响应不是 JSON 数组")
+        
+        by_code = {context.get('code', 'Unknown'): (name, news_summary) for context, name, news_summary in stocks}
+        parsed = {}
+        for element in data:
+            if not isinstance(element, dict):
+                continue
+            code = str(element.get('code', ''))
+            if code not in by_code or code in parsed:
+                continue
+            name, news_summary = by_code[code]
+            result = self._result_from_dict(element, code, name)
+            result.raw_response = json.dumps(element, ensure_ascii=False)
+            result.search_performed = bool(news_summary)
+            result.data_sources = "技术面数据" + (", 新闻摘要" if news_summary else "")
+            parsed[code] = result
+        logger.info(f"[LLM批量] 解析完成: {len(parsed)}/{len(stocks)} 只股票")
+        return parsed
+    
     def _format_prompt(self, context: Dict[str, Any], name: str, news_summary: Optional[str] = None) -> str:
         """
         格式化分析提示词（决策仪表盘版）
         
         包含：技术指标、实时行情（量比/换手率）、筹码分布、趋势分析、预摘要新闻
+        DECISION_PROMPT_FORMAT=compact 时改用紧凑格式（见 _format_compact_prompt）
         """
+        if self.config.decision_prompt_format == 'compact':
+            return self._format_compact_prompt(context, name, news_summary)
+        
         code = context.get('code', 'Unknown')
         stock_name = context.get('stock_name', name) # 使用 context 中已增强的股票名称
             
@@ -634,6 +1065,7 @@ class DecisionAgent:
 | 指标 | 数值 | 解读 |
 |------|------|------|
 | 当前价格 | {rt.get('price', 'N/A')} 元 | |
+| 盘中MA5/MA10/MA20 | {rt.get('ma5', 'N/A')} / {rt.get('ma10', 'N/A')} / {rt.get('ma20', 'N/A')} | 以现价计入当日K线 |
 | **量比** | **{rt.get('volume_ratio', 'N/A')}** | {rt.get('volume_ratio_desc', '')} |
 | **换手率** | **{rt.get('turnover_rate', 'N/A')}%** | |
 | 市盈率(动态) | {rt.get('pe_ratio', 'N/A')} | |
@@ -761,48 +1193,7 @@ class DecisionAgent:
                 json_str = self._fix_json_string(json_str)
                 
                 data = json.loads(json_str)
-                
-                # 提取 dashboard 数据
-                dashboard = data.get('dashboard', None)
-                
-                # 解析所有字段，使用默认值防止缺失
-                return AnalysisResult(
-                    code=code,
-                    name=name,
-                    # 核心指标
-                    sentiment_score=int(data.get('sentiment_score', 50)),
-                    trend_prediction=data.get('trend_prediction', '震荡'),
-                    operation_advice=data.get('operation_advice', '持有'),
-                    confidence_level=data.get('confidence_level', '中'),
-                    # 决策仪表盘
-                    dashboard=dashboard,
-                    # 走势分析
-                    trend_analysis=data.get('trend_analysis', ''),
-                    short_term_outlook=data.get('short_term_outlook', ''),
-                    medium_term_outlook=data.get('medium_term_outlook', ''),
-                    # 技术面
-                    technical_analysis=data.get('technical_analysis', ''),
-                    ma_analysis=data.get('ma_analysis', ''),
-                    volume_analysis=data.get('volume_analysis', ''),
-                    pattern_analysis=data.get('pattern_analysis', ''),
-                    # 基本面
-                    fundamental_analysis=data.get('fundamental_analysis', ''),
-                    sector_position=data.get('sector_position', ''),
-                    company_highlights=data.get('company_highlights', ''),
-                    # 情绪面/消息面
-                    news_summary=data.get('news_summary', ''),
-                    market_sentiment=data.get('market_sentiment', ''),
-                    hot_topics=data.get('hot_topics', ''),
-                    # 综合
-                    analysis_summary=data.get('analysis_summary', '分析完成'),
-                    key_points=data.get('key_points', ''),
-                    risk_warning=data.get('risk_warning', ''),
-                    buy_reason=data.get('buy_reason', ''),
-                    # 元数据
-                    search_performed=data.get('search_performed', False),
-                    data_sources=data.get('data_sources', '技术面数据'),
-                    success=True,
-                )
+                return self._result_from_dict(data, code, name)
             else:
                 # 没有找到 JSON，尝试从纯文本中提取信息
                 logger.warning(f"无法从响应中提取 JSON，使用原始文本分析")
@@ -812,6 +1203,50 @@ class DecisionAgent:
             logger.warning(f"JSON 解析失败: {e}，尝试从文本提取")
             return self._parse_text_response(response_text, code, name)
     
+    def _result_from_dict(self, data: Dict[str, Any], code: str, name: str) -> AnalysisResult:
+        """把解析出的 JSON 对象转换为 AnalysisResult（缺失字段使用默认值）"""
+        # 提取 dashboard 数据
+        dashboard = data.get('dashboard', None)
+        
+        # 解析所有字段，使用默认值防止缺失
+        return AnalysisResult(
+            code=code,
+            name=name,
+            # 核心指标
+            sentiment_score=int(data.get('sentiment_score', 50)),
+            trend_prediction=data.get('trend_prediction', '震荡'),
+            operation_advice=data.get('operation_advice', '持有'),
+            confidence_level=data.get('confidence_level', '中'),
+            # 决策仪表盘
+            dashboard=dashboard,
+            # 走势分析
+            trend_analysis=data.get('trend_analysis', ''),
+            short_term_outlook=data.get('short_term_outlook', ''),
+            medium_term_outlook=data.get('medium_term_outlook', ''),
+            # 技术面
+            technical_analysis=data.get('technical_analysis', ''),
+            ma_analysis=data.get('ma_analysis', ''),
+            volume_analysis=data.get('volume_analysis', ''),
+            pattern_analysis=data.get('pattern_analysis', ''),
+            # 基本面
+            fundamental_analysis=data.get('fundamental_analysis', ''),
+            sector_position=data.get('sector_position', ''),
+            company_highlights=data.get('company_highlights', ''),
+            # 情绪面/消息面
+            news_summary=data.get('news_summary', ''),
+            market_sentiment=data.get('market_sentiment', ''),
+            hot_topics=data.get('hot_topics', ''),
+            # 综合
+            analysis_summary=data.get('analysis_summary', '分析完成'),
+            key_points=data.get('key_points', ''),
+            risk_warning=data.get('risk_warning', ''),
+            buy_reason=data.get('buy_reason', ''),
+            # 元数据
+            search_performed=data.get('search_performed', False),
+            data_sources=data.get('data_sources', '技术面数据'),
+            success=True,
+        )
+    
     def _fix_json_string(self, json_str: str) -> str:
         """修复常见的 JSON 格式问题"""
         import re
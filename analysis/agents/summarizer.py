@@ -21,6 +21,7 @@ from tenacity import (
 
 # 导入配置和提示词
 from config import get_config, Config
+from llm_cache import LLMResponseCache, get_llm_cache
 from analysis.prompts import SUMMARIZER_AGENT_SYSTEM_PROMPT
 
 logger = logging.getLogger(__name__)
@@ -221,7 +222,7 @@ class SummarizerAgent:
                     raise
         raise Exception(f"摘要 Agent 的 {self._model_type} API 调用失败，已达最大重试次数")
     
-    def summarize(self, raw_text: str, stock_code: str, stock_name: str) -> Optional[str]:
+    def summarize(self, raw_text: str, stock_code: str, stock_name: str, use_cache: bool = True) -> Optional[str]:
         """
         对原始文本进行摘要。
 
@@ -229,6 +230,7 @@ class SummarizerAgent:
             raw_text (str): 原始新闻或公告文本。
             stock_code (str): 股票代码。
             stock_name (str): 股票名称。
+            use_cache (bool): 是否使用 LLM 响应缓存（False 时强制重新调用 API，结果仍会写入缓存）。
 
         Returns:
             Optional[str]: 摘要后的文本，如果失败则返回 None。
@@ -236,12 +238,6 @@ class SummarizerAgent:
         if not self.is_available():
             logger.warning(f"摘要 Agent 不可用，跳过 {stock_name}({stock_code}) 的新闻摘要。")
             return None
-        
-        # 请求前增加延时
-        request_delay = self.config.gemini_request_delay # 复用主模型延时
-        if request_delay > 0:
-            logger.debug(f"[SummarizerAgent] 请求前等待 {request_delay:.1f} 秒...")
-            time.sleep(request_delay)
 
         prompt = f"""请摘要以下关于 {stock_name}({stock_code}) 的新闻或公告。
 重点提取：事件、影响（利好/利空/中性）、时间、相关方。
@@ -260,6 +256,21 @@ class SummarizerAgent:
         logger.info(f"[LLM配置] 模型: {self._current_model_name}")
         logger.info(f"[LLM配置] Prompt 长度: {len(prompt)} 字符")
         
+        # 查询响应缓存（缓存的是已去除代码块标记的摘要）
+        cache = get_llm_cache()
+        cache_key = LLMResponseCache.make_key(self._current_model_name, self.SYSTEM_PROMPT, generation_config, prompt) if cache else None
+        if cache and use_cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"[LLM缓存] 摘要 Agent 命中缓存, 响应长度 {len(cached)} 字符")
+                return cached
+        
+        # 请求前增加延时
+        request_delay = self.config.gemini_request_delay # 复用主模型延时
+        if request_delay > 0:
+            logger.debug(f"[SummarizerAgent] 请求前等待 {request_delay:.1f} 秒...")
+            time.sleep(request_delay)
+        
         try:
             start_time = time.time()
             if self._model_type == 'gemini' and self._model:
@@ -276,6 +287,8 @@ class SummarizerAgent:
             if response_text and '```' in response_text:
                 response_text = response_text.replace('```json', '').replace('```', '').strip()
             
+            if cache:
+                cache.put(cache_key, response_text, model=self._current_model_name)
             return response_text
         except Exception as e:
             logger.error(f"摘要 Agent 处理 {stock_name}({stock_code}) 失败: {e}")
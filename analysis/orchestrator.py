@@ -7,10 +7,14 @@ A股自选股智能分析系统 - LLM Agent 协调器 (LangGraph 版)
 职责：
 1. 使用 LangGraph 协调 SummarizerAgent 和 DecisionAgent 的工作流。
 2. 管理从原始新闻到最终分析结果的全过程状态。
+3. 按条件路由：趋势信号明确时规则直出、新闻情报缓存有效时跳过搜索、新闻较短时跳过摘要，
+   实际经过的节点记录在 AnalysisResult.route 上。
 """
 
 import logging
-from typing import Optional, Dict, Any, List, TypedDict, Annotated
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple, TypedDict, Annotated, Callable
 import operator
 
 from langgraph.graph import StateGraph, END
@@ -18,15 +22,65 @@ from langgraph.graph import StateGraph, END
 from config import get_config, Config
 from analysis.agents.summarizer import SummarizerAgent
 from analysis.agents.decision import DecisionAgent, AnalysisResult
+from analysis.utils import estimate_tokens
 from search_service import SearchService
 
 logger = logging.getLogger(__name__)
 
+
+class IntelCache:
+    """
+    新闻情报缓存（进程级共享，按股票代码）
+
+    WebUI 和定时任务每次运行都会新建协调器，缓存放在模块级，TTL 内重复分析同一只股票时跳过搜索。
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, stock_code: str) -> Optional[str]:
+        """取有效期内的新闻情报，没有或已过期返回 None"""
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(stock_code)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl:
+                del self._entries[stock_code]
+                return None
+            return entry[1]
+
+    def put(self, stock_code: str, raw_news: str) -> None:
+        if self.ttl <= 0 or not raw_news:
+            return
+        with self._lock:
+            self._entries[stock_code] = (time.time(), raw_news)
+
+
+_intel_cache: Optional[IntelCache] = None
+_intel_cache_lock = threading.Lock()
+
+
+def get_intel_cache() -> IntelCache:
+    """获取进程级共享的新闻情报缓存（有效期取配置 intel_cache_ttl）"""
+    global _intel_cache
+    if _intel_cache is None:
+        with _intel_cache_lock:
+            if _intel_cache is None:
+                _intel_cache = IntelCache(get_config().intel_cache_ttl)
+    return _intel_cache
+
+
 class AgentState(TypedDict):
     """分析工作流的状态定义"""
     stock_code: str
     stock_name: str
     context: Dict[str, Any]  # 包含技术面数据的上下文
+    on_core_ready: Optional[Callable[[AnalysisResult], None]]  # 核心结论预览回调（见 DecisionAgent.analyze）
+    use_cache: bool  # 是否使用 LLM 响应缓存（False 时强制重新生成）
     
     # 中间产物
     raw_news: Optional[str]
@@ -37,6 +91,9 @@ class AgentState(TypedDict):
     
     # 错误追踪
     errors: Annotated[List[str], operator.add]
+    
+    # 实际经过的节点
+    route: Annotated[List[str], operator.add]
 
 class LLMOrchestrator:
     """
@@ -75,22 +132,118 @@ class LLMOrchestrator:
             logger.warning("决策 Agent 不可用，核心分析功能将受限。")
 
     def _build_workflow(self) -> StateGraph:
-        """构建 LangGraph 工作流图"""
+        """
+        构建 LangGraph 工作流图
+        
+        plan ─┬─ 趋势信号明确 ─────────→ rule ─────────────────────→ END
+              ├─ 新闻情报缓存有效 ─┐
+              └─ search ──────────┴─┬─ 新闻较长 → summarize → decision → END
+                                   └─ 新闻为空/较短 ─────────→ decision
+        """
         workflow = StateGraph(AgentState)
         
         # 添加节点
+        workflow.add_node("plan", self._plan_node)
+        workflow.add_node("rule", self._rule_node)
         workflow.add_node("search", self._search_node)
         workflow.add_node("summarize", self._summarize_node)
         workflow.add_node("decision", self._decision_node)
         
         # 设置边
-        workflow.set_entry_point("search")
-        workflow.add_edge("search", "summarize")
+        workflow.set_entry_point("plan")
+        workflow.add_conditional_edges("plan", self._route_after_plan, {
+            "rule": "rule",
+            "search": "search",
+            "summarize": "summarize",
+            "decision": "decision",
+        })
+        workflow.add_conditional_edges("search", self._route_after_search, {
+            "summarize": "summarize",
+            "decision": "decision",
+        })
         workflow.add_edge("summarize", "decision")
+        workflow.add_edge("rule", END)
         workflow.add_edge("decision", END)
         
         return workflow.compile()
 
+    # === 路由 ===
+
+    def is_decisive(self, context: Dict[str, Any]) -> bool:
+        """
+        StockTrendAnalyzer 的信号是否足够明确，可以不搜索、不调用 LLM 直接给出结论
+
+        分阶段调用时应在搜索之前判断，为 True 时跳过 search_news/summarize_news。
+        """
+        config = self.config
+        trend = context.get('trend_analysis')
+        if not config.rule_shortcut_enabled or not trend:
+            return False
+        signal, score = trend.get('buy_signal'), trend.get('signal_score', 50)
+        return (
+            (signal == '强烈买入' and score >= config.rule_shortcut_buy_score) or
+            (signal == '强烈卖出' and score <= config.rule_shortcut_sell_score)
+        )
+
+    def _needs_summary(self, raw_news: Optional[str]) -> bool:
+        """新闻是否长到值得调用摘要 Agent（较短的新闻直接交给决策 Agent）"""
+        return bool(raw_news) and estimate_tokens(raw_news) >= self.config.summarize_min_tokens
+
+    def _route_after_plan(self, state: AgentState) -> str:
+        if self.is_decisive(state["context"]):
+            return "rule"
+        if state.get("raw_news"):
+            # 使用缓存的新闻情报
+            return self._route_after_search(state)
+        return "search"
+
+    def _route_after_search(self, state: AgentState) -> str:
+        if self._needs_summary(state.get("raw_news")):
+            return "summarize"
+        if state.get("raw_news"):
+            logger.info(f"[{state['stock_code']}] [Workflow] 新闻较短，跳过摘要 Agent。")
+        return "decision"
+
+    def _plan_node(self, state: AgentState) -> Dict[str, Any]:
+        """规划节点：趋势信号明确时走规则直出，否则尝试读取新闻情报缓存"""
+        code = state["stock_code"]
+        if self.is_decisive(state["context"]) or not state.get("use_cache", True):
+            return {"route": []}
+        raw_news = get_intel_cache().get(code)
+        if raw_news is None:
+            return {"route": []}
+        logger.info(f"[{code}] [Workflow] 新闻情报缓存有效，跳过搜索。")
+        return {"raw_news": raw_news, "route": ["intel_cache"]}
+
+    def _rule_node(self, state: AgentState) -> Dict[str, Any]:
+        """规则节点：按趋势分析结果直接给出结论（不搜索、不调用 LLM）"""
+        code = state["stock_code"]
+        name = state["stock_name"]
+        trend = state["context"]["trend_analysis"]
+        signal, score = trend.get('buy_signal'), trend.get('signal_score', 50)
+        is_buy = signal == '强烈买入'
+        reasons = trend.get('signal_reasons') or []
+        risks = trend.get('risk_factors') or []
+        logger.info(f"[{code}] [Workflow] 趋势信号明确（{signal}，评分 {score}），按规则直接给出结论。")
+        
+        result = AnalysisResult(
+            code=code,
+            name=name,
+            sentiment_score=int(score),
+            trend_prediction='强烈看多' if is_buy else '强烈看空',
+            operation_advice='买入' if is_buy else '卖出',
+            confidence_level='中',
+            trend_analysis=f"{trend.get('trend_status', '')}，{trend.get('ma_alignment', '')}",
+            ma_analysis=trend.get('ma_alignment', ''),
+            volume_analysis=f"{trend.get('volume_status', '')}，{trend.get('volume_trend', '')}",
+            analysis_summary=f"趋势信号明确（{signal}，评分 {score}/100），按交易规则直接给出结论，未结合消息面。",
+            key_points='；'.join(reasons),
+            risk_warning='；'.join(risks) or '规则判断未结合消息面，请留意公告与舆情风险',
+            buy_reason='；'.join(reasons if is_buy else risks),
+            data_sources="技术面数据（规则判断）",
+        )
+        return {"analysis_result": result, "route": ["rule"]}
+
     def _search_node(self, state: AgentState) -> Dict[str, Any]:
         """搜索节点：获取原始新闻"""
         code = state["stock_code"]
@@ -109,13 +262,14 @@ class LLMOrchestrator:
                     raw_news_context = self.search_service.format_intel_report(intel_results, name)
                     total_results = sum(len(r.results) for r in intel_results.values() if r.success)
                     logger.info(f"[{code}] [Workflow] 新闻搜索完成，共 {total_results} 条结果。")
+                    get_intel_cache().put(code, raw_news_context)
             except Exception as e:
                 logger.error(f"[{code}] [Workflow] 搜索出错: {e}")
-                return {"errors": [f"Search error: {str(e)}"]}
+                return {"errors": [f"Search error: {str(e)}"], "route": ["search"]}
         else:
             logger.info(f"[{code}] [Workflow] 搜索服务不可用，跳过新闻搜索。")
 
-        return {"raw_news": raw_news_context}
+        return {"raw_news": raw_news_context, "route": ["search"]}
 
     def _summarize_node(self, state: AgentState) -> Dict[str, Any]:
         """摘要节点：对新闻进行摘要"""
@@ -127,7 +281,9 @@ class LLMOrchestrator:
         if raw_news and self.summarizer_agent.is_available():
             logger.info(f"[{code}] [Workflow] 开始调用摘要 Agent...")
             try:
-                news_summary = self.summarizer_agent.summarize(raw_news, code, name)
+                news_summary = self.summarizer_agent.summarize(
+                    raw_news, code, name, use_cache=state.get("use_cache", True)
+                )
                 if news_summary:
                     logger.info(f"[{code}] [Workflow] 新闻摘要完成。")
                 else:
@@ -136,34 +292,45 @@ class LLMOrchestrator:
             except Exception as e:
                 logger.error(f"[{code}] [Workflow] 摘要出错: {e}")
                 # 如果摘要失败，回退到原始新闻
-                return {"news_summary": raw_news, "errors": [f"Summarization error: {str(e)}"]}
+                return {"news_summary": raw_news, "errors": [f"Summarization error: {str(e)}"], "route": ["summarize"]}
         elif raw_news:
             logger.warning(f"[{code}] [Workflow] 摘要 Agent 不可用，将使用原始新闻。")
             news_summary = raw_news
             
-        return {"news_summary": news_summary}
+        return {"news_summary": news_summary, "route": ["summarize"]}
 
     def _decision_node(self, state: AgentState) -> Dict[str, Any]:
         """决策节点：生成最终分析结果"""
         code = state["stock_code"]
         name = state["stock_name"]
         context = state["context"]
-        news_summary = state.get("news_summary")
+        # 跳过摘要时直接使用原始新闻
+        news_summary = state.get("news_summary") or state.get("raw_news")
         
         logger.info(f"[{code}] [Workflow] 开始调用决策 Agent...")
         try:
-            final_result = self.decision_agent.analyze(context, news_summary)
-            return {"analysis_result": final_result}
+            final_result = self.decision_agent.analyze(
+                context, news_summary,
+                use_cache=state.get("use_cache", True),
+                on_core_ready=state.get("on_core_ready"),
+            )
+            return {"analysis_result": final_result, "route": ["decision"]}
         except Exception as e:
             logger.error(f"[{code}] [Workflow] 决策出错: {e}")
-            return {"errors": [f"Decision error: {str(e)}"]}
+            return {"errors": [f"Decision error: {str(e)}"], "route": ["decision"]}
 
     def analyze(self, 
                 context: Dict[str, Any],
                 stock_name: str,
+                on_core_ready: Optional[Callable[[AnalysisResult], None]] = None,
+                use_cache: bool = True,
                 ) -> AnalysisResult:
         """
         执行分析流程（调用 LangGraph）。
+        
+        Args:
+            on_core_ready: 核心结论预览回调，流式输出时评分/操作建议/趋势先行到达后调用（仅用于推送，见 DecisionAgent.analyze）
+            use_cache: 是否使用 LLM 响应缓存（False 时摘要和决策都重新调用 API，新结果仍写入缓存）
         """
         code = context.get('code', 'Unknown')
         
@@ -172,27 +339,181 @@ class LLMOrchestrator:
             "stock_code": code,
             "stock_name": stock_name,
             "context": context,
+            "on_core_ready": on_core_ready,
+            "use_cache": use_cache,
             "raw_news": None,
             "news_summary": None,
             "analysis_result": None,
-            "errors": []
+            "errors": [],
+            "route": [],
         }
         
         # 执行工作流
         final_state = self.workflow.invoke(initial_state)
         
+        return self._final_result(final_state)
+
+    # === 分阶段调用（供异步/流水线调度使用，与工作流节点逻辑一致）===
+
+    def search_news(
+        self,
+        stock_code: str,
+        stock_name: str,
+        use_cache: bool = True
+    ) -> Tuple[Optional[str], List[str]]:
+        """
+        搜索阶段：获取原始新闻（网络 I/O）
+
+        Args:
+            use_cache: 是否使用新闻情报缓存（False 时重新搜索）
+
+        Returns:
+            (新闻情报, 经过的节点)：缓存有效时为 (缓存, ["intel_cache"])，否则为 (搜索结果, ["search"])；
+            搜索不可用或失败时新闻情报为 None
+        """
+        raw_news = get_intel_cache().get(stock_code) if use_cache else None
+        if raw_news is not None:
+            logger.info(f"[{stock_code}] [Workflow] 新闻情报缓存有效，跳过搜索。")
+            return raw_news, ["intel_cache"]
+        update = self._search_node({"stock_code": stock_code, "stock_name": stock_name})
+        return update.get("raw_news"), update.get("route", [])
+
+    def summarize_news(
+        self,
+        stock_code: str,
+        stock_name: str,
+        raw_news: Optional[str],
+        use_cache: bool = True
+    ) -> Tuple[Optional[str], List[str]]:
+        """
+        摘要阶段：调用摘要 Agent（LLM），失败时回退到原始新闻
+
+        Args:
+            use_cache: 是否使用 LLM 响应缓存
+
+        Returns:
+            (新闻摘要, 经过的节点)：新闻较短时为 (原始新闻, [])，没有新闻时为 (None, [])
+        """
+        state = {"stock_code": stock_code, "stock_name": stock_name, "raw_news": raw_news, "use_cache": use_cache}
+        if self._route_after_search(state) != "summarize":
+            return raw_news or None, []
+        update = self._summarize_node(state)
+        return update.get("news_summary"), update.get("route", [])
+
+    def decide(
+        self,
+        context: Dict[str, Any],
+        stock_name: str,
+        news_summary: Optional[str] = None,
+        on_core_ready: Optional[Callable[[AnalysisResult], None]] = None,
+        use_cache: bool = True,
+        route: Optional[List[str]] = None
+    ) -> AnalysisResult:
+        """
+        决策阶段：调用决策 Agent（LLM）；趋势信号明确时按规则直接给出结论
+
+        Args:
+            on_core_ready: 核心结论预览回调（见 DecisionAgent.analyze）
+            use_cache: 是否使用 LLM 响应缓存
+            route: 搜索/摘要阶段经过的节点（search_news、summarize_news 的返回值），与决策节点一起记录到结果上
+
+        Returns:
+            AnalysisResult（失败时为 success=False 的默认结果）
+        """
+        code = context.get('code', 'Unknown')
+        state = {
+            "stock_code": code,
+            "stock_name": stock_name,
+            "context": context,
+            "news_summary": news_summary,
+            "on_core_ready": on_core_ready,
+            "use_cache": use_cache,
+        }
+        node = self._rule_node if self.is_decisive(context) else self._decision_node
+        update = node(state)
+        return self._final_result({
+            "stock_code": code,
+            "stock_name": stock_name,
+            "analysis_result": update.get("analysis_result"),
+            "errors": update.get("errors", []),
+            "route": (route or []) + update.get("route", []),
+        })
+
+    def decide_batch(
+        self,
+        items: List[Tuple[Dict[str, Any], str, Optional[str], List[str]]],
+        use_cache: bool = True
+    ) -> List[AnalysisResult]:
+        """
+        批量决策阶段：多只股票合并为一次决策请求（按 DECISION_BATCH_SIZE 等配置自动分批）；
+        趋势信号明确的股票按规则直接给出结论，不进入批量请求
+
+        Args:
+            items: [(context, stock_name, news_summary, route), ...]，route 为搜索/摘要阶段经过的节点
+            use_cache: 是否使用 LLM 响应缓存
+
+        Returns:
+            与 items 顺序一致的 AnalysisResult 列表（失败的股票为 success=False 的默认结果）
+        """
+        states: List[Dict[str, Any]] = [
+            {
+                "stock_code": context.get('code', 'Unknown'),
+                "stock_name": stock_name,
+                "context": context,
+                "analysis_result": None,
+                "errors": [],
+                "route": list(route or []),
+            }
+            for context, stock_name, _, route in items
+        ]
+        pending = []
+        for i, state in enumerate(states):
+            if self.is_decisive(state["context"]):
+                update = self._rule_node(state)
+                state["analysis_result"] = update["analysis_result"]
+                state["route"] += update["route"]
+            else:
+                pending.append(i)
+
+        if pending:
+            logger.info(f"[Workflow] 开始批量调用决策 Agent（{len(pending)} 只股票）...")
+            try:
+                results = self.decision_agent.analyze_batch(
+                    [(items[i][0], items[i][2]) for i in pending],
+                    use_cache=use_cache
+                )
+            except Exception as e:
+                logger.error(f"[Workflow] 批量决策出错: {e}")
+                results = [None] * len(pending)
+                error = f"Decision error: {str(e)}"
+            else:
+                error = "Decision error: 批量决策未返回结果"
+            for i, result in zip(pending, results):
+                states[i]["analysis_result"] = result
+                states[i]["route"].append("decision_batch")
+                if not result:
+                    states[i]["errors"].append(error)
+
+        return [self._final_result(state) for state in states]
+
+    def _final_result(self, final_state: Dict[str, Any]) -> AnalysisResult:
+        """从工作流最终状态取出结果，没有结果时构造失败结果"""
         # 如果有结果则返回，否则构造一个失败的结果
+        route = ">".join(final_state.get("route") or [])
         if final_state.get("analysis_result"):
-            return final_state["analysis_result"]
+            result = final_state["analysis_result"]
+            result.route = route
+            return result
         
         # 失败处理
-        error_msg = "; ".join(final_state.get("errors", ["未知工作流错误"]))
+        error_msg = "; ".join(final_state.get("errors") or ["未知工作流错误"])
         return AnalysisResult(
-            code=code,
-            name=stock_name,
+            code=final_state.get("stock_code", 'Unknown'),
+            name=final_state.get("stock_name", ''),
             sentiment_score=50,
             trend_prediction='震荡',
             operation_advice='持有',
             success=False,
-            error_message=f"工作流执行失败: {error_msg}"
+            error_message=f"工作流执行失败: {error_msg}",
+            route=route,
         )
\ No newline at end of file
@@ -6,7 +6,7 @@ A股自选股智能分析系统 - Agent Prompt 定义
 
 职责：
 1. 集中管理所有 Agent 使用的 Prompt 模板。
-2. 定义决策 Agent 的 SYSTEM_PROMPT。
+2. 定义决策 Agent 的 SYSTEM_PROMPT（及紧凑输入格式的附加说明）。
 3. 定义摘要 Agent 的 SYSTEM_PROMPT。
 """
 
@@ -191,6 +191,39 @@ DECISION_AGENT_SYSTEM_PROMPT = """你是一位专注于趋势交易的 A 股投
 4. **检查清单可视化**：用 ✅⚠️❌ 明确显示每项检查结果
 5. **风险优先级**：舆情中的风险点要醒目标出"""
 
+# ========================================
+# 决策 Agent 紧凑输入格式说明（DECISION_PROMPT_FORMAT=compact）
+# ========================================
+# 追加在决策 Agent 系统提示词之后：字段说明和固定的分析要求只在系统提示词中出现一次，
+# 每次请求只发送各股的 "键=值" 数据，系统提示词部分可被上下文缓存/前缀缓存复用
+# ========================================
+
+DECISION_COMPACT_INPUT_GUIDE = """
+
+## 输入数据格式
+
+股票数据以 "键=值" 紧凑格式给出，每类指标一行，N/A 表示缺失：
+- `### 代码 名称 日期=...`：股票基础信息
+- `行情`：收盘/开盘/最高/最低价（元）、涨跌幅、成交量、成交额
+- `均线`：MA5/MA10/MA20 及均线形态（多头/空头/缠绕）
+- `实时`：现价、盘中均线（以现价计入当日K线）、量比（括号内为解读）、换手率、市盈率(动态)、市净率、总市值、流通市值、60日涨跌幅
+- `筹码`：获利比例（70-90%时警惕）、平均成本（现价应高于5-15%）、90%/70%筹码集中度（<15%为集中）、筹码状态
+- `趋势`：系统趋势预判，含趋势状态、均线排列、趋势强度(0-100)、乖离率、量能状态、系统信号与评分(0-100)
+- `买入理由` / `风险因素`：系统分析理由，分号分隔
+- `舆情`：摘要 Agent 处理后的舆情信息，"无" 表示未提供，此时主要依据技术面分析
+
+## 分析要求
+
+重点关注（必须明确回答）：
+1. 是否满足 MA5>MA10>MA20 多头排列？
+2. 当前乖离率是否在安全范围内（<5%）？—— 超过5%必须标注"严禁追高"
+3. 量能是否配合（缩量回调/放量突破）？
+4. 筹码结构是否健康？
+5. 消息面有无重大利空？（减持、处罚、业绩变脸等）；舆情中重点提取风险警报、利好催化、业绩预期
+
+决策仪表盘要求：核心结论一句话说清该买/该卖/该等；分空仓者/持仓者给出建议；给出买入价、止损价、目标价（精确到分）；检查清单每项用 ✅/⚠️/❌ 标记。
+严格按照 JSON 格式输出完整的决策仪表盘。"""
+
 # ========================================
 # 摘要 Agent 的系统提示词
 # ========================================
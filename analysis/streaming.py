@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 流式 JSON 增量解析
+===================================
+
+职责：
+1. 逐段接收大模型流式输出的文本，增量扫描顶层 JSON 对象
+2. 每个顶层字段的值完整到达时立即解析并回调，无需等待整个响应结束
+3. 跳过 JSON 之前的 markdown 代码块标记等前缀文本
+"""
+
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalJSONParser:
+    """
+    顶层 JSON 对象的增量解析器
+
+    只跟踪顶层字段：嵌套对象/数组整体作为一个值，在其闭合后才解析。
+    每个字符只扫描一次，feed 的总耗时与响应长度成线性关系。
+    单个字段的值无法解析（如模型输出了注释）时跳过该字段，完整响应仍由调用方统一解析。
+    """
+
+    def __init__(self, on_field: Optional[Callable[[str, Any], None]] = None):
+        """
+        Args:
+            on_field: 顶层字段解析完成时的回调 (key, value)
+        """
+        self.on_field = on_field
+        self.reset()
+
+    def reset(self) -> None:
+        """清空状态（流式请求重试时从头开始）"""
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.finished = False
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> None:
+        """追加一段流式文本并解析新到达的部分"""
+        if not chunk or self.finished:
+            return
+        self.text += chunk
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if not self._started:
+                if ch == '{':
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start is not None:
+                        self._key = self._loads(text[self._key_start:i + 1])
+                        self._key_start = None
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None and self._value_start is None:
+                    self._key_start = i
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_field(i)
+                    self.finished = True
+                    self._pos = i + 1
+                    return
+            elif self._depth == 1:
+                if ch == ':' and self._key is not None and self._value_start is None:
+                    self._value_start = i + 1
+                elif ch == ',':
+                    self._finish_field(i)
+        self._pos = len(text)
+
+    def _finish_field(self, end: int) -> None:
+        """顶层字段的值在 end 之前结束"""
+        key, start = self._key, self._value_start
+        self._key = None
+        self._value_start = None
+        if not isinstance(key, str) or start is None:
+            return
+        raw = self.text[start:end].strip()
+        if not raw:
+            return
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.debug(f"[流式解析] 字段 {key} 无法增量解析，等待完整响应")
+            return
+        self.fields[key] = value
+        if self.on_field is not None:
+            self.on_field(key, value)
+
+    @staticmethod
+    def _loads(raw: str) -> Optional[str]:
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return None
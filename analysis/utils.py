@@ -7,6 +7,7 @@ A股自选股智能分析系统 - 分析工具函数
 职责：
 1. 提供股票名称映射。
 2. 提供公共的格式化函数。
+3. 估算文本的 Token 数。
 """
 
 from typing import Optional
@@ -51,3 +52,10 @@ def format_amount(amount: Optional[float]) -> str:
         return f"{amount / 1e4:.2f} 万元"
     else:
         return f"{amount:.0f} 元"
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """估算文本的 Token 数（中日韩字符约 1 Token/字，其余约 4 字符/Token）"""
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if '\u2e80' <= ch <= '\u9fff' or '\uff00' <= ch <= '\uffef')
+    return cjk + (len(text) - cjk + 3) // 4
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - asyncio 调度模式
+===================================
+
+职责：
+1. 以协程调度每只股票的 获取数据 → 搜索 → LLM → 保存/交易/推送 流程
+2. 阻塞的 SDK 调用放到按阶段划分的有界线程池中执行，每个阶段独立限制并发
+3. 各阶段互不占用：股票 A 等待限流/下载时，股票 B 可以占用 LLM 并发
+
+阶段划分：
+- data:   日线获取入库、实时行情、筹码分布、趋势分析（akshare/efinance，受全局令牌桶限流）
+- search: 新闻搜索（Bocha/Tavily/SerpAPI）
+- llm:    新闻摘要 + 决策分析
+- notify: 分析记录入库、交易引擎、单股推送（SQLite 写入，默认串行）
+
+使用方式：
+    PIPELINE_MODE=async python main.py
+    python main.py --pipeline async
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from analysis.agents.decision import AnalysisResult
+from config import Config
+from enums import ReportType
+
+if TYPE_CHECKING:
+    from main import StockAnalysisPipeline
+
+logger = logging.getLogger(__name__)
+
+
+# 阶段名称
+STAGE_DATA = 'data'
+STAGE_SEARCH = 'search'
+STAGE_LLM = 'llm'
+STAGE_NOTIFY = 'notify'
+
+STAGES = (STAGE_DATA, STAGE_SEARCH, STAGE_LLM, STAGE_NOTIFY)
+
+
+@dataclass
+class StageLimits:
+    """各阶段的并发上限（即各阶段线程池大小）"""
+    data: int = 3
+    search: int = 3
+    llm: int = 3
+    notify: int = 1
+
+    @classmethod
+    def from_config(cls, config: Config) -> "StageLimits":
+        return cls(
+            data=config.stage_data_workers,
+            search=config.stage_search_workers,
+            llm=config.stage_llm_workers,
+            notify=config.stage_notify_workers,
+        )
+
+    def get(self, stage: str) -> int:
+        return max(1, int(getattr(self, stage)))
+
+
+class AsyncStockPipeline:
+    """
+    asyncio 调度器
+
+    复用 StockAnalysisPipeline 的各阶段方法（fetch_and_save_stock_data、
+    prepare_analysis_context、persist_result 等），只替换调度方式。
+    单只股票的异常不影响其他股票。
+    """
+
+    def __init__(self, pipeline: "StockAnalysisPipeline", limits: Optional[StageLimits] = None):
+        """
+        Args:
+            pipeline: 同步调度器（提供各阶段的实现）
+            limits: 各阶段并发上限（可选，默认从配置读取）
+        """
+        self.pipeline = pipeline
+        self.limits = limits or StageLimits.from_config(pipeline.config)
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        # 各阶段累计耗时（秒），不含排队等待
+        self.stage_seconds: Dict[str, float] = {stage: 0.0 for stage in STAGES}
+        self._stats_lock = threading.Lock()
+
+    async def _call(self, stage: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """在阶段线程池中执行阻塞调用"""
+        loop = asyncio.get_running_loop()
+        executor = self._executors[stage]
+
+        def timed():
+            started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._stats_lock:
+                    self.stage_seconds[stage] += time.monotonic() - started
+
+        return await loop.run_in_executor(executor, timed)
+
+    async def process_stock(
+        self,
+        code: str,
+        skip_analysis: bool = False,
+        single_stock_notify: bool = False,
+        report_type: ReportType = ReportType.SIMPLE
+    ) -> Optional[AnalysisResult]:
+        """
+        处理单只股票（与 StockAnalysisPipeline.process_single_stock 流程一致）
+
+        Returns:
+            AnalysisResult 或 None
+        """
+        pipeline = self.pipeline
+        orchestrator = pipeline.orchestrator
+        logger.info(f"========== 开始处理 {code} ==========")
+
+        try:
+            # Step 1: 获取并保存数据
+            success, error = await self._call(STAGE_DATA, pipeline.fetch_and_save_stock_data, code)
+            if not success:
+                logger.warning(f"[{code}] 数据获取失败: {error}")
+                # 即使获取失败，也尝试用已有数据分析
+
+            if skip_analysis:
+                logger.info(f"[{code}] 跳过 AI 分析（dry-run 模式）")
+                return None
+
+            # Step 2: 实时行情、筹码、趋势分析，组装上下文
+            prepared = await self._call(STAGE_DATA, pipeline.prepare_analysis_context, code)
+            if prepared is None:
+                return None
+            context, stock_name = prepared
+
+            # Step 3: 新闻搜索与摘要（趋势信号明确时跳过，决策阶段按规则直接给出结论）
+            news_summary, route = None, []
+            if not orchestrator.is_decisive(context):
+                raw_news, route = await self._call(
+                    STAGE_SEARCH, orchestrator.search_news, code, stock_name,
+                    use_cache=pipeline.use_llm_cache
+                )
+                if raw_news:
+                    news_summary, summary_route = await self._call(
+                        STAGE_LLM, orchestrator.summarize_news, code, stock_name, raw_news,
+                        use_cache=pipeline.use_llm_cache
+                    )
+                    route = route + summary_route
+
+            # Step 4: 决策分析（流式输出时核心结论预览先行推送）
+            result = await self._call(
+                STAGE_LLM, orchestrator.decide, context, stock_name, news_summary,
+                on_core_ready=pipeline.make_core_handler(code, single_stock_notify),
+                use_cache=pipeline.use_llm_cache,
+                route=route
+            )
+            if not result:
+                return None
+
+            # Step 5: 保存、按完整结果执行交易决策、单股推送
+            await self._call(STAGE_NOTIFY, pipeline.persist_result, code, result, context)
+            if single_stock_notify:
+                await self._call(STAGE_NOTIFY, pipeline.notify_single_stock, code, result, report_type)
+
+            return result
+
+        except Exception as e:
+            # 捕获所有异常，确保单股失败不影响整体
+            logger.exception(f"[{code}] 处理过程发生未知异常: {e}")
+            return None
+
+    async def run(
+        self,
+        stock_codes: List[str],
+        skip_analysis: bool = False,
+        single_stock_notify: bool = False,
+        report_type: ReportType = ReportType.SIMPLE
+    ) -> List[AnalysisResult]:
+        """
+        并发处理全部股票
+
+        Returns:
+            成功的分析结果列表（按股票列表顺序）
+        """
+        self._executors = {
+            stage: ThreadPoolExecutor(max_workers=self.limits.get(stage), thread_name_prefix=f"async_{stage}")
+            for stage in STAGES
+        }
+        limits_info = ", ".join(f"{stage}={self.limits.get(stage)}" for stage in STAGES)
+        logger.info(f"asyncio 调度模式，各阶段并发: {limits_info}")
+
+        try:
+            outcomes = await asyncio.gather(*[
+                self.process_stock(code, skip_analysis, single_stock_notify, report_type)
+                for code in stock_codes
+            ])
+        finally:
+            for executor in self._executors.values():
+                executor.shutdown(wait=True)
+
+        busy_info = ", ".join(f"{stage}={self.stage_seconds[stage]:.1f}s" for stage in STAGES)
+        logger.info(f"各阶段累计耗时: {busy_info}")
+        return [result for result in outcomes if result]
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 列式行情存储
+===================================
+
+职责：
+1. 以 Parquet 列式文件存储日线数据（与 SQLite stock_daily 表并存）
+2. 按 股票代码 / 年份 分区：{root}/{code}/{year}.parquet
+3. 支持内存映射读取指定日期区间，直接得到 DataFrame 或 NumPy 数组
+
+依赖：
+- pyarrow（可选依赖，未安装时 is_available() 返回 False，调用方回退到 SQLite）
+"""
+
+import logging
+import os
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    _PYARROW_AVAILABLE = True
+except ImportError:  # pragma: no cover - 取决于运行环境
+    pa = pc = pq = None
+    _PYARROW_AVAILABLE = False
+
+
+# 行情列（与 data_provider.base.STANDARD_COLUMNS 一致；不从 data_provider 导入，避免 import storage 时加载全部数据源）
+PRICE_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume', 'amount', 'pct_chg']
+
+# 存储的指标列（与 StockDaily 中的技术指标字段一致）
+INDICATOR_COLUMNS = ['ma5', 'ma10', 'ma20', 'volume_ratio']
+
+# 列式存储的全部数据列（date 以外均为 float64）
+BAR_COLUMNS = PRICE_COLUMNS + INDICATOR_COLUMNS
+
+
+class ParquetBarStore:
+    """
+    Parquet 列式日线存储
+
+    设计说明：
+    - 每只股票每年一个文件，追加当日数据只需重写当年分区
+    - 读取时按需打开覆盖日期区间的年份文件（memory_map），拼接后按日期过滤
+    - 写入采用「临时文件 + os.replace」保证分区文件不会被写坏
+    """
+
+    FILE_SUFFIX = '.parquet'
+
+    def __init__(self, root_dir: str = "./data/bars"):
+        """
+        初始化列式存储
+
+        Args:
+            root_dir: 存储根目录
+        """
+        self.root = Path(root_dir)
+        self._write_lock = threading.Lock()
+        if self.is_available():
+            self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def is_available() -> bool:
+        """pyarrow 是否可用"""
+        return _PYARROW_AVAILABLE
+
+    # === 路径与元信息 ===
+
+    def _code_dir(self, code: str) -> Path:
+        return self.root / code
+
+    def _partition_path(self, code: str, year: int) -> Path:
+        return self._code_dir(code) / f"{year}{self.FILE_SUFFIX}"
+
+    def list_years(self, code: str) -> List[int]:
+        """返回某只股票已存储的年份（升序）"""
+        code_dir = self._code_dir(code)
+        if not code_dir.exists():
+            return []
+        years = []
+        for path in code_dir.glob(f"*{self.FILE_SUFFIX}"):
+            if path.stem.isdigit():
+                years.append(int(path.stem))
+        return sorted(years)
+
+    def has_code(self, code: str) -> bool:
+        """是否已存储该股票的任何数据"""
+        return bool(self.list_years(code))
+
+    def latest_date(self, code: str) -> Optional[date]:
+        """返回已存储的最新交易日"""
+        years = self.list_years(code)
+        if not years:
+            return None
+        table = pq.read_table(self._partition_path(code, years[-1]), columns=['date'], memory_map=True)
+        if table.num_rows == 0:
+            return None
+        return pc.max(table.column('date')).as_py()
+
+    # === 写入 ===
+
+    def write(self, code: str, df: pd.DataFrame) -> int:
+        """
+        写入（合并）日线数据
+
+        同一日期已存在时以新数据覆盖，语义与 SQLite 的 UPSERT 一致。
+
+        Args:
+            code: 股票代码
+            df: 至少包含 date 列，其余 BAR_COLUMNS 缺失时填充 NaN
+
+        Returns:
+            写入的行数
+        """
+        if df is None or df.empty:
+            return 0
+
+        frame = self._normalize(df)
+        if frame.empty:
+            return 0
+
+        code_dir = self._code_dir(code)
+        with self._write_lock:
+            code_dir.mkdir(parents=True, exist_ok=True)
+            years = pd.to_datetime(frame['date']).dt.year
+            for year, part in frame.groupby(years.values):
+                path = self._partition_path(code, int(year))
+                if path.exists():
+                    existing = pq.read_table(path).to_pandas()
+                    part = pd.concat([existing, part], ignore_index=True)
+                    part = part.drop_duplicates(subset=['date'], keep='last')
+                part = part.sort_values('date').reset_index(drop=True)
+                self._write_partition(path, part)
+
+        return len(frame)
+
+    def _normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """统一列集合与类型：date 为 date 对象，其余列为 float64"""
+        frame = pd.DataFrame(index=df.index)
+        frame['date'] = pd.to_datetime(df['date'], errors='coerce')
+        for col in BAR_COLUMNS[1:]:
+            if col in df.columns:
+                frame[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+            else:
+                frame[col] = np.nan
+        frame = frame.dropna(subset=['date'])
+        frame['date'] = frame['date'].dt.date
+        return frame.drop_duplicates(subset=['date'], keep='last')
+
+    def _write_partition(self, path: Path, part: pd.DataFrame) -> None:
+        schema = pa.schema(
+            [pa.field('date', pa.date32())] + [pa.field(col, pa.float64()) for col in BAR_COLUMNS[1:]]
+        )
+        table = pa.Table.from_pandas(part[BAR_COLUMNS], schema=schema, preserve_index=False)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    # === 读取 ===
+
+    def read_table(
+        self,
+        code: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        columns: Optional[List[str]] = None
+    ) -> Optional["pa.Table"]:
+        """
+        以内存映射方式读取日期区间内的 Arrow Table
+
+        Returns:
+            按日期升序的 Table；无数据时返回 None
+        """
+        years = self.list_years(code)
+        if start_date is not None:
+            years = [y for y in years if y >= start_date.year]
+        if end_date is not None:
+            years = [y for y in years if y <= end_date.year]
+        if not years:
+            return None
+
+        read_columns = None
+        if columns is not None:
+            read_columns = ['date'] + [c for c in columns if c != 'date']
+
+        tables = [
+            pq.read_table(self._partition_path(code, y), columns=read_columns, memory_map=True)
+            for y in years
+        ]
+        table = pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+
+        mask = None
+        if start_date is not None:
+            mask = pc.greater_equal(table.column('date'), pa.scalar(start_date, pa.date32()))
+        if end_date is not None:
+            upper = pc.less_equal(table.column('date'), pa.scalar(end_date, pa.date32()))
+            mask = upper if mask is None else pc.and_(mask, upper)
+        if mask is not None:
+            table = table.filter(mask)
+
+        return table if table.num_rows > 0 else None
+
+    def read_frame(
+        self,
+        code: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        读取日期区间内的数据为 DataFrame
+
+        Returns:
+            包含 date（datetime64）及请求列的 DataFrame；无数据时返回空 DataFrame
+        """
+        table = self.read_table(code, start_date, end_date, columns)
+        if table is None:
+            return pd.DataFrame()
+        df = table.to_pandas()
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    def read_arrays(
+        self,
+        code: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        columns: Optional[List[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        读取日期区间内的数据为 NumPy 数组
+
+        数值列无缺失时为零拷贝视图（只读）；date 列为 datetime64[D]。
+
+        Returns:
+            列名 -> ndarray 的字典；无数据时返回空字典
+        """
+        table = self.read_table(code, start_date, end_date, columns)
+        if table is None:
+            return {}
+        arrays = {}
+        for name in table.column_names:
+            column = table.column(name)
+            if name == 'date':
+                arrays[name] = column.to_numpy().astype('datetime64[D]')
+            else:
+                arrays[name] = column.to_numpy()
+        return arrays
+
+
+# 便捷函数
+_bar_store: Optional[ParquetBarStore] = None
+_bar_store_lock = threading.Lock()
+
+
+def get_bar_store() -> Optional[ParquetBarStore]:
+    """
+    获取全局列式存储实例
+
+    仅当配置 BAR_STORE_ENABLED=true 且安装了 pyarrow 时返回实例，否则返回 None
+    """
+    global _bar_store
+    if _bar_store is None:
+        from config import get_config
+        config = get_config()
+        if not config.bar_store_enabled:
+            return None
+        if not ParquetBarStore.is_available():
+            logger.warning("已启用列式行情存储，但未安装 pyarrow，回退到 SQLite（pip install pyarrow）")
+            return None
+        with _bar_store_lock:
+            if _bar_store is None:
+                _bar_store = ParquetBarStore(config.bar_store_dir)
+                logger.info(f"列式行情存储已启用: {Path(config.bar_store_dir).absolute()}")
+    return _bar_store
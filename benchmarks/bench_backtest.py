@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+基准测试 - 趋势信号回测
+===================================
+
+在内存中的随机游走行情上运行 Backtester 的 signal 模式（不调用 LLM、不访问数据库），
+并与逐日逐股调用 StockTrendAnalyzer.analyze 的耗时（抽样外推）对比。
+LLM 模式每个 股票×交易日 需要多次 LLM 往返，不在此计时。
+
+使用方法：
+    python benchmarks/bench_backtest.py                          # 默认 500 只股票，3 年（750 个交易日）
+    python benchmarks/bench_backtest.py --codes 100 500 --days 500
+"""
+
+import argparse
+import logging
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_trend_batch import make_panel  # noqa: E402
+from config import get_config  # noqa: E402
+from stock_analyzer import StockTrendAnalyzer  # noqa: E402
+from trading.backtester import Backtester  # noqa: E402
+
+
+class InMemoryBacktester(Backtester):
+    """从内存行情加载历史数据的回测引擎（不连接数据库）"""
+
+    def __init__(self, frames: Dict[str, pd.DataFrame]):
+        self.config = get_config()
+        self.frames = frames
+
+    def _load_historical_data(self, stock_codes: List[str], start_date: date, end_date: date) -> Dict[str, pd.DataFrame]:
+        return {
+            code: df[(df.index >= start_date) & (df.index <= end_date)]
+            for code, df in self.frames.items() if code in stock_codes
+        }
+
+
+def make_frames(codes: int, days: int) -> Dict[str, pd.DataFrame]:
+    """生成按日期索引的单股日线（与 Backtester._load_historical_data 的返回格式一致）"""
+    panel = make_panel(codes, days)
+    dates = [d.date() for d in panel['close'].index]
+    frames = {}
+    for code in panel['close'].columns:
+        mask = panel['close'][code].notna().to_numpy()
+        frames[code] = pd.DataFrame({
+            'close': panel['close'][code].to_numpy()[mask],
+            'high': panel['high'][code].to_numpy()[mask],
+            'volume': panel['volume'][code].to_numpy()[mask],
+        }, index=[d for d, m in zip(dates, mask) if m])
+    return frames
+
+
+def time_per_stock_day(frames: Dict[str, pd.DataFrame], samples: int = 200) -> float:
+    """抽样测量逐日逐股调用 analyze 的单次耗时（秒）"""
+    analyzer = StockTrendAnalyzer()
+    items = list(frames.items())
+    start = time.perf_counter()
+    for i in range(samples):
+        code, df = items[i % len(items)]
+        history = df.iloc[:60 + i % max(len(df) - 60, 1)]
+        analyzer.analyze(history.rename_axis('date').reset_index(), code)
+    return (time.perf_counter() - start) / samples
+
+
+def run(codes: int, days: int) -> None:
+    frames = make_frames(codes, days)
+    all_dates = sorted(set().union(*(df.index for df in frames.values())))
+    start_date = all_dates[0] + timedelta(days=InMemoryBacktester.HISTORY_WARMUP_DAYS)
+    end_date = all_dates[-1]
+    stock_days = sum(int((df.index >= start_date).sum()) for df in frames.values())
+
+    backtester = InMemoryBacktester(frames)
+    start = time.perf_counter()
+    report = backtester.run(list(frames), start_date, end_date, 'TrendSignalStrategy', mode='signal')
+    elapsed = time.perf_counter() - start
+    per_call = time_per_stock_day(frames)
+
+    print(f"{codes} 只股票 × {days} 个交易日（回测 {start_date} ~ {end_date}，{stock_days} 个股票×交易日）")
+    print(f"  signal 模式:          {elapsed:8.2f} s  成交 {report['trade_count']} 笔，期末资产 {report['final_assets']}")
+    print(f"  逐日逐股 analyze(外推): {per_call * stock_days:8.2f} s  ({per_call * 1e6:.0f} us/次，不含 LLM)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='趋势信号回测基准测试')
+    parser.add_argument('--codes', type=int, nargs='+', default=[500], help='股票数量（可多个）')
+    parser.add_argument('--days', type=int, default=750, help='交易日数')
+    args = parser.parse_args()
+
+    # 次新股数据不足的告警、逐笔成交日志不影响计时
+    logging.basicConfig(level=logging.ERROR)
+
+    for codes in args.codes:
+        run(codes, args.days)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
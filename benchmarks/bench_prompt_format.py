@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+基准测试 - 决策 Agent 提示词格式
+===================================
+
+对比 DECISION_PROMPT_FORMAT=markdown / compact 两种格式：
+1. 离线：系统提示词与单股 Prompt 的 Token 数（安装 tiktoken 时按 o200k_base 计，否则按字符估算）
+2. --live：用已配置的模型逐只分析同一批股票，记录耗时并比较两种格式输出的
+   操作建议、趋势预测、评分是否一致（不使用 LLM 响应缓存，会消耗 API 额度）
+
+紧凑格式的字段说明和分析要求固定在系统提示词中，启用 Gemini 上下文缓存
+（GEMINI_CONTEXT_CACHE=true）或 OpenAI 兼容 API 的前缀缓存后，每次请求新增计费的只有单股 Prompt。
+
+使用方法：
+    python benchmarks/bench_prompt_format.py                   # 10 只模拟股票，仅统计 Token
+    python benchmarks/bench_prompt_format.py --stocks 5 --live # 实际调用模型对比耗时与输出
+"""
+
+import argparse
+import dataclasses
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analysis.agents.decision import AnalysisResult, DecisionAgent  # noqa: E402
+from analysis.utils import estimate_tokens  # noqa: E402
+from config import get_config  # noqa: E402
+
+FORMATS = ('markdown', 'compact')
+
+
+def make_token_counter() -> Tuple[str, Callable[[str], int]]:
+    """返回 (计数方式, 计数函数)"""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding('o200k_base')
+        return 'tiktoken o200k_base', lambda text: len(encoding.encode(text))
+    except Exception:
+        return '字符估算（未安装 tiktoken）', estimate_tokens
+
+
+def make_contexts(count: int, seed: int = 42) -> List[Tuple[Dict[str, Any], Optional[str]]]:
+    """生成字段齐全的模拟分析上下文（与 StockAnalysisPipeline 增强后的上下文结构一致）"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        close = round(rng.uniform(5, 200), 2)
+        ma5, ma10, ma20 = (round(close * rng.uniform(0.9, 1.05), 2) for _ in range(3))
+        bias_ma5 = (close - ma5) / ma5 * 100
+        context = {
+            'code': f"{600000 + i * 7:06d}",
+            'stock_name': f"模拟股票{i}",
+            'date': '2025-06-30',
+            'today': {
+                'close': close, 'open': round(close * rng.uniform(0.97, 1.03), 2),
+                'high': round(close * 1.03, 2), 'low': round(close * 0.97, 2),
+                'pct_chg': round(rng.uniform(-5, 5), 2), 'volume': rng.randint(10**6, 10**8),
+                'amount': rng.uniform(10**7, 10**10), 'ma5': ma5, 'ma10': ma10, 'ma20': ma20,
+            },
+            'ma_status': rng.choice(['多头排列 📈', '空头排列 📉', '震荡整理 ↔️']),
+            'realtime': {
+                'price': close, 'ma5': ma5, 'ma10': ma10, 'ma20': ma20,
+                'volume_ratio': round(rng.uniform(0.5, 3), 2), 'volume_ratio_desc': '正常',
+                'turnover_rate': round(rng.uniform(0.5, 8), 2), 'pe_ratio': round(rng.uniform(8, 60), 2),
+                'pb_ratio': round(rng.uniform(0.8, 10), 2), 'total_mv': rng.uniform(10**9, 10**12),
+                'circ_mv': rng.uniform(10**9, 10**12), 'change_60d': round(rng.uniform(-30, 40), 2),
+            },
+            'chip': {
+                'profit_ratio': rng.uniform(0.1, 0.95), 'avg_cost': round(close * rng.uniform(0.8, 1.1), 2),
+                'concentration_90': rng.uniform(0.05, 0.3), 'concentration_70': rng.uniform(0.03, 0.2),
+                'chip_status': rng.choice(['集中', '分散']),
+            },
+            'trend_analysis': {
+                'trend_status': rng.choice(['多头排列', '弱势多头', '盘整', '空头排列']),
+                'ma_alignment': 'MA5>MA10>MA20', 'trend_strength': rng.randint(20, 90),
+                'bias_ma5': bias_ma5, 'bias_ma10': (close - ma10) / ma10 * 100,
+                'volume_status': rng.choice(['缩量回调', '放量上涨', '量能正常']), 'volume_trend': '量能温和',
+                'buy_signal': rng.choice(['买入', '持有', '观望']), 'signal_score': rng.randint(30, 85),
+                'signal_reasons': ['多头排列，趋势向上', '缩量回踩 MA5 支撑'],
+                'risk_factors': ['乖离率偏高'] if bias_ma5 > 5 else [],
+            },
+        }
+        news = None if i % 3 == 0 else (
+            f"1. {context['stock_name']}发布半年度业绩预告，净利润同比增长 25%-35%（利好）\n"
+            f"2. 股东计划 3 个月内减持不超过 1% 股份（利空）\n"
+            f"3. 行业政策：相关部门出台支持措施（中性偏利好）"
+        )
+        items.append((context, news))
+    return items
+
+
+def make_agent(prompt_format: str, **overrides) -> DecisionAgent:
+    config = dataclasses.replace(get_config(), decision_prompt_format=prompt_format, **overrides)
+    return DecisionAgent(config=config)
+
+
+def measure_tokens(items: List[Tuple[Dict[str, Any], Optional[str]]]) -> None:
+    method, count = make_token_counter()
+    print(f"Token 计数: {method}, {len(items)} 只股票")
+    print(f"{'格式':<10}{'系统提示词':>10}{'单股Prompt均值':>16}{'单次请求合计':>16}{'缓存系统提示词后':>18}")
+    baseline = None
+    for prompt_format in FORMATS:
+        agent = make_agent(prompt_format)
+        system_tokens = count(agent.SYSTEM_PROMPT)
+        prompt_tokens = statistics.mean(
+            count(agent._format_prompt(context, context['stock_name'], news)) for context, news in items
+        )
+        total = system_tokens + prompt_tokens
+        baseline = baseline or (total, prompt_tokens)
+        print(f"{prompt_format:<10}{system_tokens:>10}{prompt_tokens:>16.0f}"
+              f"{f'{total:.0f} ({total / baseline[0]:.0%})':>16}"
+              f"{f'{prompt_tokens:.0f} ({prompt_tokens / baseline[1]:.0%})':>18}")
+
+
+def run_live(items: List[Tuple[Dict[str, Any], Optional[str]]]) -> None:
+    request_delay = get_config().gemini_request_delay
+    outputs: Dict[str, List[AnalysisResult]] = {}
+    for prompt_format in FORMATS:
+        # 请求间隔在计时之外等待
+        agent = make_agent(prompt_format, gemini_request_delay=0)
+        if not agent.is_available():
+            print("未配置可用的 LLM API，跳过 --live 对比")
+            return
+        latencies, results = [], []
+        for context, news in items:
+            start = time.perf_counter()
+            results.append(agent.analyze(context, news, use_cache=False))
+            latencies.append(time.perf_counter() - start)
+            time.sleep(request_delay)
+        outputs[prompt_format] = results
+        ok = sum(r.success for r in results)
+        print(f"{prompt_format:<10} 成功 {ok}/{len(results)}, 耗时 p50 {statistics.median(latencies):.2f}s, "
+              f"合计 {sum(latencies):.1f}s, 响应均长 {statistics.mean(len(r.raw_response or '') for r in results):.0f} 字符")
+
+    pairs = [(a, b) for a, b in zip(outputs['markdown'], outputs['compact']) if a.success and b.success]
+    if not pairs:
+        return
+    same_advice = sum(a.operation_advice == b.operation_advice for a, b in pairs)
+    same_trend = sum(a.trend_prediction == b.trend_prediction for a, b in pairs)
+    score_diff = statistics.mean(abs(a.sentiment_score - b.sentiment_score) for a, b in pairs)
+    print(f"输出一致性（{len(pairs)} 只）: 操作建议 {same_advice / len(pairs):.0%}, "
+          f"趋势预测 {same_trend / len(pairs):.0%}, 评分平均差 {score_diff:.1f}")
+    for a, b in pairs:
+        mark = '' if a.operation_advice == b.operation_advice else '  ←'
+        print(f"  {a.code}: markdown {a.operation_advice}/{a.trend_prediction}/{a.sentiment_score}"
+              f"  compact {b.operation_advice}/{b.trend_prediction}/{b.sentiment_score}{mark}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='决策 Agent 提示词格式基准测试')
+    parser.add_argument('--stocks', type=int, default=10, help='模拟股票数量')
+    parser.add_argument('--live', action='store_true', help='实际调用模型比较耗时与输出（消耗 API 额度）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    items = make_contexts(args.stocks)
+    measure_tokens(items)
+    if args.live:
+        run_live(items)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
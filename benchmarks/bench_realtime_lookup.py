@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+基准测试 - 实时行情单股查询
+===================================
+
+对比两种查询方式（均不含网络下载，快照已在缓存中）：
+1. 旧路径：对 ~5000 行快照 DataFrame 做 df[df['代码'] == code] 布尔筛选，
+   再逐字段 row.get + safe_float 构建 RealtimeQuote（每次 O(N)）
+2. 新路径：AkshareFetcher.get_realtime_quote，快照填充后一次性构建全部 RealtimeQuote，
+   每次查询为一次字典访问（O(1)），首次查询包含构建耗时
+
+使用方法：
+    python benchmarks/bench_realtime_lookup.py                    # 默认 5000 行快照，500 次查询
+    python benchmarks/bench_realtime_lookup.py --rows 5000 --lookups 2000
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_provider.akshare_fetcher import (  # noqa: E402
+    A_SPOT_SOURCE,
+    AkshareFetcher,
+    RealtimeQuote,
+)
+from data_provider.spot_cache import get_spot_cache  # noqa: E402
+
+
+def make_spot(rows: int, seed: int = 42) -> pd.DataFrame:
+    """生成与 ak.stock_zh_a_spot_em 列名一致的模拟快照"""
+    rng = np.random.default_rng(seed)
+    codes = [f"{600000 + i:06d}" if i % 2 else f"{i:06d}" for i in range(rows)]
+    price = rng.uniform(2, 200, rows).round(2)
+    return pd.DataFrame({
+        '序号': np.arange(1, rows + 1),
+        '代码': codes,
+        '名称': [f"股票{i}" for i in range(rows)],
+        '最新价': price,
+        '涨跌幅': rng.normal(0, 2, rows).round(2),
+        '涨跌额': rng.normal(0, 0.5, rows).round(2),
+        '成交量': rng.integers(1_000, 10_000_000, rows),
+        '成交额': rng.uniform(1e6, 1e10, rows),
+        '振幅': rng.uniform(0, 10, rows).round(2),
+        '最高': price * 1.02,
+        '最低': price * 0.98,
+        '今开': price,
+        '昨收': price,
+        '量比': rng.uniform(0.2, 5, rows).round(2),
+        '换手率': rng.uniform(0, 20, rows).round(2),
+        '市盈率-动态': rng.uniform(-50, 200, rows).round(2),
+        '市净率': rng.uniform(0.5, 20, rows).round(2),
+        '总市值': rng.uniform(1e9, 1e12, rows),
+        '流通市值': rng.uniform(1e9, 1e12, rows),
+        '60日涨跌幅': rng.normal(0, 20, rows).round(2),
+        '52周最高': price * 1.5,
+        '52周最低': price * 0.5,
+    })
+
+
+def legacy_lookup(df: pd.DataFrame, stock_code: str):
+    """旧实现：布尔筛选 + 逐字段 safe_float"""
+    row = df[df['代码'] == stock_code]
+    if row.empty:
+        return None
+    row = row.iloc[0]
+
+    def safe_float(val, default=0.0):
+        try:
+            if pd.isna(val):
+                return default
+            return float(val)
+        except Exception:
+            return default
+
+    return RealtimeQuote(
+        code=stock_code,
+        name=str(row.get('名称', '')),
+        price=safe_float(row.get('最新价')),
+        change_pct=safe_float(row.get('涨跌幅')),
+        change_amount=safe_float(row.get('涨跌额')),
+        volume_ratio=safe_float(row.get('量比')),
+        turnover_rate=safe_float(row.get('换手率')),
+        amplitude=safe_float(row.get('振幅')),
+        pe_ratio=safe_float(row.get('市盈率-动态')),
+        pb_ratio=safe_float(row.get('市净率')),
+        total_mv=safe_float(row.get('总市值')),
+        circ_mv=safe_float(row.get('流通市值')),
+        change_60d=safe_float(row.get('60日涨跌幅')),
+        high_52w=safe_float(row.get('52周最高')),
+        low_52w=safe_float(row.get('52周最低')),
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='实时行情单股查询基准测试')
+    parser.add_argument('--rows', type=int, default=5000, help='快照行数')
+    parser.add_argument('--lookups', type=int, default=500, help='查询次数')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    df = make_spot(args.rows)
+    rng = np.random.default_rng(0)
+    targets = rng.choice(df['代码'].to_numpy(), size=args.lookups).tolist()
+
+    # 预先填充共享快照缓存，排除网络耗时
+    cache = get_spot_cache()
+    cache.ttl = 3600
+    cache.invalidate(A_SPOT_SOURCE)
+    cache.get(A_SPOT_SOURCE, lambda: df)
+    fetcher = AkshareFetcher()
+
+    start = time.perf_counter()
+    legacy = [legacy_lookup(df, code) for code in targets]
+    t_legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [fetcher.get_realtime_quote(code) for code in targets]
+    t_indexed = time.perf_counter() - start
+
+    assert legacy == indexed, "新旧路径结果不一致"
+
+    print(f"快照 {args.rows} 行，查询 {args.lookups} 次")
+    print(f"布尔筛选: {t_legacy * 1000:9.1f} ms  ({t_legacy / args.lookups * 1e6:8.1f} us/次)")
+    print(f"索引查询: {t_indexed * 1000:9.1f} ms  ({t_indexed / args.lookups * 1e6:8.1f} us/次，含一次性构建)")
+    print(f"加速比: {t_legacy / t_indexed:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
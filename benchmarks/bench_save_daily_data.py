@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+基准测试 - DatabaseManager.save_daily_data
+===================================
+
+对比两种写入路径：
+1. 逐行路径：iterrows + 每行一次 SELECT 再 INSERT/UPDATE（_save_daily_data_rowwise）
+2. 批量路径：向量化转换 + 单条 INSERT ... ON CONFLICT DO UPDATE（upsert_daily_data）
+
+每种规模分别测量「全新插入」和「全部更新」两轮，使用临时 SQLite 数据库，不影响本地数据。
+
+使用方法：
+    python benchmarks/bench_save_daily_data.py                  # 默认 1000 / 100000 行
+    python benchmarks/bench_save_daily_data.py --rows 1000 5000
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from storage import DatabaseManager  # noqa: E402
+
+
+def make_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    """生成 rows 行连续日线数据（按自然日递增，保证 (code, date) 唯一）"""
+    rng = np.random.default_rng(seed)
+    close = 10 + np.cumsum(rng.normal(0, 0.1, rows))
+    volume = rng.integers(1_000_000, 5_000_000, rows)
+    df = pd.DataFrame({
+        'date': pd.date_range('1980-01-01', periods=rows, freq='D'),
+        'open': close * 0.99,
+        'high': close * 1.01,
+        'low': close * 0.98,
+        'close': close,
+        'volume': volume,
+        'amount': volume * close,
+        'pct_chg': rng.normal(0, 1, rows),
+    })
+    df['ma5'] = df['close'].rolling(5, min_periods=1).mean().round(2)
+    df['ma10'] = df['close'].rolling(10, min_periods=1).mean().round(2)
+    df['ma20'] = df['close'].rolling(20, min_periods=1).mean().round(2)
+    df['volume_ratio'] = 1.0
+    return df
+
+
+def open_db(path: Path) -> DatabaseManager:
+    """在临时路径上创建独立的 DatabaseManager"""
+    DatabaseManager.reset_instance()
+    return DatabaseManager(db_url=f"sqlite:///{path}")
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def bench(rows: int, workdir: Path) -> None:
+    df = make_frame(rows)
+    print(f"\n=== {rows} 行 ===")
+
+    for label, method in (("逐行", "_save_daily_data_rowwise"), ("批量", "upsert_daily_data")):
+        db = open_db(workdir / f"bench_{method}_{rows}.db")
+        write = getattr(db, method)
+        t_insert, counts_insert = timed(write, df, 'BENCH', 'Benchmark')
+        t_update, counts_update = timed(write, df, 'BENCH', 'Benchmark')
+        print(f"{label:<4} 插入: {t_insert:8.3f}s {str(counts_insert):>16} | "
+              f"更新: {t_update:8.3f}s {str(counts_update):>16}")
+    DatabaseManager.reset_instance()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='save_daily_data 逐行/批量路径基准测试')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000], help='测试规模（行数）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            bench(rows, Path(tmp))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+基准测试 - 趋势分析批量向量化
+===================================
+
+对比两种方式分析整个股票池（均不含数据读取，行情已在内存中）：
+1. 逐只分析：对每只股票的 DataFrame 调用 StockTrendAnalyzer.analyze
+   （sort_values、copy、rolling、iloc 均按股票重复执行）
+2. 批量分析：对 日期 × 代码 的宽表面板调用 StockTrendAnalyzer.analyze_batch，
+   均线、乖离率、量比、状态分类和评分一次性以数组运算完成
+
+使用方法：
+    python benchmarks/bench_trend_batch.py                       # 默认 500 与 5000 只股票，120 个交易日
+    python benchmarks/bench_trend_batch.py --codes 500 5000 --days 250
+"""
+
+import argparse
+import logging
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from stock_analyzer import StockTrendAnalyzer  # noqa: E402
+
+
+def make_panel(codes: int, days: int, seed: int = 42) -> Dict[str, pd.DataFrame]:
+    """生成随机游走行情面板，部分股票带停牌缺口和上市前缺失"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2025-01-02', periods=days)
+    columns = [f"{600000 + i:06d}" if i % 2 else f"{i:06d}" for i in range(codes)]
+
+    returns = rng.normal(rng.normal(0, 0.005, codes), 0.02, (days, codes))
+    close = 10 * np.exp(np.cumsum(returns, axis=0))
+    high = close * (1 + rng.uniform(0, 0.03, (days, codes)))
+    volume = rng.uniform(1e5, 1e7, (days, codes))
+
+    # 约 5% 的股票停牌若干天，约 2% 的股票为次新股
+    for j in rng.choice(codes, size=codes // 20, replace=False):
+        start = rng.integers(0, days - 10)
+        close[start:start + rng.integers(1, 8), j] = np.nan
+    for j in rng.choice(codes, size=codes // 50, replace=False):
+        close[:rng.integers(days // 2, days - 5), j] = np.nan
+
+    return {
+        'close': pd.DataFrame(close, index=dates, columns=columns),
+        'high': pd.DataFrame(high, index=dates, columns=columns),
+        'volume': pd.DataFrame(volume, index=dates, columns=columns),
+    }
+
+
+def split_panel(panel: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """把面板拆成逐只分析所需的单股 DataFrame（不计入耗时）"""
+    close = panel['close']
+    frames = {}
+    for code in close.columns:
+        mask = close[code].notna().to_numpy()
+        frames[code] = pd.DataFrame({
+            'date': close.index[mask],
+            'close': close[code].to_numpy()[mask],
+            'high': panel['high'][code].to_numpy()[mask],
+            'volume': panel['volume'][code].to_numpy()[mask],
+        })
+    return frames
+
+
+def assert_same(single, batch) -> None:
+    """逐字段比较两种方式的结果（浮点字段允许求和顺序带来的末位误差）"""
+    for code, expected in single.items():
+        left, right = expected.to_dict(), batch[code].to_dict()
+        for key, value in left.items():
+            if isinstance(value, float):
+                assert math.isclose(value, right[key], rel_tol=1e-9, abs_tol=1e-9), (code, key)
+            else:
+                assert value == right[key], (code, key)
+
+
+def run(codes: int, days: int) -> None:
+    panel = make_panel(codes, days)
+    frames = split_panel(panel)
+    analyzer = StockTrendAnalyzer()
+
+    start = time.perf_counter()
+    single = {code: analyzer.analyze(df, code) for code, df in frames.items()}
+    t_single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = analyzer.analyze_batch(panel)
+    t_batch = time.perf_counter() - start
+
+    assert_same(single, batch)
+
+    print(f"{codes} 只股票 × {days} 个交易日")
+    print(f"  逐只分析: {t_single * 1000:9.1f} ms  ({t_single / codes * 1e6:8.1f} us/只)")
+    print(f"  批量分析: {t_batch * 1000:9.1f} ms  ({t_batch / codes * 1e6:8.1f} us/只)")
+    print(f"  加速比: {t_single / t_batch:.1f}x")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='趋势分析批量向量化基准测试')
+    parser.add_argument('--codes', type=int, nargs='+', default=[500, 5000], help='股票数量（可多个）')
+    parser.add_argument('--days', type=int, default=120, help='交易日数')
+    args = parser.parse_args()
+
+    # 次新股数据不足的告警不影响计时
+    logging.basicConfig(level=logging.ERROR)
+
+    for codes in args.codes:
+        run(codes, args.days)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
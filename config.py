@@ -48,6 +48,8 @@ class Config:
     gemini_request_delay: float = 2.0  # 请求间隔（秒）
     gemini_max_retries: int = 5  # 最大重试次数
     gemini_retry_delay: float = 5.0  # 重试基础延时（秒）
+    gemini_context_cache: bool = False  # 是否把决策 Agent 系统提示词放入 Gemini 上下文缓存（按模型创建一次）
+    gemini_context_cache_ttl: int = 3600  # 上下文缓存有效期（秒），到期前自动重建
     
     # OpenAI 兼容 API（备选，当 Gemini 不可用时使用）
     openai_api_key: Optional[str] = None
@@ -95,13 +97,42 @@ class Config:
     # === 数据库配置 ===
     database_path: str = "./data/stock_analysis.db"
     
+    # 列式行情存储（Parquet，需安装 pyarrow）
+    bar_store_enabled: bool = False  # 是否将日线同步写入列式存储，供回测/批量读取
+    bar_store_dir: str = "./data/bars"  # 存储目录，按 {code}/{year}.parquet 分区
+    
+    # 流式指标引擎状态（均线滚动和、量比基准），每轮运行结束时保存
+    indicator_state_path: str = "./data/indicator_state.json"
+    
     # === 日志配置 ===
     log_dir: str = "./logs"  # 日志文件目录
     log_level: str = "INFO"  # 日志级别
     
     # === 系统配置 ===
     max_workers: int = 3  # 低并发防封禁
+    pipeline_mode: str = "thread"  # 调度模式：thread（线程池）/ async（asyncio）/ staged（分阶段流水线）
+    stage_data_workers: int = 3    # 数据阶段并发（日线/实时行情/筹码，受数据源令牌桶限流）
+    stage_enrich_workers: int = 2  # staged 模式：实时行情/筹码/趋势分析阶段并发
+    stage_search_workers: int = 3  # 新闻搜索阶段并发（staged 模式含新闻摘要）
+    stage_llm_workers: int = 3     # LLM 阶段并发（async 模式含新闻摘要）
+    stage_notify_workers: int = 1  # 保存/交易/推送阶段并发
+    stage_queue_size: int = 10     # staged 模式：阶段间队列容量（满时上游阻塞）
+    stage_report_interval: float = 30.0  # staged 模式：队列状态日志间隔（秒，0 不输出）
     debug: bool = False
+    realtime_cache_ttl: float = 60.0  # 全市场实时行情快照缓存有效期（秒），各模块共享
+    
+    # === 数据源限流（按主机共享的令牌桶，所有线程/实例合计）===
+    eastmoney_rate_limit_per_minute: float = 30.0  # 东方财富（akshare/efinance）每分钟请求数
+    eastmoney_rate_limit_burst: float = 2.0        # 东方财富允许的突发请求数
+    tushare_rate_limit_per_minute: float = 80.0    # Tushare 每分钟请求数（免费配额 80）
+    rate_limit_jitter: float = 0.5                 # 拿到令牌后的随机延迟上限（秒），打散请求时间点
+    
+    # === 数据源自适应路由 ===
+    source_circuit_failure_threshold: int = 3  # 连续失败多少次后熔断该数据源（被限流时立即熔断）
+    source_circuit_cooldown: float = 120.0     # 熔断冷却时间（秒），之后放行一次试探请求
+    fetch_hedge_enabled: bool = False          # 是否启用对冲请求（主数据源超时未返回时并行请求下一个数据源）
+    fetch_hedge_percentile: float = 90.0       # 对冲等待时间取主数据源历史耗时的该分位数
+    fetch_hedge_delay: float = 3.0             # 对冲等待时间下限（秒），样本不足时直接使用
     
     # === 定时任务配置 ===
     schedule_enabled: bool = False            # 是否启用定时任务
@@ -113,6 +144,8 @@ class Config:
     trading_broker: str = "paper"             # 使用的经纪商适配器名称
     trading_capital: float = 100000.0         # 交易账户初始资金 (模拟或实盘)
     trading_max_position_per_stock: float = 20000.0 # 单只股票的最大持仓金额
+    backtest_mode: str = "signal"             # 回测模式: signal (趋势信号驱动，不调用 LLM), llm (逐日调用 LLM 分析，较慢)
+    backtest_persist_trades: bool = False     # 回测结束后是否把成交日志一次性写入数据库
 
     # === 实盘交易配置 (Real Trading Configs) ===
     real_broker_type: Optional[str] = None # 实际经纪商类型，如 'guosen', 'htsc', 'tiger', 'ths_web'
@@ -129,6 +162,30 @@ class Config:
     summarizer_api_key: Optional[str] = None  # 摘要 Agent 的 API Key (如果与主模型不同)
     summarizer_base_url: Optional[str] = None # 摘要 Agent 的 API Base URL (如果与主模型不同)
 
+    # 工作流条件路由
+    summarize_min_tokens: int = 500           # 原始新闻估算 Token 数低于该值时不调用摘要 Agent，直接交给决策 Agent（0 为总是摘要）
+    intel_cache_ttl: float = 1800.0           # 新闻情报缓存有效期（秒），有效期内重复分析同一只股票时跳过搜索（0 为不缓存）
+    rule_shortcut_enabled: bool = False       # 趋势信号明确时是否跳过搜索和 LLM，直接按规则给出结论
+    rule_shortcut_buy_score: int = 85         # 规则直出的买入条件：信号为强烈买入且评分不低于该值
+    rule_shortcut_sell_score: int = 20        # 规则直出的卖出条件：信号为强烈卖出且评分不高于该值
+
+    # LLM 响应缓存（决策/摘要请求内容完全相同时直接复用上次响应，不消耗额度）
+    llm_cache_enabled: bool = True                # 是否启用 LLM 响应缓存
+    llm_cache_path: str = "./data/llm_cache.db"   # 缓存 SQLite 文件路径
+    llm_cache_ttl: float = 86400.0                # 缓存有效期（秒）
+    llm_cache_max_entries: int = 5000             # 最多缓存条目数，超出按最久未使用淘汰
+
+    # 决策 Agent 流式输出：单股推送模式下核心结论（评分/操作建议/趋势）到达后先行推送，交易仍按完整结果执行
+    llm_streaming: bool = False
+
+    # 决策 Agent 提示词格式：markdown（表格版决策仪表盘请求）/ compact（键=值紧凑格式，固定说明并入系统提示词）
+    decision_prompt_format: str = "markdown"
+
+    # 批量决策（多只股票合并为一次决策请求，减少请求间隔和限流等待）
+    decision_batch_size: int = 1                  # 每次决策请求最多包含的股票数（1 为逐只请求）
+    decision_batch_max_prompt_chars: int = 30000  # 单次批量请求的各股数据总长度上限（字符）
+    decision_batch_max_output_tokens: int = 16384 # 批量请求的最大输出 Token，同时限制每批股票数
+
     # === WebUI 配置 ===
     webui_enabled: bool = False
     webui_host: str = "127.0.0.1"
@@ -199,6 +256,8 @@ class Config:
             gemini_request_delay=float(os.getenv('GEMINI_REQUEST_DELAY', '2.0')),
             gemini_max_retries=int(os.getenv('GEMINI_MAX_RETRIES', '5')),
             gemini_retry_delay=float(os.getenv('GEMINI_RETRY_DELAY', '5.0')),
+            gemini_context_cache=os.getenv('GEMINI_CONTEXT_CACHE', 'false').lower() == 'true',
+            gemini_context_cache_ttl=int(os.getenv('GEMINI_CONTEXT_CACHE_TTL', '3600')),
             openai_api_key=os.getenv('OPENAI_API_KEY'),
             openai_base_url=os.getenv('OPENAI_BASE_URL'),
             openai_model=os.getenv('OPENAI_MODEL', 'gpt-4o-mini'),
@@ -220,10 +279,31 @@ class Config:
             feishu_max_bytes=int(os.getenv('FEISHU_MAX_BYTES', '20000')),
             wechat_max_bytes=int(os.getenv('WECHAT_MAX_BYTES', '4000')),
             database_path=os.getenv('DATABASE_PATH', './data/stock_analysis.db'),
+            bar_store_enabled=os.getenv('BAR_STORE_ENABLED', 'false').lower() == 'true',
+            bar_store_dir=os.getenv('BAR_STORE_DIR', './data/bars'),
+            indicator_state_path=os.getenv('INDICATOR_STATE_PATH', './data/indicator_state.json'),
             log_dir=os.getenv('LOG_DIR', './logs'),
             log_level=os.getenv('LOG_LEVEL', 'INFO'),
             max_workers=int(os.getenv('MAX_WORKERS', '3')),
+            pipeline_mode=os.getenv('PIPELINE_MODE', 'thread').lower(),
+            stage_data_workers=int(os.getenv('STAGE_DATA_WORKERS', '3')),
+            stage_enrich_workers=int(os.getenv('STAGE_ENRICH_WORKERS', '2')),
+            stage_search_workers=int(os.getenv('STAGE_SEARCH_WORKERS', '3')),
+            stage_llm_workers=int(os.getenv('STAGE_LLM_WORKERS', '3')),
+            stage_notify_workers=int(os.getenv('STAGE_NOTIFY_WORKERS', '1')),
+            stage_queue_size=int(os.getenv('STAGE_QUEUE_SIZE', '10')),
+            stage_report_interval=float(os.getenv('STAGE_REPORT_INTERVAL', '30')),
             debug=os.getenv('DEBUG', 'false').lower() == 'true',
+            realtime_cache_ttl=float(os.getenv('REALTIME_CACHE_TTL', '60')),
+            eastmoney_rate_limit_per_minute=float(os.getenv('EASTMONEY_RATE_LIMIT', '30')),
+            eastmoney_rate_limit_burst=float(os.getenv('EASTMONEY_RATE_LIMIT_BURST', '2')),
+            tushare_rate_limit_per_minute=float(os.getenv('TUSHARE_RATE_LIMIT', '80')),
+            rate_limit_jitter=float(os.getenv('RATE_LIMIT_JITTER', '0.5')),
+            source_circuit_failure_threshold=int(os.getenv('SOURCE_CIRCUIT_FAILURES', '3')),
+            source_circuit_cooldown=float(os.getenv('SOURCE_CIRCUIT_COOLDOWN', '120')),
+            fetch_hedge_enabled=os.getenv('FETCH_HEDGE_ENABLED', 'false').lower() == 'true',
+            fetch_hedge_percentile=float(os.getenv('FETCH_HEDGE_PERCENTILE', '90')),
+            fetch_hedge_delay=float(os.getenv('FETCH_HEDGE_DELAY', '3')),
             schedule_enabled=os.getenv('SCHEDULE_ENABLED', 'false').lower() == 'true',
             schedule_time=os.getenv('SCHEDULE_TIME', '18:00'),
             market_review_enabled=os.getenv('MARKET_REVIEW_ENABLED', 'true').lower() == 'true',
@@ -236,6 +316,8 @@ class Config:
             trading_broker=os.getenv('TRADING_BROKER', 'paper'),
             trading_capital=float(os.getenv('TRADING_CAPITAL', '100000.0')),
             trading_max_position_per_stock=float(os.getenv('TRADING_MAX_POSITION_PER_STOCK', '20000.0')),
+            backtest_mode=os.getenv('BACKTEST_MODE', 'signal').lower(),
+            backtest_persist_trades=os.getenv('BACKTEST_PERSIST_TRADES', 'false').lower() == 'true',
 
             # === 实盘交易配置 (Real Trading Configs) ===
             real_broker_type=os.getenv('REAL_BROKER_TYPE'),
@@ -252,6 +334,20 @@ class Config:
             summarizer_model_type=os.getenv('SUMMARIZER_MODEL_TYPE', 'gemini'),
             summarizer_api_key=os.getenv('SUMMARIZER_API_KEY'),
             summarizer_base_url=os.getenv('SUMMARIZER_BASE_URL'),
+            summarize_min_tokens=int(os.getenv('SUMMARIZE_MIN_TOKENS', '500')),
+            intel_cache_ttl=float(os.getenv('INTEL_CACHE_TTL', '1800')),
+            rule_shortcut_enabled=os.getenv('RULE_SHORTCUT_ENABLED', 'false').lower() == 'true',
+            rule_shortcut_buy_score=int(os.getenv('RULE_SHORTCUT_BUY_SCORE', '85')),
+            rule_shortcut_sell_score=int(os.getenv('RULE_SHORTCUT_SELL_SCORE', '20')),
+            llm_cache_enabled=os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true',
+            llm_cache_path=os.getenv('LLM_CACHE_PATH', './data/llm_cache.db'),
+            llm_cache_ttl=float(os.getenv('LLM_CACHE_TTL', '86400')),
+            llm_cache_max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000')),
+            llm_streaming=os.getenv('LLM_STREAMING', 'false').lower() == 'true',
+            decision_prompt_format=os.getenv('DECISION_PROMPT_FORMAT', 'markdown').lower(),
+            decision_batch_size=int(os.getenv('DECISION_BATCH_SIZE', '1')),
+            decision_batch_max_prompt_chars=int(os.getenv('DECISION_BATCH_MAX_PROMPT_CHARS', '30000')),
+            decision_batch_max_output_tokens=int(os.getenv('DECISION_BATCH_MAX_OUTPUT_TOKENS', '16384')),
         )
     
     @classmethod
@@ -9,7 +9,7 @@ AkshareFetcher - 主数据源 (Priority 1)
 风险：爬虫机制易被反爬封禁
 
 防封禁策略：
-1. 每次请求前随机休眠 2-5 秒
+1. 东方财富全局令牌桶限流（与 efinance 共享，见 rate_limiter）
 2. 随机轮换 User-Agent
 3. 使用 tenacity 实现指数退避重试
 
@@ -21,7 +21,7 @@ AkshareFetcher - 主数据源 (Priority 1)
 import logging
 import random
 import time
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from typing import Optional, Dict, Any
 
@@ -35,6 +35,8 @@ from tenacity import (
 )
 
 from .base import BaseFetcher, DataFetchError, RateLimitError, STANDARD_COLUMNS
+from .rate_limiter import HOST_EASTMONEY, TokenBucket, get_rate_limiter
+from .spot_cache import build_records, get_spot_cache
 
 
 @dataclass
@@ -181,19 +183,37 @@ USER_AGENTS = [
 ]
 
 
-# 缓存实时行情数据（避免重复请求）
-_realtime_cache: Dict[str, Any] = {
-    'data': None,
-    'timestamp': 0,
-    'ttl': 60  # 60秒缓存有效期
+# 全市场行情快照在 spot_cache 中的标识（与 MarketAnalyzer 共享）
+A_SPOT_SOURCE = 'akshare_a_spot'
+ETF_SPOT_SOURCE = 'akshare_etf_spot'
+HK_SPOT_SOURCE = 'akshare_hk_spot'
+
+# 行情表列名 -> RealtimeQuote 字段（列名为 None 或列不存在时取 0）
+_A_SPOT_FIELDS = {
+    'price': '最新价',
+    'change_pct': '涨跌幅',
+    'change_amount': '涨跌额',
+    'volume_ratio': '量比',
+    'turnover_rate': '换手率',
+    'amplitude': '振幅',
+    'pe_ratio': '市盈率-动态',
+    'pb_ratio': '市净率',
+    'total_mv': '总市值',
+    'circ_mv': '流通市值',
+    'change_60d': '60日涨跌幅',
+    'high_52w': '52周最高',
+    'low_52w': '52周最低',
 }
+# ETF 通常无估值指标，接口也不提供 60 日涨跌幅
+_ETF_SPOT_FIELDS = {**_A_SPOT_FIELDS, 'pe_ratio': None, 'pb_ratio': None, 'change_60d': None}
+# 港股市盈率列名为「市盈率」，接口不提供 60 日涨跌幅
+_HK_SPOT_FIELDS = {**_A_SPOT_FIELDS, 'pe_ratio': '市盈率', 'change_60d': None}
+_SPOT_TEXT_FIELDS = {'name': '名称'}
 
-# ETF 实时行情缓存
-_etf_realtime_cache: Dict[str, Any] = {
-    'data': None,
-    'timestamp': 0,
-    'ttl': 60  # 60秒缓存有效期
-}
+
+def _quote_builder(fields: Dict[str, Optional[str]]):
+    """返回在快照上批量构建 {代码: RealtimeQuote} 的函数"""
+    return lambda snapshot: build_records(snapshot, RealtimeQuote, fields, text_fields=_SPOT_TEXT_FIELDS)
 
 
 def _is_etf_code(stock_code: str) -> bool:
@@ -246,7 +266,7 @@ class AkshareFetcher(BaseFetcher):
     数据来源：东方财富网爬虫
     
     关键策略：
-    - 每次请求前随机休眠 2.0-5.0 秒
+    - 每次请求前从东方财富全局令牌桶取令牌（所有线程、所有实例共享）
     - 随机 User-Agent 轮换
     - 失败后指数退避重试（最多3次）
     """
@@ -254,17 +274,14 @@ class AkshareFetcher(BaseFetcher):
     name = "AkshareFetcher"
     priority = 1
     
-    def __init__(self, sleep_min: float = 2.0, sleep_max: float = 5.0):
+    def __init__(self, rate_limiter: Optional[TokenBucket] = None):
         """
         初始化 AkshareFetcher
         
         Args:
-            sleep_min: 最小休眠时间（秒）
-            sleep_max: 最大休眠时间（秒）
+            rate_limiter: 限流器（可选，默认使用东方财富全局令牌桶）
         """
-        self.sleep_min = sleep_min
-        self.sleep_max = sleep_max
-        self._last_request_time: Optional[float] = None
+        self._rate_limiter = rate_limiter or get_rate_limiter(HOST_EASTMONEY)
     
     def _set_random_user_agent(self) -> None:
         """
@@ -286,22 +303,10 @@ class AkshareFetcher(BaseFetcher):
         """
         强制执行速率限制
         
-        策略：
-        1. 检查距离上次请求的时间间隔
-        2. 如果间隔不足，补充休眠时间
-        3. 然后再执行随机 jitter 休眠
+        从全局令牌桶取令牌：有令牌时立即放行，超速时阻塞到令牌补充，
+        总速率由 EASTMONEY_RATE_LIMIT 决定，与线程数、实例数无关
         """
-        if self._last_request_time is not None:
-            elapsed = time.time() - self._last_request_time
-            min_interval = self.sleep_min
-            if elapsed < min_interval:
-                additional_sleep = min_interval - elapsed
-                logger.debug(f"补充休眠 {additional_sleep:.2f} 秒")
-                time.sleep(additional_sleep)
-        
-        # 执行随机 jitter 休眠
-        self.random_sleep(self.sleep_min, self.sleep_max)
-        self._last_request_time = time.time()
+        self._rate_limiter.acquire()
     
     @retry(
         stop=stop_after_attempt(3),  # 最多重试3次
@@ -320,7 +325,7 @@ class AkshareFetcher(BaseFetcher):
         流程：
         1. 判断代码类型（股票/ETF）
         2. 设置随机 User-Agent
-        3. 执行速率限制（随机休眠）
+        3. 执行速率限制（全局令牌桶）
         4. 调用对应的 akshare API
         5. 处理返回数据
         """
@@ -578,83 +583,20 @@ class AkshareFetcher(BaseFetcher):
         数据来源：ak.stock_zh_a_spot_em()
         包含：量比、换手率、市盈率、市净率、总市值、流通市值等
         """
-        import akshare as ak
-        
         try:
-            # 检查缓存
-            current_time = time.time()
-            if (_realtime_cache['data'] is not None and 
-                current_time - _realtime_cache['timestamp'] < _realtime_cache['ttl']):
-                df = _realtime_cache['data']
-                logger.debug(f"[缓存命中] 使用缓存的A股实时行情数据")
-            else:
-                last_error: Optional[Exception] = None
-                df = None
-                for attempt in range(1, 3):
-                    try:
-                        # 防封禁策略
-                        self._set_random_user_agent()
-                        self._enforce_rate_limit()
-
-                        logger.info(f"[API调用] ak.stock_zh_a_spot_em() 获取A股实时行情... (attempt {attempt}/2)")
-                        import time as _time
-                        api_start = _time.time()
-
-                        df = ak.stock_zh_a_spot_em()
-
-                        api_elapsed = _time.time() - api_start
-                        logger.info(f"[API返回] ak.stock_zh_a_spot_em 成功: 返回 {len(df)} 只股票, 耗时 {api_elapsed:.2f}s")
-                        break
-                    except Exception as e:
-                        last_error = e
-                        logger.warning(f"[API错误] ak.stock_zh_a_spot_em 获取失败 (attempt {attempt}/2): {e}")
-                        time.sleep(min(2 ** attempt, 5))
-
-                # 更新缓存：成功缓存数据；失败也缓存空数据，避免同一轮任务对同一接口反复请求
-                if df is None:
-                    logger.error(f"[API错误] ak.stock_zh_a_spot_em 最终失败: {last_error}")
-                    df = pd.DataFrame()
-                _realtime_cache['data'] = df
-                _realtime_cache['timestamp'] = current_time
-
-            if df is None or df.empty:
+            # 共享快照缓存：多线程同时未命中时只下载一次；失败也缓存空快照，避免反复请求
+            snapshot = get_spot_cache().get(A_SPOT_SOURCE, self.load_a_spot)
+
+            if snapshot.empty:
                 logger.warning(f"[实时行情] A股实时行情数据为空，跳过 {stock_code}")
                 return None
             
-            # 查找指定股票
-            row = df[df['代码'] == stock_code]
-            if row.empty:
+            # 查找指定股票：快照填充后一次性构建全部 RealtimeQuote，之后每次查询为字典访问
+            quote = snapshot.view('realtime_quote', _quote_builder(_A_SPOT_FIELDS)).get(stock_code)
+            if quote is None:
                 logger.warning(f"[API返回] 未找到股票 {stock_code} 的实时行情")
                 return None
-            
-            row = row.iloc[0]
-            
-            # 安全获取字段值
-            def safe_float(val, default=0.0):
-                try:
-                    if pd.isna(val):
-                        return default
-                    return float(val)
-                except:
-                    return default
-            
-            quote = RealtimeQuote(
-                code=stock_code,
-                name=str(row.get('名称', '')),
-                price=safe_float(row.get('最新价')),
-                change_pct=safe_float(row.get('涨跌幅')),
-                change_amount=safe_float(row.get('涨跌额')),
-                volume_ratio=safe_float(row.get('量比')),
-                turnover_rate=safe_float(row.get('换手率')),
-                amplitude=safe_float(row.get('振幅')),
-                pe_ratio=safe_float(row.get('市盈率-动态')),
-                pb_ratio=safe_float(row.get('市净率')),
-                total_mv=safe_float(row.get('总市值')),
-                circ_mv=safe_float(row.get('流通市值')),
-                change_60d=safe_float(row.get('60日涨跌幅')),
-                high_52w=safe_float(row.get('52周最高')),
-                low_52w=safe_float(row.get('52周最低')),
-            )
+            quote = replace(quote)  # 返回副本，避免调用方修改共享对象
             
             logger.info(f"[实时行情] {stock_code} {quote.name}: 价格={quote.price}, 涨跌={quote.change_pct}%, "
                        f"量比={quote.volume_ratio}, 换手率={quote.turnover_rate}%, "
@@ -678,83 +620,20 @@ class AkshareFetcher(BaseFetcher):
         Returns:
             RealtimeQuote 对象，获取失败返回 None
         """
-        import akshare as ak
-        
         try:
-            # 检查缓存
-            current_time = time.time()
-            if (_etf_realtime_cache['data'] is not None and 
-                current_time - _etf_realtime_cache['timestamp'] < _etf_realtime_cache['ttl']):
-                df = _etf_realtime_cache['data']
-                logger.debug(f"[缓存命中] 使用缓存的ETF实时行情数据")
-            else:
-                last_error: Optional[Exception] = None
-                df = None
-                for attempt in range(1, 3):
-                    try:
-                        # 防封禁策略
-                        self._set_random_user_agent()
-                        self._enforce_rate_limit()
-
-                        logger.info(f"[API调用] ak.fund_etf_spot_em() 获取ETF实时行情... (attempt {attempt}/2)")
-                        import time as _time
-                        api_start = _time.time()
-
-                        df = ak.fund_etf_spot_em()
-
-                        api_elapsed = _time.time() - api_start
-                        logger.info(f"[API返回] ak.fund_etf_spot_em 成功: 返回 {len(df)} 只ETF, 耗时 {api_elapsed:.2f}s")
-                        break
-                    except Exception as e:
-                        last_error = e
-                        logger.warning(f"[API错误] ak.fund_etf_spot_em 获取失败 (attempt {attempt}/2): {e}")
-                        time.sleep(min(2 ** attempt, 5))
-
-                if df is None:
-                    logger.error(f"[API错误] ak.fund_etf_spot_em 最终失败: {last_error}")
-                    df = pd.DataFrame()
-                _etf_realtime_cache['data'] = df
-                _etf_realtime_cache['timestamp'] = current_time
-
-            if df is None or df.empty:
+            # 共享快照缓存（同 A 股）
+            snapshot = get_spot_cache().get(ETF_SPOT_SOURCE, self.load_etf_spot)
+
+            if snapshot.empty:
                 logger.warning(f"[实时行情] ETF实时行情数据为空，跳过 {stock_code}")
                 return None
             
-            # 查找指定 ETF
-            row = df[df['代码'] == stock_code]
-            if row.empty:
+            # 查找指定 ETF（预构建 RealtimeQuote，部分字段 ETF 不支持，取默认值）
+            quote = snapshot.view('realtime_quote', _quote_builder(_ETF_SPOT_FIELDS)).get(stock_code)
+            if quote is None:
                 logger.warning(f"[API返回] 未找到 ETF {stock_code} 的实时行情")
                 return None
-            
-            row = row.iloc[0]
-            
-            # 安全获取字段值
-            def safe_float(val, default=0.0):
-                try:
-                    if pd.isna(val):
-                        return default
-                    return float(val)
-                except:
-                    return default
-            
-            # ETF 行情数据构建（部分字段 ETF 可能不支持，使用默认值）
-            quote = RealtimeQuote(
-                code=stock_code,
-                name=str(row.get('名称', '')),
-                price=safe_float(row.get('最新价')),
-                change_pct=safe_float(row.get('涨跌幅')),
-                change_amount=safe_float(row.get('涨跌额')),
-                volume_ratio=safe_float(row.get('量比', 0)),  # ETF 可能无量比
-                turnover_rate=safe_float(row.get('换手率')),
-                amplitude=safe_float(row.get('振幅')),
-                pe_ratio=0.0,  # ETF 通常无市盈率
-                pb_ratio=0.0,  # ETF 通常无市净率
-                total_mv=safe_float(row.get('总市值', 0)),
-                circ_mv=safe_float(row.get('流通市值', 0)),
-                change_60d=0.0,  # ETF 接口可能不提供
-                high_52w=safe_float(row.get('52周最高', 0)),
-                low_52w=safe_float(row.get('52周最低', 0)),
-            )
+            quote = replace(quote)
             
             logger.info(f"[ETF实时行情] {stock_code} {quote.name}: 价格={quote.price}, 涨跌={quote.change_pct}%, "
                        f"换手率={quote.turnover_rate}%")
@@ -764,6 +643,53 @@ class AkshareFetcher(BaseFetcher):
             logger.error(f"[API错误] 获取 ETF {stock_code} 实时行情失败: {e}")
             return None
     
+    def load_a_spot(self) -> Optional[pd.DataFrame]:
+        """下载全部 A 股实时行情（ak.stock_zh_a_spot_em），供快照缓存调用"""
+        import akshare as ak
+        return self._download_spot(ak.stock_zh_a_spot_em, 'ak.stock_zh_a_spot_em', 'A股')
+    
+    def load_etf_spot(self) -> Optional[pd.DataFrame]:
+        """下载全部 ETF 实时行情（ak.fund_etf_spot_em），供快照缓存调用"""
+        import akshare as ak
+        return self._download_spot(ak.fund_etf_spot_em, 'ak.fund_etf_spot_em', 'ETF')
+    
+    def load_hk_spot(self) -> Optional[pd.DataFrame]:
+        """下载全部港股实时行情（ak.stock_hk_spot_em），供快照缓存调用"""
+        import akshare as ak
+        return self._download_spot(ak.stock_hk_spot_em, 'ak.stock_hk_spot_em', '港股', attempts=1)
+    
+    def _download_spot(self, fn, api_name: str, label: str, attempts: int = 2) -> Optional[pd.DataFrame]:
+        """
+        下载全市场行情表（带防封禁休眠与重试）
+        
+        Returns:
+            行情 DataFrame，最终失败返回 None
+        """
+        last_error: Optional[Exception] = None
+        for attempt in range(1, attempts + 1):
+            try:
+                # 防封禁策略
+                self._set_random_user_agent()
+                self._enforce_rate_limit()
+
+                logger.info(f"[API调用] {api_name}() 获取{label}实时行情... (attempt {attempt}/{attempts})")
+                import time as _time
+                api_start = _time.time()
+
+                df = fn()
+
+                api_elapsed = _time.time() - api_start
+                logger.info(f"[API返回] {api_name} 成功: 返回 {len(df)} 只{label}, 耗时 {api_elapsed:.2f}s")
+                return df
+            except Exception as e:
+                last_error = e
+                logger.warning(f"[API错误] {api_name} 获取失败 (attempt {attempt}/{attempts}): {e}")
+                if attempt < attempts:
+                    time.sleep(min(2 ** attempt, 5))
+
+        logger.error(f"[API错误] {api_name} 最终失败: {last_error}")
+        return None
+    
     def _get_hk_realtime_quote(self, stock_code: str) -> Optional[RealtimeQuote]:
         """
         获取港股实时行情数据
@@ -777,60 +703,22 @@ class AkshareFetcher(BaseFetcher):
         Returns:
             RealtimeQuote 对象，获取失败返回 None
         """
-        import akshare as ak
-        
         try:
-            # 防封禁策略
-            self._set_random_user_agent()
-            self._enforce_rate_limit()
-            
             # 确保代码格式正确（5位数字）
             code = stock_code.lower().replace('hk', '').zfill(5)
             
-            logger.info(f"[API调用] ak.stock_hk_spot_em() 获取港股实时行情...")
-            import time as _time
-            api_start = _time.time()
-            
-            df = ak.stock_hk_spot_em()
-            
-            api_elapsed = _time.time() - api_start
-            logger.info(f"[API返回] ak.stock_hk_spot_em 成功: 返回 {len(df)} 只港股, 耗时 {api_elapsed:.2f}s")
+            # 共享快照缓存（同 A 股）
+            snapshot = get_spot_cache().get(HK_SPOT_SOURCE, self.load_hk_spot)
+            if snapshot.empty:
+                logger.warning(f"[实时行情] 港股实时行情数据为空，跳过 {stock_code}")
+                return None
             
-            # 查找指定港股
-            row = df[df['代码'] == code]
-            if row.empty:
+            # 查找指定港股（预构建 RealtimeQuote，港股可能无量比/60日涨跌幅）
+            quote = snapshot.view('realtime_quote', _quote_builder(_HK_SPOT_FIELDS)).get(code)
+            if quote is None:
                 logger.warning(f"[API返回] 未找到港股 {code} 的实时行情")
                 return None
-            
-            row = row.iloc[0]
-            
-            # 安全获取字段值
-            def safe_float(val, default=0.0):
-                try:
-                    if pd.isna(val):
-                        return default
-                    return float(val)
-                except:
-                    return default
-            
-            # 港股行情数据构建
-            quote = RealtimeQuote(
-                code=stock_code,
-                name=str(row.get('名称', '')),
-                price=safe_float(row.get('最新价')),
-                change_pct=safe_float(row.get('涨跌幅')),
-                change_amount=safe_float(row.get('涨跌额')),
-                volume_ratio=safe_float(row.get('量比', 0)),  # 港股可能无量比
-                turnover_rate=safe_float(row.get('换手率', 0)),
-                amplitude=safe_float(row.get('振幅', 0)),
-                pe_ratio=safe_float(row.get('市盈率', 0)),  # 港股可能有市盈率
-                pb_ratio=safe_float(row.get('市净率', 0)),  # 港股可能有市净率
-                total_mv=safe_float(row.get('总市值', 0)),
-                circ_mv=safe_float(row.get('流通市值', 0)),
-                change_60d=0.0,  # 港股接口可能不提供
-                high_52w=safe_float(row.get('52周最高', 0)),
-                low_52w=safe_float(row.get('52周最低', 0)),
-            )
+            quote = replace(quote, code=stock_code)
             
             logger.info(f"[港股实时行情] {stock_code} {quote.name}: 价格={quote.price}, 涨跌={quote.change_pct}%, "
                        f"换手率={quote.turnover_rate}%")
@@ -16,10 +16,12 @@
 
 import logging
 import random
+import threading
 import time
 from abc import ABC, abstractmethod
-from datetime import datetime
-from typing import Optional, List, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 import numpy as np
@@ -30,6 +32,12 @@ from tenacity import (
     retry_if_exception_type,
 )
 
+from indicator_engine import IndicatorEngine
+from indicators import STORED_INDICATORS, get_indicator_registry
+
+if TYPE_CHECKING:
+    from .source_health import SourceHealthTracker
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -121,14 +129,7 @@ class BaseFetcher(ABC):
             标准化的 DataFrame，包含技术指标
         """
         # 计算日期范围
-        if end_date is None:
-            end_date = datetime.now().strftime('%Y-%m-%d')
-        
-        if start_date is None:
-            # 默认获取最近 30 个交易日（按日历日估算，多取一些）
-            from datetime import timedelta
-            start_dt = datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=days * 2)
-            start_date = start_dt.strftime('%Y-%m-%d')
+        start_date, end_date = self._resolve_date_range(start_date, end_date, days)
         
         logger.info(f"[{self.name}] 获取 {stock_code} 数据: {start_date} ~ {end_date}")
         
@@ -136,17 +137,8 @@ class BaseFetcher(ABC):
             # Step 1: 获取原始数据
             raw_df = self._fetch_raw_data(stock_code, start_date, end_date)
             
-            if raw_df is None or raw_df.empty:
-                raise DataFetchError(f"[{self.name}] 未获取到 {stock_code} 的数据")
-            
-            # Step 2: 标准化列名
-            df = self._normalize_data(raw_df, stock_code)
-            
-            # Step 3: 数据清洗
-            df = self._clean_data(df)
-            
-            # Step 4: 计算技术指标
-            df = self._calculate_indicators(df)
+            # Step 2-4: 标准化、清洗、计算指标
+            df = self._process_raw_data(raw_df, stock_code)
             
             logger.info(f"[{self.name}] {stock_code} 获取成功，共 {len(df)} 条数据")
             return df
@@ -155,6 +147,96 @@ class BaseFetcher(ABC):
             logger.error(f"[{self.name}] 获取 {stock_code} 失败: {str(e)}")
             raise DataFetchError(f"[{self.name}] {stock_code}: {str(e)}") from e
     
+    def get_daily_data_batch(
+        self,
+        stock_codes: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        days: int = 30
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        批量获取多只股票的日线数据
+        
+        原始数据由 _fetch_raw_data_batch() 获取：默认逐只调用 _fetch_raw_data()，
+        支持批量接口的数据源（如 efinance）可覆盖为一次请求多只股票。
+        单只股票失败不影响其他股票，失败的代码不会出现在返回结果中。
+        
+        Args:
+            stock_codes: 股票代码列表
+            start_date: 开始日期（可选）
+            end_date: 结束日期（可选，默认今天）
+            days: 获取天数（当 start_date 未指定时使用）
+            
+        Returns:
+            Dict[股票代码, 标准化的 DataFrame]
+        """
+        start_date, end_date = self._resolve_date_range(start_date, end_date, days)
+        
+        logger.info(f"[{self.name}] 批量获取 {len(stock_codes)} 只股票数据: {start_date} ~ {end_date}")
+        
+        raw_frames = self._fetch_raw_data_batch(stock_codes, start_date, end_date)
+        
+        results: Dict[str, pd.DataFrame] = {}
+        for code in stock_codes:
+            raw_df = raw_frames.get(code)
+            if raw_df is None:
+                continue
+            try:
+                results[code] = self._process_raw_data(raw_df, code)
+            except Exception as e:
+                logger.warning(f"[{self.name}] 处理 {code} 数据失败: {e}")
+        
+        logger.info(f"[{self.name}] 批量获取完成，成功 {len(results)}/{len(stock_codes)} 只")
+        return results
+    
+    def _fetch_raw_data_batch(
+        self,
+        stock_codes: List[str],
+        start_date: str,
+        end_date: str
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        批量获取原始数据（默认实现：逐只获取）
+        
+        子类可覆盖此方法以使用数据源的批量接口。
+        
+        Returns:
+            Dict[股票代码, 原始 DataFrame]，获取失败的代码不包含在内
+        """
+        raw_frames: Dict[str, pd.DataFrame] = {}
+        for code in stock_codes:
+            try:
+                raw_frames[code] = self._fetch_raw_data(code, start_date, end_date)
+            except Exception as e:
+                logger.warning(f"[{self.name}] 获取 {code} 失败: {e}")
+        return raw_frames
+    
+    @staticmethod
+    def _resolve_date_range(
+        start_date: Optional[str],
+        end_date: Optional[str],
+        days: int
+    ) -> Tuple[str, str]:
+        """补全日期范围（结束日期默认今天，开始日期按 days 的 2 倍日历日估算）"""
+        if end_date is None:
+            end_date = datetime.now().strftime('%Y-%m-%d')
+        
+        if start_date is None:
+            # 默认获取最近 30 个交易日（按日历日估算，多取一些）
+            start_dt = datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=days * 2)
+            start_date = start_dt.strftime('%Y-%m-%d')
+        
+        return start_date, end_date
+    
+    def _process_raw_data(self, raw_df: pd.DataFrame, stock_code: str) -> pd.DataFrame:
+        """原始数据 -> 标准化 -> 清洗 -> 技术指标"""
+        if raw_df is None or raw_df.empty:
+            raise DataFetchError(f"[{self.name}] 未获取到 {stock_code} 的数据")
+        
+        df = self._normalize_data(raw_df, stock_code)
+        df = self._clean_data(df)
+        return self._calculate_indicators(df)
+    
     def _clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         数据清洗
@@ -185,32 +267,17 @@ class BaseFetcher(ABC):
         
         return df
     
-    def _calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+    @staticmethod
+    def _calculate_indicators(df: pd.DataFrame) -> pd.DataFrame:
         """
-        计算技术指标
+        计算入库的技术指标（口径由 indicators 注册表统一声明）
         
         计算指标：
         - MA5, MA10, MA20: 移动平均线
         - Volume_Ratio: 量比（今日成交量 / 5日平均成交量）
         """
-        df = df.copy()
-        
-        # 移动平均线
-        df['ma5'] = df['close'].rolling(window=5, min_periods=1).mean()
-        df['ma10'] = df['close'].rolling(window=10, min_periods=1).mean()
-        df['ma20'] = df['close'].rolling(window=20, min_periods=1).mean()
-        
-        # 量比：当日成交量 / 5日平均成交量
-        avg_volume_5 = df['volume'].rolling(window=5, min_periods=1).mean()
-        df['volume_ratio'] = df['volume'] / avg_volume_5.shift(1)
-        df['volume_ratio'] = df['volume_ratio'].fillna(1.0)
-        
         # 保留2位小数
-        for col in ['ma5', 'ma10', 'ma20', 'volume_ratio']:
-            if col in df.columns:
-                df[col] = df[col].round(2)
-        
-        return df
+        return get_indicator_registry().attach(df.copy(), STORED_INDICATORS, ndigits=2)
     
     @staticmethod
     def random_sleep(min_seconds: float = 1.0, max_seconds: float = 3.0) -> None:
@@ -238,15 +305,41 @@ class DataFetcherManager:
     - 优先使用高优先级数据源
     - 失败后自动切换到下一个
     - 所有数据源都失败时抛出异常
+    
+    自适应路由：
+    - 记录每个数据源的成功率、耗时分位数和限流次数（见 source_health）
+    - 降级的数据源排到健康数据源之后，熔断中的数据源仅在其他数据源都失败后才尝试
+    
+    对冲请求（FETCH_HEDGE_ENABLED，默认关闭）：
+    - 当前数据源超过其历史耗时分位数仍未返回时，在下一个数据源上发起同一请求，取先返回者
+    - 同时最多两个请求在途；下一个数据源的令牌桶没有余量时不对冲，只在失败后切换
     """
     
-    def __init__(self, fetchers: Optional[List[BaseFetcher]] = None):
+    # 对冲请求线程池大小（各工作线程共享）
+    HEDGE_POOL_SIZE = 8
+    
+    def __init__(
+        self,
+        fetchers: Optional[List[BaseFetcher]] = None,
+        health: Optional["SourceHealthTracker"] = None
+    ):
         """
         初始化管理器
         
         Args:
             fetchers: 数据源列表（可选，默认按优先级自动创建）
+            health: 数据源健康度跟踪器（可选，默认使用进程级共享实例）
         """
+        from .source_health import get_source_health
+        from config import get_config
+        
+        config = get_config()
+        self._health = health if health is not None else get_source_health()
+        self.hedge_enabled = config.fetch_hedge_enabled
+        self.hedge_percentile = config.fetch_hedge_percentile
+        self.hedge_delay = config.fetch_hedge_delay
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_executor_lock = threading.Lock()
         self._fetchers: List[BaseFetcher] = []
         
         if fetchers:
@@ -306,6 +399,82 @@ class DataFetcherManager:
         self._fetchers.append(fetcher)
         self._fetchers.sort(key=lambda f: f.priority)
     
+    # === 自适应路由 ===
+    
+    def _routed_fetchers(self) -> Iterator[BaseFetcher]:
+        """
+        按健康度依次产出本次请求应尝试的数据源
+        
+        - 正常 > 降级 > 熔断中，同档内保持优先级顺序
+        - 熔断中（或半开试探已被占用）的数据源先跳过，其余数据源都失败后再作为兜底尝试
+        """
+        skipped = []
+        for fetcher in self._health.rank(self._fetchers):
+            if self._health.allow(fetcher.name):
+                yield fetcher
+            else:
+                logger.debug(f"[{fetcher.name}] 熔断中，暂时跳过")
+                skipped.append(fetcher)
+        for fetcher in skipped:
+            logger.info(f"其他数据源均失败，尝试熔断中的 [{fetcher.name}]")
+            yield fetcher
+    
+    def _record_result(
+        self,
+        fetcher: BaseFetcher,
+        started: float,
+        ok: bool,
+        error: Optional[BaseException] = None,
+        count: int = 1
+    ) -> None:
+        """记录一次数据源调用结果（批量调用按每只股票的平均耗时记录）"""
+        latency = (time.monotonic() - started) / max(1, count)
+        if ok:
+            self._health.record_success(fetcher.name, latency)
+        else:
+            self._health.record_failure(fetcher.name, latency, error)
+    
+    @property
+    def source_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        各数据源的实时统计
+        
+        Returns:
+            {数据源名称: {requests, success_rate, p50_latency, p95_latency,
+                          recent_rate_limits, consecutive_failures, circuit, degraded}}
+        """
+        return self._health.snapshot()
+    
+    def _fetch_one(
+        self,
+        fetcher: BaseFetcher,
+        stock_code: str,
+        start_date: Optional[str],
+        end_date: Optional[str],
+        days: int
+    ) -> Optional[pd.DataFrame]:
+        """
+        调用单个数据源并记录健康度统计
+        
+        Returns:
+            数据；数据为空时返回 None（失败时抛出原异常）
+        """
+        started = time.monotonic()
+        try:
+            df = fetcher.get_daily_data(
+                stock_code=stock_code,
+                start_date=start_date,
+                end_date=end_date,
+                days=days
+            )
+        except Exception as e:
+            self._record_result(fetcher, started, ok=False, error=e)
+            raise
+        
+        ok = df is not None and not df.empty
+        self._record_result(fetcher, started, ok=ok)
+        return df if ok else None
+    
     def get_daily_data(
         self, 
         stock_code: str,
@@ -322,6 +491,8 @@ class DataFetcherManager:
         3. 记录每个数据源的失败原因
         4. 所有数据源失败后抛出详细异常
         
+        启用对冲请求时改为 _get_daily_data_hedged（主数据源超时未返回即并行请求下一个）
+        
         Args:
             stock_code: 股票代码
             start_date: 开始日期
@@ -334,19 +505,17 @@ class DataFetcherManager:
         Raises:
             DataFetchError: 所有数据源都失败时抛出
         """
+        if self.hedge_enabled:
+            return self._get_daily_data_hedged(stock_code, start_date, end_date, days)
+        
         errors = []
         
-        for fetcher in self._fetchers:
+        for fetcher in self._routed_fetchers():
             try:
                 logger.info(f"尝试使用 [{fetcher.name}] 获取 {stock_code}...")
-                df = fetcher.get_daily_data(
-                    stock_code=stock_code,
-                    start_date=start_date,
-                    end_date=end_date,
-                    days=days
-                )
+                df = self._fetch_one(fetcher, stock_code, start_date, end_date, days)
                 
-                if df is not None and not df.empty:
+                if df is not None:
                     logger.info(f"[{fetcher.name}] 成功获取 {stock_code}")
                     return df, fetcher.name
                     
@@ -362,6 +531,353 @@ class DataFetcherManager:
         logger.error(error_summary)
         raise DataFetchError(error_summary)
     
+    # === 对冲请求 ===
+    
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        if self._hedge_executor is None:
+            with self._hedge_executor_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=self.HEDGE_POOL_SIZE,
+                        thread_name_prefix="fetch_hedge",
+                    )
+        return self._hedge_executor
+    
+    def _hedge_deadline(self, fetcher: BaseFetcher) -> float:
+        """
+        对冲等待时间：该数据源成功请求耗时的 hedge_percentile 分位数
+        
+        样本不足时使用 hedge_delay；hedge_delay 同时作为下限，避免过早对冲放大请求量
+        """
+        observed = self._health.latency_percentile(fetcher.name, self.hedge_percentile)
+        if observed is None:
+            return self.hedge_delay
+        return max(self.hedge_delay, observed)
+    
+    @staticmethod
+    def _has_rate_budget(fetcher: BaseFetcher) -> bool:
+        """数据源的令牌桶当前是否有余量（无限流器的数据源视为有余量）"""
+        limiter = getattr(fetcher, '_rate_limiter', None)
+        return limiter is None or limiter.available() >= 1
+    
+    def _get_daily_data_hedged(
+        self,
+        stock_code: str,
+        start_date: Optional[str],
+        end_date: Optional[str],
+        days: int
+    ) -> Tuple[pd.DataFrame, str]:
+        """
+        对冲模式获取日线数据
+        
+        流程：
+        1. 在当前最健康的数据源上发起请求
+        2. 超过对冲等待时间仍未返回，且下一个数据源有限流余量时，在下一个数据源上发起同一请求
+        3. 取先成功返回的结果；在途请求失败则切换到下一个数据源
+        4. 落选的请求在后台执行完毕（只记录健康度统计，结果丢弃）
+        
+        Raises:
+            DataFetchError: 所有数据源都失败时抛出
+        """
+        executor = self._get_hedge_executor()
+        candidates = self._routed_fetchers()
+        deferred: List[BaseFetcher] = []  # 因限流余量不足未用于对冲的数据源，留作故障切换
+        pending: Dict[Future, BaseFetcher] = {}
+        errors: List[str] = []
+        
+        def next_candidate() -> Optional[BaseFetcher]:
+            return deferred.pop(0) if deferred else next(candidates, None)
+        
+        def launch(fetcher: BaseFetcher) -> None:
+            logger.info(f"尝试使用 [{fetcher.name}] 获取 {stock_code}...")
+            future = executor.submit(self._fetch_one, fetcher, stock_code, start_date, end_date, days)
+            pending[future] = fetcher
+        
+        primary = next_candidate()
+        primary_started = time.monotonic()
+        hedged = False
+        if primary is not None:
+            launch(primary)
+        
+        while pending:
+            timeout = None
+            if not hedged:
+                timeout = max(0.0, primary_started + self._hedge_deadline(primary) - time.monotonic())
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            if not done:
+                # 主请求超过对冲等待时间
+                hedged = True
+                hedge = next_candidate()
+                if hedge is None:
+                    continue
+                if not self._has_rate_budget(hedge):
+                    logger.debug(f"[{hedge.name}] 限流余量不足，不发起对冲请求")
+                    deferred.append(hedge)
+                    continue
+                logger.info(f"[{primary.name}] 获取 {stock_code} 超过 {self._hedge_deadline(primary):.1f} 秒未返回，"
+                            f"对冲请求 [{hedge.name}]")
+                launch(hedge)
+                continue
+            
+            for future in done:
+                fetcher = pending.pop(future)
+                try:
+                    df = future.result()
+                except Exception as e:
+                    error_msg = f"[{fetcher.name}] 失败: {str(e)}"
+                    logger.warning(error_msg)
+                    errors.append(error_msg)
+                    continue
+                if df is not None:
+                    if pending:
+                        losers = ", ".join(f.name for f in pending.values())
+                        logger.info(f"[{fetcher.name}] 率先返回 {stock_code}，丢弃 [{losers}] 的结果")
+                    logger.info(f"[{fetcher.name}] 成功获取 {stock_code}")
+                    return df, fetcher.name
+                errors.append(f"[{fetcher.name}] 返回空数据")
+            
+            if not pending:
+                # 在途请求全部失败，切换到下一个数据源（重新计算对冲等待时间）
+                primary = next_candidate()
+                if primary is None:
+                    break
+                primary_started = time.monotonic()
+                hedged = False
+                launch(primary)
+        
+        error_summary = f"所有数据源获取 {stock_code} 失败:\n" + "\n".join(errors)
+        logger.error(error_summary)
+        raise DataFetchError(error_summary)
+    
+    # === 增量获取 ===
+    
+    # 增量获取需要的本地历史条数（MA20 预热 + 重叠校验）
+    INCREMENTAL_HISTORY_BARS = 25
+    # 指标计算所需的最少历史条数（MA20）
+    INDICATOR_WARMUP_BARS = 20
+    # 增量请求与本地数据重叠的交易日数（用于检测复权因子变化）
+    DELTA_OVERLAP_BARS = 3
+    
+    def get_daily_data_incremental(
+        self,
+        stock_code: str,
+        history: Optional[pd.DataFrame] = None,
+        days: int = 30
+    ) -> Tuple[pd.DataFrame, str]:
+        """
+        增量获取日线数据（只请求本地最新日期之后的区间）
+        
+        策略：
+        1. 从本地最新日期往前重叠 DELTA_OVERLAP_BARS 个交易日开始请求，到今天为止
+        2. 比对重叠区间的收盘价，不一致说明复权因子变化（除权除息），改为请求完整窗口
+        3. 本地历史不足指标预热长度、或最新日期早于完整窗口（断档）时，请求完整窗口
+        4. 以本地历史预热流式指标后逐根追加新数据，均线/量比与完整窗口计算结果一致
+        
+        Args:
+            stock_code: 股票代码
+            history: 本地最近的日线数据（按日期升序，至少包含 date/close/volume），
+                     为空时直接请求完整窗口
+            days: 完整窗口的获取天数
+            
+        Returns:
+            Tuple[DataFrame, str]: (需要写入的数据, 成功的数据源名称)
+            
+        Raises:
+            DataFetchError: 所有数据源都失败时抛出
+        """
+        delta_start = self._plan_incremental_start(stock_code, history, days)
+        if delta_start is None:
+            return self.get_daily_data(stock_code, days=days)
+        
+        delta_df, source_name = self.get_daily_data(stock_code, start_date=delta_start)
+        
+        result = self._merge_incremental(stock_code, history, delta_df, source_name)
+        if result is None:
+            return self.get_daily_data(stock_code, days=days)
+        return result, source_name
+    
+    def _plan_incremental_start(
+        self,
+        stock_code: str,
+        history: Optional[pd.DataFrame],
+        days: int
+    ) -> Optional[str]:
+        """
+        计算增量请求的开始日期
+        
+        Returns:
+            开始日期 'YYYY-MM-DD'；需要请求完整窗口时返回 None
+        """
+        if history is None or len(history) < self.INDICATOR_WARMUP_BARS:
+            return None
+        
+        last_date = pd.Timestamp(history['date'].max())
+        if (pd.Timestamp(datetime.now().date()) - last_date).days > days * 2:
+            logger.info(f"[{stock_code}] 本地数据断档（最新 {last_date.date()}），请求完整窗口")
+            return None
+        
+        dates = history['date'].sort_values()
+        return pd.Timestamp(dates.iloc[-self.DELTA_OVERLAP_BARS]).strftime('%Y-%m-%d')
+    
+    def _merge_incremental(
+        self,
+        stock_code: str,
+        history: pd.DataFrame,
+        delta_df: pd.DataFrame,
+        source_name: str
+    ) -> Optional[pd.DataFrame]:
+        """
+        校验重叠区间，并以本地历史为起点流式计算增量数据的指标
+        
+        Returns:
+            需要写入的数据（从增量数据的第一天开始）；重叠区间不一致时返回 None
+        """
+        if not self._overlap_consistent(history, delta_df):
+            logger.info(f"[{stock_code}] 重叠区间与本地数据不一致（复权因子变化或数据缺失），请求完整窗口")
+            return None
+        
+        # 用重叠区间之前的本地历史预热流式指标，再逐根追加新数据（不拼接重算历史）
+        history = history.sort_values('date')
+        last_date = history['date'].iloc[-1]
+        first_new = delta_df['date'].min()
+        engine = IndicatorEngine()
+        engine.warm_up(stock_code, history.loc[history['date'] < first_new])
+        delta_df = delta_df.sort_values('date').reset_index(drop=True)
+        result = engine.annotate(stock_code, delta_df[STANDARD_COLUMNS])
+        
+        new_count = int((result['date'] > last_date).sum())
+        logger.info(f"[{stock_code}] 增量获取完成（来源: {source_name}），新增 {new_count} 个交易日")
+        return result
+    
+    @staticmethod
+    def _overlap_consistent(history: pd.DataFrame, delta_df: pd.DataFrame) -> bool:
+        """检查增量数据与本地历史在重叠日期上的收盘价是否一致"""
+        merged = pd.merge(
+            history[['date', 'close']],
+            delta_df[['date', 'close']],
+            on='date',
+            suffixes=('_local', '_remote'),
+        )
+        if merged.empty:
+            return False
+        return bool(np.allclose(
+            merged['close_local'].to_numpy(dtype=float),
+            merged['close_remote'].to_numpy(dtype=float),
+            rtol=1e-3,
+            atol=0.011,
+        ))
+    
+    # === 批量获取 ===
+    
+    def get_daily_data_batch(
+        self,
+        stock_codes: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        days: int = 30
+    ) -> Dict[str, Tuple[pd.DataFrame, str]]:
+        """
+        批量获取多只股票的日线数据（自动切换数据源）
+        
+        故障切换策略：
+        1. 当前最健康的数据源先批量获取全部股票（顺序同 get_daily_data）
+        2. 未成功的股票交给下一个数据源，依此类推
+        3. 所有数据源都失败的股票不出现在结果中（记录警告，不抛异常）
+        
+        Args:
+            stock_codes: 股票代码列表
+            start_date: 开始日期
+            end_date: 结束日期
+            days: 获取天数
+            
+        Returns:
+            Dict[股票代码, (数据, 成功的数据源名称)]
+        """
+        results: Dict[str, Tuple[pd.DataFrame, str]] = {}
+        remaining = list(dict.fromkeys(stock_codes))
+        if not remaining:
+            return results
+        
+        for fetcher in self._routed_fetchers():
+            started = time.monotonic()
+            try:
+                logger.info(f"尝试使用 [{fetcher.name}] 批量获取 {len(remaining)} 只股票...")
+                frames = fetcher.get_daily_data_batch(
+                    remaining,
+                    start_date=start_date,
+                    end_date=end_date,
+                    days=days
+                )
+            except Exception as e:
+                self._record_result(fetcher, started, ok=False, error=e)
+                logger.warning(f"[{fetcher.name}] 批量获取失败: {str(e)}")
+                continue
+            
+            for code, df in frames.items():
+                if df is not None and not df.empty:
+                    results[code] = (df, fetcher.name)
+            fetched = len(remaining) - sum(1 for code in remaining if code not in results)
+            self._record_result(fetcher, started, ok=fetched > 0, count=max(1, fetched))
+            remaining = [code for code in remaining if code not in results]
+            if not remaining:
+                break
+        
+        if remaining:
+            logger.warning(f"所有数据源批量获取失败: {', '.join(remaining)}")
+        
+        return results
+    
+    def get_daily_data_incremental_batch(
+        self,
+        histories: Dict[str, Optional[pd.DataFrame]],
+        days: int = 30
+    ) -> Dict[str, Tuple[pd.DataFrame, str]]:
+        """
+        批量增量获取日线数据
+        
+        按 get_daily_data_incremental 的规则为每只股票确定请求区间，然后分两组批量请求：
+        - 增量组：共用组内最早的开始日期，一次批量请求，返回后按各股票自己的开始日期截取
+        - 完整窗口组：一次批量请求
+        增量组中重叠校验失败（复权因子变化）的股票单独补请求完整窗口。
+        
+        Args:
+            histories: Dict[股票代码, 本地最近的日线数据（可为 None）]
+            days: 完整窗口的获取天数
+            
+        Returns:
+            Dict[股票代码, (需要写入的数据, 成功的数据源名称)]
+        """
+        delta_starts: Dict[str, str] = {}
+        full_codes: List[str] = []
+        for code, history in histories.items():
+            delta_start = self._plan_incremental_start(code, history, days)
+            if delta_start is None:
+                full_codes.append(code)
+            else:
+                delta_starts[code] = delta_start
+        
+        results: Dict[str, Tuple[pd.DataFrame, str]] = {}
+        
+        if delta_starts:
+            fetched = self.get_daily_data_batch(
+                list(delta_starts), start_date=min(delta_starts.values())
+            )
+            for code, (delta_df, source_name) in fetched.items():
+                # 早于本股票开始日期的 K 线在本地历史中已有，且本地历史不足以预热这些日期的指标，
+                # 合并前截去，避免用截断的窗口重算并覆盖已入库的 ma10/ma20/volume_ratio
+                delta_df = delta_df.loc[pd.to_datetime(delta_df['date']) >= pd.Timestamp(delta_starts[code])]
+                merged = self._merge_incremental(code, histories[code], delta_df, source_name)
+                if merged is None:
+                    full_codes.append(code)
+                else:
+                    results[code] = (merged, source_name)
+        
+        if full_codes:
+            results.update(self.get_daily_data_batch(full_codes, days=days))
+        
+        return results
+    
     @property
     def available_fetchers(self) -> List[str]:
         """返回可用数据源名称列表"""
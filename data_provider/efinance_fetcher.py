@@ -14,15 +14,14 @@ EfinanceFetcher - 优先数据源 (Priority 0)
 3. 更稳定的接口封装
 
 防封禁策略：
-1. 每次请求前随机休眠 1.5-3.0 秒
+1. 东方财富全局令牌桶限流（与 akshare 共享，见 rate_limiter）
 2. 随机轮换 User-Agent
 3. 使用 tenacity 实现指数退避重试
 """
 
 import logging
 import random
-import time
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 
@@ -36,6 +35,8 @@ from tenacity import (
 )
 
 from .base import BaseFetcher, DataFetchError, RateLimitError, STANDARD_COLUMNS
+from .rate_limiter import HOST_EASTMONEY, TokenBucket, get_rate_limiter
+from .spot_cache import SpotSnapshot, build_records, get_spot_cache
 
 
 @dataclass
@@ -93,12 +94,35 @@ USER_AGENTS = [
 ]
 
 
-# 缓存实时行情数据（避免重复请求）
-_realtime_cache: Dict[str, Any] = {
-    'data': None,
-    'timestamp': 0,
-    'ttl': 60  # 60秒缓存有效期
-}
+# 全市场行情快照在 spot_cache 中的标识
+EF_SPOT_SOURCE = 'efinance_a_spot'
+
+
+def _build_realtime_quotes(snapshot: SpotSnapshot) -> Dict[str, EfinanceRealtimeQuote]:
+    """在快照上一次性构建 {代码: EfinanceRealtimeQuote}（列名可能是中文或英文）"""
+    columns = snapshot.data.columns
+    
+    def col(cn: str, en: str) -> str:
+        return cn if cn in columns else en
+    
+    return build_records(
+        snapshot,
+        EfinanceRealtimeQuote,
+        fields={
+            'price': col('最新价', 'price'),
+            'change_pct': col('涨跌幅', 'pct_chg'),
+            'change_amount': col('涨跌额', 'change'),
+            'volume': col('成交量', 'volume'),
+            'amount': col('成交额', 'amount'),
+            'turnover_rate': col('换手率', 'turnover_rate'),
+            'amplitude': col('振幅', 'amplitude'),
+            'high': col('最高', 'high'),
+            'low': col('最低', 'low'),
+            'open_price': col('开盘', 'open'),
+        },
+        text_fields={'name': col('股票名称', 'name')},
+        int_fields=('volume',),
+    )
 
 
 def _is_etf_code(stock_code: str) -> bool:
@@ -133,7 +157,7 @@ class EfinanceFetcher(BaseFetcher):
     - ef.stock.get_realtime_quotes(): 获取实时行情
     
     关键策略：
-    - 每次请求前随机休眠 1.5-3.0 秒
+    - 每次请求前从东方财富全局令牌桶取令牌（所有线程、所有实例共享）
     - 随机 User-Agent 轮换
     - 失败后指数退避重试（最多3次）
     """
@@ -141,17 +165,14 @@ class EfinanceFetcher(BaseFetcher):
     name = "EfinanceFetcher"
     priority = 0  # 最高优先级，排在 AkshareFetcher 之前
     
-    def __init__(self, sleep_min: float = 1.5, sleep_max: float = 3.0):
+    def __init__(self, rate_limiter: Optional[TokenBucket] = None):
         """
         初始化 EfinanceFetcher
         
         Args:
-            sleep_min: 最小休眠时间（秒）
-            sleep_max: 最大休眠时间（秒）
+            rate_limiter: 限流器（可选，默认使用东方财富全局令牌桶）
         """
-        self.sleep_min = sleep_min
-        self.sleep_max = sleep_max
-        self._last_request_time: Optional[float] = None
+        self._rate_limiter = rate_limiter or get_rate_limiter(HOST_EASTMONEY)
     
     def _set_random_user_agent(self) -> None:
         """
@@ -170,22 +191,10 @@ class EfinanceFetcher(BaseFetcher):
         """
         强制执行速率限制
         
-        策略：
-        1. 检查距离上次请求的时间间隔
-        2. 如果间隔不足，补充休眠时间
-        3. 然后再执行随机 jitter 休眠
+        从全局令牌桶取令牌：有令牌时立即放行，超速时阻塞到令牌补充，
+        总速率由 EASTMONEY_RATE_LIMIT 决定，与线程数、实例数无关
         """
-        if self._last_request_time is not None:
-            elapsed = time.time() - self._last_request_time
-            min_interval = self.sleep_min
-            if elapsed < min_interval:
-                additional_sleep = min_interval - elapsed
-                logger.debug(f"补充休眠 {additional_sleep:.2f} 秒")
-                time.sleep(additional_sleep)
-        
-        # 执行随机 jitter 休眠
-        self.random_sleep(self.sleep_min, self.sleep_max)
-        self._last_request_time = time.time()
+        self._rate_limiter.acquire()
     
     @retry(
         stop=stop_after_attempt(3),  # 最多重试3次
@@ -204,7 +213,7 @@ class EfinanceFetcher(BaseFetcher):
         流程：
         1. 判断代码类型（股票/ETF）
         2. 设置随机 User-Agent
-        3. 执行速率限制（随机休眠）
+        3. 执行速率限制（全局令牌桶）
         4. 调用对应的 efinance API
         5. 处理返回数据
         """
@@ -281,6 +290,105 @@ class EfinanceFetcher(BaseFetcher):
             
             raise DataFetchError(f"efinance 获取数据失败: {e}") from e
     
+    # 单次批量请求的最大股票数（过大容易触发限流或超时）
+    BATCH_SIZE = 50
+    
+    def _fetch_raw_data_batch(
+        self,
+        stock_codes: List[str],
+        start_date: str,
+        end_date: str
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        批量获取原始数据
+        
+        - 普通股票：按 BATCH_SIZE 分批，每批一次 ef.stock.get_quote_history(stock_codes=[...])，
+          只执行一次限流休眠
+        - ETF 基金：efinance 无对应批量接口，逐只获取
+        
+        Returns:
+            Dict[股票代码, 原始 DataFrame]，获取失败的代码不包含在内
+        """
+        stock_list = [code for code in stock_codes if not _is_etf_code(code)]
+        etf_list = [code for code in stock_codes if _is_etf_code(code)]
+        
+        raw_frames: Dict[str, pd.DataFrame] = {}
+        for i in range(0, len(stock_list), self.BATCH_SIZE):
+            chunk = stock_list[i:i + self.BATCH_SIZE]
+            try:
+                raw_frames.update(self._fetch_stock_data_batch(chunk, start_date, end_date))
+            except Exception as e:
+                logger.warning(f"[{self.name}] 批量获取 {len(chunk)} 只股票失败: {e}")
+        
+        if etf_list:
+            raw_frames.update(super()._fetch_raw_data_batch(etf_list, start_date, end_date))
+        
+        return raw_frames
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=30),
+        retry=retry_if_exception_type((ConnectionError, TimeoutError)),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+    )
+    def _fetch_stock_data_batch(
+        self,
+        stock_codes: List[str],
+        start_date: str,
+        end_date: str
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        一次请求获取多只 A 股历史数据
+        
+        数据来源：ef.stock.get_quote_history(stock_codes=[...])，返回 {股票代码: DataFrame}
+        """
+        import efinance as ef
+        
+        # 防封禁策略：整批只随机 UA + 休眠一次
+        self._set_random_user_agent()
+        self._enforce_rate_limit()
+        
+        beg_date = start_date.replace('-', '')
+        end_date_fmt = end_date.replace('-', '')
+        
+        logger.info(f"[API调用] ef.stock.get_quote_history(stock_codes=[{len(stock_codes)} 只], "
+                   f"beg={beg_date}, end={end_date_fmt}, klt=101, fqt=1)")
+        
+        try:
+            import time as _time
+            api_start = _time.time()
+            
+            result = ef.stock.get_quote_history(
+                stock_codes=list(stock_codes),
+                beg=beg_date,
+                end=end_date_fmt,
+                klt=101,  # 日线
+                fqt=1     # 前复权
+            )
+            
+            api_elapsed = _time.time() - api_start
+        except Exception as e:
+            error_msg = str(e).lower()
+            
+            # 检测反爬封禁
+            if any(keyword in error_msg for keyword in ['banned', 'blocked', '频率', 'rate', '限制']):
+                logger.warning(f"检测到可能被封禁: {e}")
+                raise RateLimitError(f"efinance 可能被限流: {e}") from e
+            
+            raise DataFetchError(f"efinance 批量获取数据失败: {e}") from e
+        
+        # 只请求一只时 efinance 直接返回 DataFrame
+        if isinstance(result, pd.DataFrame):
+            result = {stock_codes[0]: result}
+        
+        frames = {
+            code: df for code, df in (result or {}).items()
+            if df is not None and not df.empty
+        }
+        logger.info(f"[API返回] ef.stock.get_quote_history 批量成功: {len(frames)}/{len(stock_codes)} 只有数据, "
+                   f"耗时 {api_elapsed:.2f}s")
+        return frames
+    
     def _fetch_etf_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
         获取 ETF 基金历史数据
@@ -402,88 +510,19 @@ class EfinanceFetcher(BaseFetcher):
         Returns:
             EfinanceRealtimeQuote 对象，获取失败返回 None
         """
-        import efinance as ef
-        
         try:
-            # 检查缓存
-            current_time = time.time()
-            if (_realtime_cache['data'] is not None and 
-                current_time - _realtime_cache['timestamp'] < _realtime_cache['ttl']):
-                df = _realtime_cache['data']
-                logger.debug(f"[缓存命中] 使用缓存的实时行情数据")
-            else:
-                # 防封禁策略
-                self._set_random_user_agent()
-                self._enforce_rate_limit()
-                
-                logger.info(f"[API调用] ef.stock.get_realtime_quotes() 获取实时行情...")
-                import time as _time
-                api_start = _time.time()
-                
-                # efinance 的实时行情 API
-                df = ef.stock.get_realtime_quotes()
-                
-                api_elapsed = _time.time() - api_start
-                logger.info(f"[API返回] ef.stock.get_realtime_quotes 成功: 返回 {len(df)} 只股票, 耗时 {api_elapsed:.2f}s")
-                
-                # 更新缓存
-                _realtime_cache['data'] = df
-                _realtime_cache['timestamp'] = current_time
-            
-            # 查找指定股票
-            # efinance 返回的列名可能是 '股票代码' 或 'code'
-            code_col = '股票代码' if '股票代码' in df.columns else 'code'
-            row = df[df[code_col] == stock_code]
-            if row.empty:
-                logger.warning(f"[API返回] 未找到股票 {stock_code} 的实时行情")
+            # 共享快照缓存：多线程同时未命中时只下载一次
+            snapshot = get_spot_cache().get(EF_SPOT_SOURCE, self.load_realtime_quotes)
+            if snapshot.empty:
+                logger.warning(f"[实时行情] 实时行情数据为空，跳过 {stock_code}")
                 return None
             
-            row = row.iloc[0]
-            
-            # 安全获取字段值
-            def safe_float(val, default=0.0):
-                try:
-                    if pd.isna(val):
-                        return default
-                    return float(val)
-                except:
-                    return default
-            
-            def safe_int(val, default=0):
-                try:
-                    if pd.isna(val):
-                        return default
-                    return int(float(val))
-                except:
-                    return default
-            
-            # 获取列名（可能是中文或英文）
-            name_col = '股票名称' if '股票名称' in df.columns else 'name'
-            price_col = '最新价' if '最新价' in df.columns else 'price'
-            pct_col = '涨跌幅' if '涨跌幅' in df.columns else 'pct_chg'
-            chg_col = '涨跌额' if '涨跌额' in df.columns else 'change'
-            vol_col = '成交量' if '成交量' in df.columns else 'volume'
-            amt_col = '成交额' if '成交额' in df.columns else 'amount'
-            turn_col = '换手率' if '换手率' in df.columns else 'turnover_rate'
-            amp_col = '振幅' if '振幅' in df.columns else 'amplitude'
-            high_col = '最高' if '最高' in df.columns else 'high'
-            low_col = '最低' if '最低' in df.columns else 'low'
-            open_col = '开盘' if '开盘' in df.columns else 'open'
-            
-            quote = EfinanceRealtimeQuote(
-                code=stock_code,
-                name=str(row.get(name_col, '')),
-                price=safe_float(row.get(price_col)),
-                change_pct=safe_float(row.get(pct_col)),
-                change_amount=safe_float(row.get(chg_col)),
-                volume=safe_int(row.get(vol_col)),
-                amount=safe_float(row.get(amt_col)),
-                turnover_rate=safe_float(row.get(turn_col)),
-                amplitude=safe_float(row.get(amp_col)),
-                high=safe_float(row.get(high_col)),
-                low=safe_float(row.get(low_col)),
-                open_price=safe_float(row.get(open_col)),
-            )
+            # 查找指定股票：快照填充后一次性构建全部行情对象，之后每次查询为字典访问
+            quote = snapshot.view('realtime_quote', _build_realtime_quotes).get(stock_code)
+            if quote is None:
+                logger.warning(f"[API返回] 未找到股票 {stock_code} 的实时行情")
+                return None
+            quote = replace(quote)  # 返回副本，避免调用方修改共享对象
             
             logger.info(f"[实时行情] {stock_code} {quote.name}: 价格={quote.price}, 涨跌={quote.change_pct}%, "
                        f"换手率={quote.turnover_rate}%")
@@ -493,6 +532,25 @@ class EfinanceFetcher(BaseFetcher):
             logger.error(f"[API错误] 获取 {stock_code} 实时行情失败: {e}")
             return None
     
+    def load_realtime_quotes(self) -> pd.DataFrame:
+        """下载全部 A 股实时行情（ef.stock.get_realtime_quotes），供快照缓存调用"""
+        import efinance as ef
+        
+        # 防封禁策略
+        self._set_random_user_agent()
+        self._enforce_rate_limit()
+        
+        logger.info(f"[API调用] ef.stock.get_realtime_quotes() 获取实时行情...")
+        import time as _time
+        api_start = _time.time()
+        
+        # efinance 的实时行情 API
+        df = ef.stock.get_realtime_quotes()
+        
+        api_elapsed = _time.time() - api_start
+        logger.info(f"[API返回] ef.stock.get_realtime_quotes 成功: 返回 {len(df)} 只股票, 耗时 {api_elapsed:.2f}s")
+        return df
+    
     def get_base_info(self, stock_code: str) -> Optional[Dict[str, Any]]:
         """
         获取股票基本信息
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+全局令牌桶限流器（按主机共享）
+===================================
+
+职责：
+1. 按目标主机（而不是按 Fetcher 实例）限流：akshare 与 efinance 都访问东方财富，共用一个桶
+2. 线程安全：多个工作线程、多个 Fetcher 实例共享同一个桶，总请求速率不随线程数增长
+3. 以令牌桶替代固定随机休眠：有令牌时立即放行，只在真正超速时等待
+
+使用方式：
+    from data_provider.rate_limiter import get_rate_limiter
+
+    limiter = get_rate_limiter('eastmoney')
+    limiter.acquire()  # 阻塞到拿到令牌
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+# 主机标识
+HOST_EASTMONEY = 'eastmoney'  # akshare / efinance（东方财富）
+HOST_TUSHARE = 'tushare'
+
+
+class TokenBucket:
+    """
+    令牌桶限流器
+
+    - 令牌以 rate_per_minute / 60 个每秒的速度补充，最多累积 capacity 个
+    - acquire() 先预占令牌再休眠（令牌数可为负），并发等待者按到达顺序排队，互不重复计算等待时间
+    - rate_per_minute <= 0 表示不限流
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: float = 1.0,
+        jitter: float = 0.0,
+        name: str = ""
+    ):
+        """
+        Args:
+            rate_per_minute: 每分钟允许的请求数
+            capacity: 桶容量（允许的突发请求数）
+            jitter: 拿到令牌后额外的随机延迟上限（秒），用于打散请求时间点
+            name: 名称（日志用）
+        """
+        self.rate_per_minute = rate_per_minute
+        self.capacity = max(1.0, capacity)
+        self.jitter = jitter
+        self.name = name
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """每秒补充的令牌数"""
+        return self.rate_per_minute / 60.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        获取令牌（必要时阻塞等待）
+
+        Args:
+            tokens: 需要的令牌数
+
+        Returns:
+            实际等待的秒数
+        """
+        if self.rate_per_minute <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if self.jitter > 0:
+            wait += random.uniform(0, self.jitter)
+        if wait > 0:
+            logger.debug(f"[限流:{self.name}] 等待 {wait:.2f} 秒")
+            time.sleep(wait)
+        return wait
+
+    def available(self) -> float:
+        """当前可用令牌数（不消耗令牌，不限流时为 inf）"""
+        if self.rate_per_minute <= 0:
+            return float('inf')
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """非阻塞获取令牌，令牌不足时返回 False"""
+        if self.rate_per_minute <= 0:
+            return True
+
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+
+# 全局注册表：主机 -> 令牌桶
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def _default_limiter(host: str) -> TokenBucket:
+    """按配置创建主机的默认限流器（未配置的主机不限流）"""
+    from config import get_config
+    config = get_config()
+
+    if host == HOST_EASTMONEY:
+        return TokenBucket(
+            rate_per_minute=config.eastmoney_rate_limit_per_minute,
+            capacity=config.eastmoney_rate_limit_burst,
+            jitter=config.rate_limit_jitter,
+            name=host,
+        )
+    if host == HOST_TUSHARE:
+        # Tushare 按分钟计配额，允许一分钟的配额作为突发
+        return TokenBucket(
+            rate_per_minute=config.tushare_rate_limit_per_minute,
+            capacity=config.tushare_rate_limit_per_minute,
+            name=host,
+        )
+    return TokenBucket(rate_per_minute=0, name=host)
+
+
+def get_rate_limiter(host: str) -> TokenBucket:
+    """
+    获取主机对应的全局限流器（进程内共享）
+
+    Args:
+        host: 主机标识，如 HOST_EASTMONEY
+
+    Returns:
+        TokenBucket 实例
+    """
+    limiter = _limiters.get(host)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(host)
+            if limiter is None:
+                limiter = _default_limiter(host)
+                _limiters[host] = limiter
+                logger.debug(f"[限流] 注册 {host}: {limiter.rate_per_minute}/分钟，突发 {limiter.capacity}")
+    return limiter
+
+
+def register_rate_limiter(host: str, limiter: TokenBucket) -> None:
+    """注册（或替换）主机的限流器"""
+    with _limiters_lock:
+        _limiters[host] = limiter
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+数据源健康度统计与熔断
+===================================
+
+职责：
+1. 记录每个数据源近期的成功率、耗时分位数（p50/p95）和限流错误次数
+2. 熔断器：连续失败或被限流时短暂跳过该数据源，冷却后放行一次试探请求
+3. 为 DataFetcherManager 提供动态排序：健康的数据源按优先级在前，降级的数据源排在后面
+
+熔断状态：
+- closed：正常
+- open：冷却中，路由时跳过（全部数据源都熔断时仍按顺序尝试，避免无源可用）
+- half_open：冷却结束，放行一次试探请求，成功则恢复，失败则重新熔断
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .base import RateLimitError
+
+logger = logging.getLogger(__name__)
+
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+
+class SourceStats:
+    """单个数据源的滑动窗口统计（由 SourceHealthTracker 加锁访问）"""
+
+    def __init__(self, window: int):
+        # (时间戳, 是否成功, 耗时秒, 是否限流错误)
+        self.events: Deque[Tuple[float, bool, float, bool]] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.circuit = CIRCUIT_CLOSED
+        self.open_until = 0.0
+        self.probe_in_flight = False
+
+    def latencies(self, success_only: bool = True) -> List[float]:
+        return [lat for _, ok, lat, _ in self.events if ok or not success_only]
+
+    def success_rate(self) -> Optional[float]:
+        if not self.events:
+            return None
+        return sum(1 for _, ok, _, _ in self.events if ok) / len(self.events)
+
+    def rate_limit_count(self, since: float) -> int:
+        return sum(1 for ts, _, _, limited in self.events if limited and ts >= since)
+
+
+class SourceHealthTracker:
+    """
+    数据源健康度跟踪器（线程安全）
+
+    降级判定（满足其一）：
+    - 近期样本数 >= min_samples 且成功率 < degraded_success_rate
+    - recent_seconds 内出现过 RateLimitError
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        cooldown: float = 120.0,
+        window: int = 50,
+        min_samples: int = 3,
+        degraded_success_rate: float = 0.5,
+        recent_seconds: float = 300.0
+    ):
+        """
+        Args:
+            failure_threshold: 连续失败多少次后熔断
+            cooldown: 熔断冷却时间（秒）
+            window: 每个数据源保留的最近请求数
+            min_samples: 计算成功率所需的最少样本数
+            degraded_success_rate: 成功率低于该值视为降级
+            recent_seconds: 限流错误的统计时间窗口（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.window = window
+        self.min_samples = min_samples
+        self.degraded_success_rate = degraded_success_rate
+        self.recent_seconds = recent_seconds
+        self._stats: Dict[str, SourceStats] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str) -> SourceStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = SourceStats(self.window)
+            self._stats[name] = stats
+        return stats
+
+    # === 记录 ===
+
+    def record_success(self, name: str, latency: float) -> None:
+        """记录一次成功请求"""
+        with self._lock:
+            stats = self._get(name)
+            stats.events.append((time.time(), True, latency, False))
+            stats.consecutive_failures = 0
+            stats.probe_in_flight = False
+            if stats.circuit != CIRCUIT_CLOSED:
+                logger.info(f"[数据源熔断] {name} 试探成功，恢复正常")
+                stats.circuit = CIRCUIT_CLOSED
+
+    def record_failure(self, name: str, latency: float, error: Optional[BaseException] = None) -> None:
+        """
+        记录一次失败请求
+
+        RateLimitError 直接熔断；其他错误连续 failure_threshold 次后熔断；
+        半开状态下的试探失败立即重新熔断。
+        """
+        rate_limited = _is_rate_limit(error)
+        with self._lock:
+            stats = self._get(name)
+            stats.events.append((time.time(), False, latency, rate_limited))
+            stats.consecutive_failures += 1
+            stats.probe_in_flight = False
+
+            should_open = (
+                rate_limited
+                or stats.circuit == CIRCUIT_HALF_OPEN
+                or stats.consecutive_failures >= self.failure_threshold
+            )
+            if should_open:
+                stats.circuit = CIRCUIT_OPEN
+                stats.open_until = time.time() + self.cooldown
+                reason = "被限流" if rate_limited else f"连续失败 {stats.consecutive_failures} 次"
+                logger.warning(f"[数据源熔断] {name} {reason}，{self.cooldown:.0f} 秒内跳过")
+
+    # === 路由 ===
+
+    def allow(self, name: str) -> bool:
+        """
+        当前是否允许请求该数据源
+
+        熔断冷却结束后转为半开，只放行一个试探请求
+        """
+        with self._lock:
+            stats = self._get(name)
+            if stats.circuit == CIRCUIT_CLOSED:
+                return True
+            if stats.circuit == CIRCUIT_OPEN:
+                if time.time() < stats.open_until:
+                    return False
+                stats.circuit = CIRCUIT_HALF_OPEN
+            if stats.probe_in_flight:
+                return False
+            stats.probe_in_flight = True
+            return True
+
+    def is_degraded(self, name: str) -> bool:
+        """数据源是否处于降级状态（成功率低或近期被限流）"""
+        with self._lock:
+            return self._is_degraded(self._get(name))
+
+    def _is_degraded(self, stats: SourceStats) -> bool:
+        if stats.rate_limit_count(time.time() - self.recent_seconds) > 0:
+            return True
+        if len(stats.events) >= self.min_samples:
+            rate = stats.success_rate()
+            return rate is not None and rate < self.degraded_success_rate
+        return False
+
+    def rank(self, items: Sequence[Any], name_of=lambda f: f.name) -> List[Any]:
+        """
+        按健康度重新排序（稳定排序：同一档内保持原有优先级顺序）
+
+        排序档位：正常 < 降级 < 熔断中
+        """
+        now = time.time()
+        with self._lock:
+            def tier(item) -> int:
+                stats = self._get(name_of(item))
+                if stats.circuit == CIRCUIT_OPEN and now < stats.open_until:
+                    return 2
+                return 1 if self._is_degraded(stats) else 0
+
+            return sorted(items, key=tier)
+
+    # === 查询 ===
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        返回各数据源的统计信息（用于日志与接口展示）
+
+        Returns:
+            {数据源名称: {requests, success_rate, p50_latency, p95_latency,
+                          recent_rate_limits, consecutive_failures, circuit, degraded}}
+        """
+        now = time.time()
+        result = {}
+        with self._lock:
+            for name, stats in self._stats.items():
+                latencies = stats.latencies()
+                rate = stats.success_rate()
+                circuit = stats.circuit
+                if circuit == CIRCUIT_OPEN and now >= stats.open_until:
+                    circuit = CIRCUIT_HALF_OPEN
+                result[name] = {
+                    'requests': len(stats.events),
+                    'success_rate': round(rate, 3) if rate is not None else None,
+                    'p50_latency': round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+                    'p95_latency': round(float(np.percentile(latencies, 95)), 3) if latencies else None,
+                    'recent_rate_limits': stats.rate_limit_count(now - self.recent_seconds),
+                    'consecutive_failures': stats.consecutive_failures,
+                    'circuit': circuit,
+                    'degraded': self._is_degraded(stats),
+                }
+        return result
+
+    def latency_percentile(self, name: str, percentile: float) -> Optional[float]:
+        """成功请求耗时的分位数（样本不足 min_samples 时返回 None）"""
+        with self._lock:
+            latencies = self._get(name).latencies()
+        if len(latencies) < self.min_samples:
+            return None
+        return float(np.percentile(latencies, percentile))
+
+    def reset(self) -> None:
+        """清空全部统计"""
+        with self._lock:
+            self._stats.clear()
+
+
+def _is_rate_limit(error: Optional[BaseException]) -> bool:
+    """异常链中是否包含 RateLimitError（BaseFetcher 会包装为 DataFetchError）"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, RateLimitError):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+# 便捷函数
+_tracker: Optional[SourceHealthTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_source_health() -> SourceHealthTracker:
+    """获取进程级共享的数据源健康度跟踪器（熔断参数由配置决定）"""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                from config import get_config
+                config = get_config()
+                _tracker = SourceHealthTracker(
+                    failure_threshold=config.source_circuit_failure_threshold,
+                    cooldown=config.source_circuit_cooldown,
+                )
+    return _tracker
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+全市场实时行情快照缓存（进程级共享）
+===================================
+
+职责：
+1. 缓存全市场实时行情表（如 ak.stock_zh_a_spot_em，约 5000 行），各模块共享同一份快照
+2. Single-flight：同一数据源同一时刻只有一个线程真正发起下载，其余线程等待结果
+3. 建立 代码 -> 行号 索引，单只股票查询 O(1)，不再对整表做布尔筛选
+4. 支持在快照上一次性预构建行情对象（view），之后每次查询只是一次字典访问
+
+使用方式：
+    from data_provider.spot_cache import get_spot_cache
+
+    snapshot = get_spot_cache().get('akshare_a_spot', ak.stock_zh_a_spot_em)
+    row = snapshot.lookup('600519')  # pd.Series 或 None
+    quotes = snapshot.view('quote', builder)  # {代码: 预构建对象}，每份快照只构建一次
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# 行情表中可能出现的代码列名（按优先级）
+CODE_COLUMNS = ('代码', '股票代码', '基金代码', 'code')
+
+
+class SpotSnapshot:
+    """
+    一次下载得到的行情快照（只读）
+
+    Attributes:
+        data: 原始行情 DataFrame（调用方不应修改）
+        index: 代码 -> 行号
+        timestamp: 下载完成时间（time.time()）
+    """
+
+    def __init__(
+        self,
+        data: Optional[pd.DataFrame],
+        timestamp: float,
+        code_columns: Iterable[str] = CODE_COLUMNS
+    ):
+        self.data = data if data is not None else pd.DataFrame()
+        self.timestamp = timestamp
+        self.index: Dict[str, int] = {}
+        self._views: Dict[str, Dict[str, Any]] = {}
+        self._views_lock = threading.Lock()
+
+        code_col = next((c for c in code_columns if c in self.data.columns), None)
+        self.code_column = code_col
+        if code_col is not None:
+            codes = self.data[code_col].astype(str).tolist()
+            # 代码重复时保留第一条，与原先 df[df['代码'] == code].iloc[0] 一致
+            for pos in range(len(codes) - 1, -1, -1):
+                self.index[codes[pos]] = pos
+
+    @property
+    def empty(self) -> bool:
+        return self.data.empty
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.index
+
+    def lookup(self, code: str) -> Optional[pd.Series]:
+        """按代码取一行，不存在返回 None"""
+        pos = self.index.get(code)
+        if pos is None:
+            return None
+        return self.data.iloc[pos]
+
+    def view(self, name: str, builder: Callable[["SpotSnapshot"], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        获取（必要时构建）快照上的预构建视图
+
+        同一份快照上每个视图只构建一次，快照过期后随新快照重建。
+
+        Args:
+            name: 视图名称（同一快照内唯一）
+            builder: 构建函数，输入快照，返回 {代码: 对象}
+
+        Returns:
+            {代码: 对象}（调用方不应修改）
+        """
+        records = self._views.get(name)
+        if records is not None:
+            return records
+        with self._views_lock:
+            records = self._views.get(name)
+            if records is None:
+                records = builder(self) if not self.empty else {}
+                self._views[name] = records
+        return records
+
+
+def build_records(
+    snapshot: SpotSnapshot,
+    factory: Callable[..., Any],
+    fields: Mapping[str, Optional[str]],
+    text_fields: Optional[Mapping[str, str]] = None,
+    int_fields: Iterable[str] = ()
+) -> Dict[str, Any]:
+    """
+    按列批量把行情表转换为 {代码: factory(...)}
+
+    数值列整体 to_numeric 后转换，缺失值/非数值为 0（与逐行 safe_float 语义一致），
+    代码重复时保留第一条。
+
+    Args:
+        snapshot: 行情快照
+        factory: 对象构造函数（如 RealtimeQuote），以关键字参数调用，第一个参数为 code
+        fields: 数值属性名 -> 列名（列名为 None 或不存在时取 0）
+        text_fields: 文本属性名 -> 列名（缺失时为空字符串）
+        int_fields: 需要转为 int 的数值属性名
+
+    Returns:
+        {代码: 对象}
+    """
+    df = snapshot.data
+    if snapshot.code_column is None or df.empty:
+        return {}
+
+    int_fields = set(int_fields)
+    n = len(df)
+    columns: Dict[str, list] = {}
+    for attr, col in fields.items():
+        if col is not None and col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+            values = np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+        else:
+            values = np.zeros(n)
+        columns[attr] = values.astype(np.int64).tolist() if attr in int_fields else values.tolist()
+    for attr, col in (text_fields or {}).items():
+        if col in df.columns:
+            columns[attr] = df[col].astype(str).tolist()
+        else:
+            columns[attr] = [''] * n
+
+    codes = df[snapshot.code_column].astype(str).tolist()
+    attrs = list(columns)
+    records: Dict[str, Any] = {}
+    for i, code in enumerate(codes):
+        if code not in records:
+            records[code] = factory(code=code, **{attr: columns[attr][i] for attr in attrs})
+    return records
+
+
+class SpotSnapshotCache:
+    """
+    全市场行情快照缓存
+
+    - 每个数据源（source）一份快照，超过 TTL 后下次访问时重新下载
+    - 下载失败也会缓存空快照（同样遵循 TTL），避免同一轮任务反复请求被限流的接口
+    - 线程安全：缓存未命中时只有一个线程执行 loader，其余线程等待同一结果
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        """
+        Args:
+            ttl: 快照有效期（秒）
+        """
+        self.ttl = ttl
+        self._snapshots: Dict[str, SpotSnapshot] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        source: str,
+        loader: Callable[[], Optional[pd.DataFrame]],
+        ttl: Optional[float] = None
+    ) -> SpotSnapshot:
+        """
+        获取快照（未命中或过期时调用 loader 下载）
+
+        Args:
+            source: 数据源标识，如 'akshare_a_spot'
+            loader: 下载函数，返回全市场行情 DataFrame；抛异常或返回 None 视为失败
+            ttl: 本次使用的有效期（可选，默认使用缓存的 ttl）
+
+        Returns:
+            SpotSnapshot（失败时为空快照，不返回 None）
+        """
+        ttl = self.ttl if ttl is None else ttl
+
+        while True:
+            with self._lock:
+                snapshot = self._snapshots.get(source)
+                if snapshot is not None and time.time() - snapshot.timestamp < ttl:
+                    logger.debug(f"[缓存命中] 使用缓存的行情快照: {source}")
+                    return snapshot
+
+                event = self._inflight.get(source)
+                if event is None:
+                    # 当前线程负责下载
+                    event = threading.Event()
+                    self._inflight[source] = event
+                    break
+
+            # 其他线程正在下载，等待其完成后重新检查缓存
+            event.wait()
+            with self._lock:
+                snapshot = self._snapshots.get(source)
+                if snapshot is not None and self._inflight.get(source) is None:
+                    return snapshot
+
+        try:
+            data = None
+            try:
+                data = loader()
+            except Exception as e:
+                logger.error(f"[行情快照] {source} 下载失败: {e}")
+            snapshot = SpotSnapshot(data, time.time())
+            with self._lock:
+                self._snapshots[source] = snapshot
+            return snapshot
+        finally:
+            with self._lock:
+                self._inflight.pop(source, None)
+            event.set()
+
+    def invalidate(self, source: Optional[str] = None) -> None:
+        """清除指定数据源（或全部）的快照"""
+        with self._lock:
+            if source is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(source, None)
+
+
+# 便捷函数
+_spot_cache: Optional[SpotSnapshotCache] = None
+_spot_cache_lock = threading.Lock()
+
+
+def get_spot_cache() -> SpotSnapshotCache:
+    """获取进程级共享的行情快照缓存（TTL 由 REALTIME_CACHE_TTL 配置）"""
+    global _spot_cache
+    if _spot_cache is None:
+        with _spot_cache_lock:
+            if _spot_cache is None:
+                from config import get_config
+                _spot_cache = SpotSnapshotCache(ttl=get_config().realtime_cache_ttl)
+    return _spot_cache
@@ -9,13 +9,12 @@ TushareFetcher - 备用数据源 1 (Priority 2)
 优点：数据质量高、接口稳定
 
 流控策略：
-1. 实现"每分钟调用计数器"
-2. 超过免费配额（80次/分）时，强制休眠到下一分钟
+1. 全局令牌桶限流（进程内共享），默认免费配额 80 次/分
+2. 配额用尽时平滑等待令牌补充，而不是休眠到下一分钟
 3. 使用 tenacity 实现指数退避重试
 """
 
 import logging
-import time
 from datetime import datetime
 from typing import Optional, Tuple
 
@@ -29,6 +28,7 @@ from tenacity import (
 )
 
 from .base import BaseFetcher, DataFetchError, RateLimitError, STANDARD_COLUMNS
+from .rate_limiter import HOST_TUSHARE, TokenBucket, get_rate_limiter
 from config import get_config
 
 logger = logging.getLogger(__name__)
@@ -42,8 +42,8 @@ class TushareFetcher(BaseFetcher):
     数据来源：Tushare Pro API
     
     关键策略：
-    - 每分钟调用计数器，防止超出配额
-    - 超过 80 次/分钟时强制等待
+    - 全局令牌桶限流（所有线程、所有实例共享），防止超出配额
+    - 速率由 TUSHARE_RATE_LIMIT 配置（默认 80 次/分钟）
     - 失败后指数退避重试
     
     配额说明（Tushare 免费用户）：
@@ -54,16 +54,14 @@ class TushareFetcher(BaseFetcher):
     name = "TushareFetcher"
     priority = 2  # 默认优先级，会在 __init__ 中根据配置动态调整
 
-    def __init__(self, rate_limit_per_minute: int = 80):
+    def __init__(self, rate_limiter: Optional[TokenBucket] = None):
         """
         初始化 TushareFetcher
 
         Args:
-            rate_limit_per_minute: 每分钟最大请求数（默认80，Tushare免费配额）
+            rate_limiter: 限流器（可选，默认使用 Tushare 全局令牌桶）
         """
-        self.rate_limit_per_minute = rate_limit_per_minute
-        self._call_count = 0  # 当前分钟内的调用次数
-        self._minute_start: Optional[float] = None  # 当前计数周期开始时间
+        self._rate_limiter = rate_limiter or get_rate_limiter(HOST_TUSHARE)
         self._api: Optional[object] = None  # Tushare API 实例
 
         # 尝试初始化 API
@@ -134,42 +132,15 @@ class TushareFetcher(BaseFetcher):
         检查并执行速率限制
         
         流控策略：
-        1. 检查是否进入新的一分钟
-        2. 如果是，重置计数器
-        3. 如果当前分钟调用次数超过限制，强制休眠
+        从全局令牌桶取令牌，配额用尽时阻塞到令牌补充
+        （平滑限流，替代原先按固定分钟窗口计数、超额后整分钟休眠）
         """
-        current_time = time.time()
-        
-        # 检查是否需要重置计数器（新的一分钟）
-        if self._minute_start is None:
-            self._minute_start = current_time
-            self._call_count = 0
-        elif current_time - self._minute_start >= 60:
-            # 已经过了一分钟，重置计数器
-            self._minute_start = current_time
-            self._call_count = 0
-            logger.debug("速率限制计数器已重置")
-        
-        # 检查是否超过配额
-        if self._call_count >= self.rate_limit_per_minute:
-            # 计算需要等待的时间（到下一分钟）
-            elapsed = current_time - self._minute_start
-            sleep_time = max(0, 60 - elapsed) + 1  # +1 秒缓冲
-            
+        waited = self._rate_limiter.acquire()
+        if waited > 1:
             logger.warning(
-                f"Tushare 达到速率限制 ({self._call_count}/{self.rate_limit_per_minute} 次/分钟)，"
-                f"等待 {sleep_time:.1f} 秒..."
+                f"Tushare 达到速率限制 ({self._rate_limiter.rate_per_minute:.0f} 次/分钟)，"
+                f"已等待 {waited:.1f} 秒"
             )
-            
-            time.sleep(sleep_time)
-            
-            # 重置计数器
-            self._minute_start = time.time()
-            self._call_count = 0
-        
-        # 增加调用计数
-        self._call_count += 1
-        logger.debug(f"Tushare 当前分钟调用次数: {self._call_count}/{self.rate_limit_per_minute}")
     
     def _convert_stock_code(self, stock_code: str) -> str:
         """
@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 流式指标引擎
+===================================
+
+职责：
+1. 为每只股票维护均线滚动和、量比基准等状态，追加一根 K 线时 O(1) 更新全部指标
+2. 同一日期的 K 线再次到达时视为修正（盘中行情不断刷新当日 K 线），同样 O(1)
+3. 状态可序列化为 JSON 持久化，下次运行直接续算，无需重读历史
+
+指标口径与 indicators 注册表（即入库的 ma5/ma10/ma20/volume_ratio）一致：
+- MA5/MA10/MA20/MA60：min_periods=1，不足窗口时取已有 K 线的均值
+- 量比：当日成交量 / 前 5 日平均成交量（第一根 K 线为 1.0）
+
+使用方式：
+    engine = get_indicator_engine()
+    engine.update('600519', '2026-01-05', close=1800.0, volume=35000)    # 收盘后追加日线
+    engine.update('600519', '2026-01-06', close=1812.5, volume=12000)    # 盘中刷新当日 K 线
+    engine.preview('600519', '2026-01-06', close=1815.0)                 # 试算，不改变状态
+    engine.save()
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+import pandas as pd
+
+from indicators import MA_WINDOWS, VOLUME_RATIO_WINDOW
+
+logger = logging.getLogger(__name__)
+
+
+DateLike = Union[str, date, datetime, pd.Timestamp]
+
+
+def _date_key(value: DateLike) -> str:
+    """日期统一为 'YYYY-MM-DD' 字符串（可直接比较先后）"""
+    if isinstance(value, str):
+        return value[:10]
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+class IndicatorState:
+    """
+    单只股票的指标状态
+
+    收盘价与成交量各保存在一个环形缓冲区里，缓冲区比最大窗口多一格，
+    使最后一根 K 线可以撤销重算（盘中修正）。
+    """
+
+    CLOSE_SLOTS = max(MA_WINDOWS) + 1
+    VOLUME_SLOTS = VOLUME_RATIO_WINDOW + 1
+
+    def __init__(self):
+        self.closes = [0.0] * self.CLOSE_SLOTS
+        self.volumes = [0.0] * self.VOLUME_SLOTS
+        self.count = 0                  # 已追加的 K 线数（环形缓冲区只保留最近的部分）
+        self.last_date: Optional[str] = None
+        self.close_sums = {w: 0.0 for w in MA_WINDOWS}
+        self.volume_sum = 0.0           # 最近 VOLUME_RATIO_WINDOW 根 K 线的成交量之和（含最新一根）
+
+    def copy(self) -> "IndicatorState":
+        clone = IndicatorState.__new__(IndicatorState)
+        clone.closes = list(self.closes)
+        clone.volumes = list(self.volumes)
+        clone.count = self.count
+        clone.last_date = self.last_date
+        clone.close_sums = dict(self.close_sums)
+        clone.volume_sum = self.volume_sum
+        return clone
+
+    # === 更新 ===
+
+    def push(self, bar_date: str, close: float, volume: float) -> None:
+        """追加一根 K 线"""
+        i = self.count
+        self.closes[i % self.CLOSE_SLOTS] = close
+        for w in MA_WINDOWS:
+            self.close_sums[w] += close
+            if i >= w:
+                self.close_sums[w] -= self.closes[(i - w) % self.CLOSE_SLOTS]
+
+        self.volumes[i % self.VOLUME_SLOTS] = volume
+        self.volume_sum += volume
+        if i >= VOLUME_RATIO_WINDOW:
+            self.volume_sum -= self.volumes[(i - VOLUME_RATIO_WINDOW) % self.VOLUME_SLOTS]
+
+        self.count += 1
+        self.last_date = bar_date
+        # 每绕环一圈按缓冲区重算一次滚动和，消除浮点累计误差（均摊 O(1)）
+        if self.count % self.CLOSE_SLOTS == 0:
+            self._resum()
+
+    def revise(self, close: float, volume: float) -> None:
+        """用新数据替换最后一根 K 线（日期不变）"""
+        i = self.count - 1
+        old_close = self.closes[i % self.CLOSE_SLOTS]
+        for w in MA_WINDOWS:
+            self.close_sums[w] += close - old_close
+        self.closes[i % self.CLOSE_SLOTS] = close
+
+        old_volume = self.volumes[i % self.VOLUME_SLOTS]
+        self.volume_sum += volume - old_volume
+        self.volumes[i % self.VOLUME_SLOTS] = volume
+
+    def _resum(self) -> None:
+        last = self.count - 1
+        for w in MA_WINDOWS:
+            n = min(w, self.count)
+            self.close_sums[w] = math.fsum(self.closes[(last - k) % self.CLOSE_SLOTS] for k in range(n))
+        n = min(VOLUME_RATIO_WINDOW, self.count)
+        self.volume_sum = math.fsum(self.volumes[(last - k) % self.VOLUME_SLOTS] for k in range(n))
+
+    # === 查询 ===
+
+    @property
+    def close(self) -> float:
+        return self.closes[(self.count - 1) % self.CLOSE_SLOTS]
+
+    @property
+    def volume(self) -> float:
+        return self.volumes[(self.count - 1) % self.VOLUME_SLOTS]
+
+    def ma(self, window: int) -> float:
+        return self.close_sums[window] / min(window, self.count)
+
+    def volume_ratio(self) -> float:
+        """最新一根 K 线的量比（前 5 日均量为 0 时与注册表的数组除法一致）"""
+        i = self.count - 1
+        if i == 0:
+            return 1.0
+        # 前 VOLUME_RATIO_WINDOW 根 K 线之和 = 最近 VOLUME_RATIO_WINDOW 根之和 - 最新一根 + 更早的一根
+        base_sum = self.volume_sum - self.volume
+        if i >= VOLUME_RATIO_WINDOW:
+            base_sum += self.volumes[(i - VOLUME_RATIO_WINDOW) % self.VOLUME_SLOTS]
+        base = base_sum / min(i, VOLUME_RATIO_WINDOW)
+        if base == 0:
+            return 1.0 if self.volume == 0 else math.copysign(math.inf, self.volume)
+        return self.volume / base
+
+    def values(self, ndigits: Optional[int] = None) -> Dict[str, Any]:
+        def fmt(value: float) -> float:
+            return round(value, ndigits) if ndigits is not None else value
+
+        result: Dict[str, Any] = {
+            'date': self.last_date,
+            'close': self.close,
+            'volume': self.volume,
+            'bars': self.count,
+        }
+        for w in MA_WINDOWS:
+            result[f'ma{w}'] = fmt(self.ma(w))
+        result['volume_ratio'] = fmt(self.volume_ratio())
+        return result
+
+    # === 序列化 ===
+
+    def to_dict(self) -> Dict[str, Any]:
+        """按时间顺序导出缓冲区中的 K 线（最多 CLOSE_SLOTS 根）"""
+        n = min(self.count, self.CLOSE_SLOTS)
+        first = self.count - n
+        return {
+            'count': self.count,
+            'last_date': self.last_date,
+            'closes': [self.closes[k % self.CLOSE_SLOTS] for k in range(first, self.count)],
+            'volumes': [self.volumes[k % self.VOLUME_SLOTS] for k in range(max(first, self.count - self.VOLUME_SLOTS), self.count)],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndicatorState":
+        state = cls()
+        count = int(data['count'])
+        closes = data['closes']
+        volumes = data['volumes']
+        first = count - len(closes)
+        for k, value in enumerate(closes, start=first):
+            state.closes[k % cls.CLOSE_SLOTS] = float(value)
+        for k, value in enumerate(volumes, start=count - len(volumes)):
+            state.volumes[k % cls.VOLUME_SLOTS] = float(value)
+        state.count = count
+        state.last_date = data.get('last_date')
+        if count:
+            state._resum()
+        return state
+
+
+class IndicatorEngine:
+    """
+    流式指标引擎（线程安全）
+
+    每只股票一个 IndicatorState；追加/修正一根 K 线为 O(1)，不重算历史。
+    """
+
+    # 预热所需的 K 线数（覆盖最长均线窗口）
+    WARMUP_BARS = IndicatorState.CLOSE_SLOTS
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: 状态文件路径（可选，save()/load() 的默认路径）
+        """
+        self.path = path
+        self._states: Dict[str, IndicatorState] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, code: str) -> bool:
+        with self._lock:
+            return code in self._states
+
+    def last_date(self, code: str) -> Optional[str]:
+        with self._lock:
+            state = self._states.get(code)
+            return state.last_date if state else None
+
+    def is_synced(self, code: str, df: pd.DataFrame) -> bool:
+        """状态的最新 K 线是否与 df（按日期升序）的最后一根一致；不一致时应先用 df 重新 warm_up"""
+        if df is None or df.empty:
+            return False
+        return self.last_date(code) == _date_key(df['date'].iloc[-1])
+
+    # === 更新 ===
+
+    def update(
+        self,
+        code: str,
+        bar_date: DateLike,
+        close: float,
+        volume: float = 0.0
+    ) -> Dict[str, Any]:
+        """
+        追加或修正一根 K 线并返回最新指标
+
+        - 日期晚于最新 K 线：追加
+        - 日期等于最新 K 线：修正（盘中行情刷新）
+        - 日期早于最新 K 线：忽略（历史数据请用 warm_up 重建）
+
+        Returns:
+            最新指标 {date, close, volume, bars, ma5, ma10, ma20, ma60, volume_ratio}
+        """
+        key = _date_key(bar_date)
+        with self._lock:
+            state = self._states.setdefault(code, IndicatorState())
+            self._apply(state, key, float(close), float(volume))
+            return state.values()
+
+    def preview(
+        self,
+        code: str,
+        bar_date: DateLike,
+        close: float,
+        volume: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        试算：假设追加/修正这根 K 线后的指标，不改变引擎状态
+
+        Args:
+            volume: 成交量（为空时不计算量比）
+
+        Returns:
+            指标字典；该股票没有状态时返回 None
+        """
+        key = _date_key(bar_date)
+        with self._lock:
+            state = self._states.get(code)
+            if state is None or (state.last_date is not None and key < state.last_date):
+                return None
+            state = state.copy()
+        self._apply(state, key, float(close), float(volume or 0.0))
+        values = state.values()
+        if volume is None:
+            values['volume'] = None
+            values['volume_ratio'] = None
+        return values
+
+    @staticmethod
+    def _apply(state: IndicatorState, key: str, close: float, volume: float) -> None:
+        if state.last_date is None or key > state.last_date:
+            state.push(key, close, volume)
+        elif key == state.last_date:
+            state.revise(close, volume)
+        else:
+            logger.debug(f"忽略早于 {state.last_date} 的 K 线 {key}")
+
+    def warm_up(self, code: str, df: pd.DataFrame) -> None:
+        """
+        用历史日线重建某只股票的状态（只需最近 WARMUP_BARS 根）
+
+        Args:
+            df: 至少包含 date/close/volume 列的日线数据
+        """
+        state = IndicatorState()
+        for bar_date, close, volume in self._iter_bars(df.tail(self.WARMUP_BARS)):
+            self._apply(state, bar_date, close, volume)
+        with self._lock:
+            self._states[code] = state
+
+    def update_frame(self, code: str, df: pd.DataFrame, rtol: float = 1e-3) -> bool:
+        """
+        用新获取的日线更新状态（只处理最新日期及之后的 K 线）
+
+        与已有状态重叠的最新一日收盘价不一致（复权因子变化）时，用 df 重建状态。
+
+        Returns:
+            是否已更新；状态的最新 K 线早于 df 的第一根（中间缺 K 线，如进程崩溃前未 save()
+            或其他进程写入了数据）时不更新并返回 False，调用方应从完整历史重新 warm_up
+        """
+        if df is None or df.empty:
+            return True
+        df = df.sort_values('date')
+        with self._lock:
+            state = self._states.get(code)
+        if state is None:
+            self.warm_up(code, df)
+            return True
+
+        last_date = state.last_date
+        dates = [_date_key(d) for d in df['date']]
+        if last_date in dates:
+            remote = float(df['close'].iloc[dates.index(last_date)])
+            if not math.isclose(remote, state.close, rel_tol=rtol, abs_tol=0.011):
+                logger.info(f"[{code}] 指标状态与最新数据不一致（复权因子变化），重建")
+                self.warm_up(code, df)
+                return True
+        elif last_date is None or last_date < dates[0]:
+            logger.info(f"[{code}] 指标状态（{last_date}）与新数据（{dates[0]} 起）之间缺少 K 线，需要重建")
+            return False
+
+        with self._lock:
+            for bar_date, close, volume in self._iter_bars(df):
+                if bar_date > last_date:
+                    self._apply(state, bar_date, close, volume)
+        return True
+
+    def annotate(self, code: str, df: pd.DataFrame, ndigits: int = 2) -> pd.DataFrame:
+        """
+        逐根追加 df 的 K 线，并把每根 K 线对应的 ma5/ma10/ma20/volume_ratio 写回 df 的副本
+
+        用于增量获取：先 warm_up 本地历史，再对新数据调用本方法，不必拼接历史重算。
+        """
+        rows = []
+        with self._lock:
+            state = self._states.setdefault(code, IndicatorState())
+            for bar_date, close, volume in self._iter_bars(df):
+                self._apply(state, bar_date, close, volume)
+                rows.append(state.values(ndigits))
+        result = df.copy()
+        for column in ('ma5', 'ma10', 'ma20', 'volume_ratio'):
+            result[column] = [row[column] for row in rows]
+        return result
+
+    @staticmethod
+    def _iter_bars(df: pd.DataFrame) -> Iterable:
+        dates = [_date_key(d) for d in df['date']]
+        closes = df['close'].astype(float).tolist()
+        volumes = df['volume'].astype(float).tolist()
+        return zip(dates, closes, volumes)
+
+    # === 查询 ===
+
+    def values(self, code: str, ndigits: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        某只股票的最新指标
+
+        Returns:
+            {date, close, volume, bars, ma5, ma10, ma20, ma60, volume_ratio}；没有状态时返回 None
+        """
+        with self._lock:
+            state = self._states.get(code)
+            return state.values(ndigits) if state else None
+
+    # === 持久化 ===
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {code: state.to_dict() for code, state in self._states.items()}
+
+    def from_dict(self, data: Dict[str, Any]) -> None:
+        states = {code: IndicatorState.from_dict(item) for code, item in data.items()}
+        with self._lock:
+            self._states = states
+
+    def save(self, path: Optional[str] = None) -> None:
+        """原子写入状态文件（先写临时文件再替换）"""
+        path = path or self.path
+        if not path:
+            return
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(target.suffix + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, target)
+        logger.debug(f"指标状态已保存: {target}（{len(self._states)} 只股票）")
+
+    def load(self, path: Optional[str] = None) -> bool:
+        """
+        从状态文件恢复
+
+        Returns:
+            是否成功加载（文件不存在或损坏时返回 False，保持空状态）
+        """
+        path = path or self.path
+        if not path or not Path(path).exists():
+            return False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.from_dict(json.load(f))
+        except Exception as e:
+            logger.warning(f"加载指标状态失败，将重新预热: {e}")
+            return False
+        logger.info(f"已加载指标状态: {path}（{len(self._states)} 只股票）")
+        return True
+
+
+# 便捷函数
+_engine: Optional[IndicatorEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_indicator_engine() -> IndicatorEngine:
+    """获取进程级共享的指标引擎（首次调用时从 INDICATOR_STATE_PATH 恢复状态）"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from config import get_config
+                engine = IndicatorEngine(get_config().indicator_state_path)
+                engine.load()
+                _engine = engine
+    return _engine
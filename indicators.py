@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 技术指标注册表
+===================================
+
+职责：
+1. 每个指标只声明一次：名称、窗口、输入列、依赖的其他指标和计算函数
+2. 按消费者请求的指标名解析依赖，只计算需要的部分
+3. 按 (股票代码, 最新日期) 缓存计算结果，数据获取、趋势分析、上下文/提示词、回测共用
+
+指标口径（与入库的 ma5/ma10/ma20/volume_ratio 一致）：
+- maN：收盘价 N 日均线，min_periods=1（不足窗口时取已有 K 线均值）
+- volume_ma5：成交量 5 日均线
+- volume_ratio：当日成交量 / 前 5 日平均成交量，第一根 K 线为 1.0
+- high_20：近 20 日最高价
+
+strict=True 时把不足窗口（warmup）的前几行置为 NaN，对应 rolling(window) 的严格口径。
+流式更新见 indicator_engine.IndicatorEngine（同一口径的 O(1) 增量实现）。
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# 均线窗口
+MA_WINDOWS = (5, 10, 20, 60)
+# 量比基准窗口（前 N 日平均成交量）
+VOLUME_RATIO_WINDOW = 5
+
+# 随日线一起入库的指标（StockDaily 列）
+STORED_INDICATORS = ('ma5', 'ma10', 'ma20', 'volume_ratio')
+
+IndicatorFunc = Callable[[Dict[str, np.ndarray], "IndicatorSpec"], np.ndarray]
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    """指标声明"""
+    name: str
+    window: int                         # 计算窗口（K 线数）
+    func: IndicatorFunc                 # (输入列与依赖指标, 指标声明) -> 与输入等长的数组
+    inputs: Tuple[str, ...] = ('close',)  # 需要的行情列
+    deps: Tuple[str, ...] = ()          # 依赖的其他指标
+    description: str = ""
+
+
+def _rolling_mean(column: str) -> IndicatorFunc:
+    def func(data: Dict[str, np.ndarray], spec: IndicatorSpec) -> np.ndarray:
+        return pd.Series(data[column]).rolling(window=spec.window, min_periods=1).mean().to_numpy()
+    return func
+
+
+def _rolling_max(column: str) -> IndicatorFunc:
+    def func(data: Dict[str, np.ndarray], spec: IndicatorSpec) -> np.ndarray:
+        return pd.Series(data[column]).rolling(window=spec.window, min_periods=1).max().to_numpy()
+    return func
+
+
+def _volume_ratio(data: Dict[str, np.ndarray], spec: IndicatorSpec) -> np.ndarray:
+    base = np.empty_like(data['volume_ma5'])
+    base[0] = np.nan
+    base[1:] = data['volume_ma5'][:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = data['volume'] / base
+    return np.where(np.isnan(ratio), 1.0, ratio)
+
+
+class IndicatorRegistry:
+    """
+    指标注册表（线程安全）
+
+    缓存键为 (股票代码, 最新日期, 行数, 最新收盘价)：行数不同的窗口前几行口径不同，
+    收盘价用于识别盘中刷新过的当日 K 线。未传股票代码时不缓存。
+    """
+
+    def __init__(self, cache_size: int = 2048):
+        """
+        Args:
+            cache_size: 最多缓存的 (股票, 日期) 条目数（LRU 淘汰）
+        """
+        self.cache_size = cache_size
+        self._specs: Dict[str, IndicatorSpec] = {}
+        self._cache: "OrderedDict[tuple, Dict[str, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # === 注册 ===
+
+    def register(self, spec: IndicatorSpec) -> None:
+        """注册指标（依赖必须先注册）"""
+        missing = [dep for dep in spec.deps if dep not in self._specs]
+        if missing:
+            raise ValueError(f"指标 {spec.name} 依赖未注册的指标: {', '.join(missing)}")
+        self._specs[spec.name] = spec
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def spec(self, name: str) -> IndicatorSpec:
+        try:
+            return self._specs[name]
+        except KeyError:
+            raise KeyError(f"未注册的指标: {name}") from None
+
+    def resolve(self, names: Iterable[str]) -> List[str]:
+        """按依赖顺序展开请求的指标（依赖在前）"""
+        ordered: List[str] = []
+
+        def visit(name: str) -> None:
+            if name in ordered:
+                return
+            for dep in self.spec(name).deps:
+                visit(dep)
+            ordered.append(name)
+
+        for name in names:
+            visit(name)
+        return ordered
+
+    def warmup(self, name: str) -> int:
+        """指标完整所需的最少 K 线数（含依赖链）"""
+        spec = self.spec(name)
+        return max([spec.window] + [self.warmup(dep) for dep in spec.deps])
+
+    # === 计算 ===
+
+    def compute(
+        self,
+        df: pd.DataFrame,
+        names: Iterable[str],
+        code: Optional[str] = None,
+        strict: bool = False
+    ) -> Dict[str, np.ndarray]:
+        """
+        计算指标（只计算请求的指标及其依赖，已缓存的直接复用）
+
+        Args:
+            df: 按日期升序的日线数据（date 为列或索引）
+            names: 需要的指标名
+            code: 股票代码（提供时按 (代码, 最新日期) 缓存）
+            strict: 是否把不足窗口的前几行置为 NaN
+
+        Returns:
+            {指标名: 与 df 等长的数组}（缓存中的数组只读，需修改时请先复制）
+        """
+        names = list(names)
+        if df is None or df.empty:
+            return {name: np.empty(0) for name in names}
+
+        key = self._cache_key(code, df)
+        with self._lock:
+            cached = self._cache.get(key) if key is not None else None
+            if cached is not None:
+                self._cache.move_to_end(key)
+        values: Dict[str, np.ndarray] = dict(cached) if cached else {}
+
+        todo = [name for name in self.resolve(names) if name not in values]
+        with self._lock:
+            if todo:
+                self.misses += 1
+            else:
+                self.hits += 1
+        for name in todo:
+            spec = self._specs[name]
+            data = {col: df[col].to_numpy(dtype=np.float64) for col in spec.inputs}
+            data.update({dep: values[dep] for dep in spec.deps})
+            result = spec.func(data, spec)
+            result.flags.writeable = False
+            values[name] = result
+
+        if key is not None and todo:
+            with self._lock:
+                self._cache[key] = values
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        if not strict:
+            return {name: values[name] for name in names}
+        return {name: self._mask_warmup(values[name], self.warmup(name)) for name in names}
+
+    def attach(
+        self,
+        df: pd.DataFrame,
+        names: Iterable[str],
+        code: Optional[str] = None,
+        strict: bool = False,
+        ndigits: Optional[int] = None
+    ) -> pd.DataFrame:
+        """把指标作为列写入 df（原地修改）并返回 df"""
+        for name, values in self.compute(df, names, code=code, strict=strict).items():
+            df[name] = np.round(values, ndigits) if ndigits is not None else values
+        return df
+
+    def fill_missing(
+        self,
+        df: pd.DataFrame,
+        names: Iterable[str] = STORED_INDICATORS,
+        code: Optional[str] = None,
+        ndigits: Optional[int] = 2
+    ) -> pd.DataFrame:
+        """
+        只补齐缺失的指标值（原地修改）：列不存在或含 NaN 时才计算
+
+        用于读取入库数据的消费者（分析上下文、回测）：入库时已算好的值直接使用。
+        """
+        names = list(names)
+        if df.empty:
+            return df
+        needed = [
+            name for name in names
+            if name not in df.columns or np.isnan(df[name].to_numpy(dtype=np.float64)).any()
+        ]
+        if not needed:
+            return df
+        for name, values in self.compute(df, needed, code=code).items():
+            values = np.round(values, ndigits) if ndigits is not None else values
+            if name in df.columns:
+                df[name] = df[name].astype(np.float64).fillna(pd.Series(values, index=df.index))
+            else:
+                df[name] = values
+        return df
+
+    @staticmethod
+    def _mask_warmup(values: np.ndarray, warmup: int) -> np.ndarray:
+        if warmup <= 1:
+            return values
+        masked = values.copy()
+        masked[:warmup - 1] = np.nan
+        return masked
+
+    @staticmethod
+    def _cache_key(code: Optional[str], df: pd.DataFrame) -> Optional[tuple]:
+        if code is None:
+            return None
+        last_date = df['date'].iloc[-1] if 'date' in df.columns else df.index[-1]
+        return (code, str(last_date)[:10], len(df), float(df['close'].iloc[-1]))
+
+    # === 缓存管理 ===
+
+    def cache_info(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def _register_defaults(registry: IndicatorRegistry) -> None:
+    for window in MA_WINDOWS:
+        registry.register(IndicatorSpec(f'ma{window}', window, _rolling_mean('close'), description=f'{window}日均线'))
+    registry.register(IndicatorSpec(
+        'volume_ma5', VOLUME_RATIO_WINDOW, _rolling_mean('volume'), inputs=('volume',), description='5日均量'
+    ))
+    registry.register(IndicatorSpec(
+        'volume_ratio', VOLUME_RATIO_WINDOW + 1, _volume_ratio, inputs=('volume',), deps=('volume_ma5',),
+        description='量比（当日成交量/前5日均量）'
+    ))
+    registry.register(IndicatorSpec('high_20', 20, _rolling_max('high'), inputs=('high',), description='近20日最高价'))
+
+
+# 便捷函数
+_registry: Optional[IndicatorRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_indicator_registry() -> IndicatorRegistry:
+    """获取进程级共享的指标注册表（已注册默认指标）"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = IndicatorRegistry()
+                _register_defaults(registry)
+                _registry = registry
+    return _registry
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - LLM 响应缓存
+===================================
+
+职责：
+1. 按 (模型, 系统提示词, 生成参数, 提示词) 的哈希缓存 LLM 响应，内容完全相同的请求不再调用 API
+2. 持久化到 SQLite 文件，进程重启、WebUI 重复触发、回测重跑都能命中
+3. TTL 过期 + 条目数上限的 LRU 淘汰
+4. 命中率统计，支持全局关闭（LLM_CACHE_ENABLED=false）和单次绕过
+
+生成参数带温度，同一提示词多次调用本可能得到不同输出；缓存命中时复用第一次的结果，
+需要重新生成时使用单次绕过（use_cache=False）。
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """
+    LLM 响应缓存（线程安全，SQLite 持久化）
+
+    表结构：key（内容哈希）、model、response、created_at、accessed_at。
+    读取时更新 accessed_at，写入后条目数超过 max_entries 时按 accessed_at 淘汰最久未使用的条目。
+    """
+
+    def __init__(self, path: str, ttl: float = 86400.0, max_entries: int = 5000):
+        """
+        Args:
+            path: SQLite 文件路径（":memory:" 为仅内存）
+            ttl: 条目有效期（秒，<=0 表示不过期）
+            max_entries: 最多保留的条目数
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: Optional[str], system_prompt: Optional[str], generation_config: Dict[str, Any], prompt: str) -> str:
+        """计算请求内容的哈希（生成参数按键排序，顺序不同视为同一请求）"""
+        payload = json.dumps(
+            [model or '', system_prompt or '', generation_config or {}, prompt],
+            ensure_ascii=False, sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, created_at = row
+            if self.ttl > 0 and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return response
+
+    def put(self, key: str, response: str, model: Optional[str] = None) -> None:
+        """写入缓存（空响应不缓存），超出容量时淘汰最久未使用的条目"""
+        if not response:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now)
+            )
+            self.writes += 1
+            if self.ttl > 0:
+                self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+                self.evictions += count - self.max_entries
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'entries': entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'writes': self.writes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self.hits = self.misses = self.expired = self.evictions = self.writes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# 便捷函数
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """获取进程级共享的 LLM 响应缓存；LLM_CACHE_ENABLED=false 时返回 None"""
+    global _llm_cache
+    config = get_config()
+    if not config.llm_cache_enabled:
+        return None
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache(
+                    config.llm_cache_path,
+                    ttl=config.llm_cache_ttl,
+                    max_entries=config.llm_cache_max_entries,
+                )
+    return _llm_cache
@@ -31,6 +31,7 @@ if os.getenv("GITHUB_ACTIONS") != "true":
     pass
 
 import argparse
+import asyncio
 import logging
 import sys
 import time
@@ -38,7 +39,8 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, date, timezone, timedelta
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Callable, List, Dict, Any, Optional, Set, Tuple
+import pandas as pd
 from sqlalchemy.orm import Session # 导入 Session
 
 from config import get_config, Config
@@ -49,6 +51,8 @@ from notification import NotificationService, NotificationChannel, send_daily_re
 from search_service import SearchService, SearchResponse
 from enums import ReportType
 from stock_analyzer import StockTrendAnalyzer, TrendAnalysisResult
+from indicator_engine import get_indicator_engine
+from llm_cache import get_llm_cache
 from market_analyzer import MarketAnalyzer
 
 # 导入 TradingEngine 和 LLMOrchestrator
@@ -139,7 +143,8 @@ class StockAnalysisPipeline:
     def __init__(
         self,
         config: Optional[Config] = None,
-        max_workers: Optional[int] = None
+        max_workers: Optional[int] = None,
+        bypass_llm_cache: bool = False
     ):
         """
         初始化调度器
@@ -147,17 +152,25 @@ class StockAnalysisPipeline:
         Args:
             config: 配置对象（可选，默认使用全局配置）
             max_workers: 最大并发线程数（可选，默认从配置读取）
+            bypass_llm_cache: 是否跳过 LLM 响应缓存、重新生成摘要和决策（新结果仍写入缓存；
+                              与 fetch_and_save_stock_data 的 force_refresh 无关，不会重新拉取行情）
         """
         self.config = config or get_config()
         self.max_workers = max_workers or self.config.max_workers
+        # 本次运行是否使用 LLM 响应缓存
+        self.use_llm_cache = not bypass_llm_cache
         
         # 初始化各模块
         self.db = get_db()
         self.fetcher_manager = DataFetcherManager()
         self.akshare_fetcher = AkshareFetcher()  # 用于获取增强数据（量比、筹码等）
         self.trend_analyzer = StockTrendAnalyzer()  # 趋势分析器
+        self.indicators = get_indicator_engine()  # 流式指标引擎（均线/量比滚动状态）
         self.notifier = NotificationService()
         
+        # 本轮已通过批量预取写入数据库的股票（单股流程中跳过重复获取）
+        self._prefetched_codes: Set[str] = set()
+        
         # 初始化 LLM 协调器
         self.orchestrator = LLMOrchestrator(config=self.config)
         
@@ -179,7 +192,8 @@ class StockAnalysisPipeline:
         断点续传逻辑：
         1. 检查数据库是否已有今日数据
         2. 如果有且不强制刷新，则跳过网络请求
-        3. 否则从数据源获取并保存
+        3. 否则以本地最新日期为起点增量获取并保存
+           （本地历史不足、断档或复权因子变化时回退为完整窗口）
         
         Args:
             code: 股票代码
@@ -196,9 +210,19 @@ class StockAnalysisPipeline:
                 logger.info(f"[{code}] 今日数据已存在，跳过获取（断点续传）")
                 return True, None
             
-            # 从数据源获取数据
+            # 本轮已批量预取（如非交易日没有今日数据），跳过
+            if not force_refresh and code in self._prefetched_codes:
+                logger.info(f"[{code}] 本轮已批量获取，跳过")
+                return True, None
+            
+            # 从数据源获取数据（强制刷新时忽略本地历史，请求完整窗口）
             logger.info(f"[{code}] 开始从数据源获取数据...")
-            df, source_name = self.fetcher_manager.get_daily_data(code, days=30)
+            history = None
+            if not force_refresh:
+                history = self.db.get_latest_data_df(
+                    code, days=self.fetcher_manager.INCREMENTAL_HISTORY_BARS
+                )
+            df, source_name = self.fetcher_manager.get_daily_data_incremental(code, history, days=30)
             
             if df is None or df.empty:
                 return False, "获取数据为空"
@@ -206,6 +230,7 @@ class StockAnalysisPipeline:
             # 保存到数据库
             saved_count = self.db.save_daily_data(df, code, source_name)
             logger.info(f"[{code}] 数据保存成功（来源: {source_name}，新增 {saved_count} 条）")
+            self._update_indicators(code, df)
             
             return True, None
             
@@ -214,7 +239,63 @@ class StockAnalysisPipeline:
             logger.error(f"[{code}] {error_msg}")
             return False, error_msg
     
-    def analyze_stock(self, code: str) -> Optional[AnalysisResult]:
+    def prefetch_daily_data(self, stock_codes: List[str]) -> int:
+        """
+        批量预取并保存多只股票的日线数据
+        
+        在并发分析之前调用：对缺少今日数据的股票按增量规则一次批量请求
+        （efinance 每批只需一次限流往返），成功的股票在单股流程中不再重复获取；
+        失败的股票留给单股流程按原逻辑逐只重试。
+        
+        Args:
+            stock_codes: 股票代码列表
+            
+        Returns:
+            成功保存的股票数
+        """
+        today = date.today()
+        pending = [code for code in stock_codes if not self.db.has_today_data(code, today)]
+        if not pending:
+            return 0
+        
+        logger.info(f"批量预取 {len(pending)} 只股票的日线数据...")
+        histories = {
+            code: self.db.get_latest_data_df(code, days=self.fetcher_manager.INCREMENTAL_HISTORY_BARS)
+            for code in pending
+        }
+        
+        try:
+            fetched = self.fetcher_manager.get_daily_data_incremental_batch(histories, days=30)
+        except Exception as e:
+            logger.warning(f"批量预取失败，回退为逐只获取: {e}")
+            return 0
+        
+        for code, (df, source_name) in fetched.items():
+            try:
+                saved_count = self.db.save_daily_data(df, code, source_name)
+                self._prefetched_codes.add(code)
+                self._update_indicators(code, df)
+                logger.info(f"[{code}] 批量预取保存成功（来源: {source_name}，新增 {saved_count} 条）")
+            except Exception as e:
+                logger.warning(f"[{code}] 批量预取保存失败: {e}")
+        
+        logger.info(f"批量预取完成，成功 {len(self._prefetched_codes & set(pending))}/{len(pending)} 只")
+        return len(self._prefetched_codes & set(pending))
+    
+    def _update_indicators(self, code: str, df: pd.DataFrame) -> None:
+        """
+        新日线入库后更新流式指标状态
+        
+        已有状态的股票只追加新 K 线（O(1)/根）；首次出现或状态落后于新数据（中间缺 K 线）的股票从数据库预热。
+        """
+        try:
+            if code not in self.indicators or not self.indicators.update_frame(code, df):
+                history = self.db.get_latest_data_df(code, days=self.indicators.WARMUP_BARS)
+                self.indicators.warm_up(code, history if not history.empty else df)
+        except Exception as e:
+            logger.warning(f"[{code}] 更新指标状态失败: {e}")
+    
+    def analyze_stock(self, code: str, single_stock_notify: bool = False) -> Optional[AnalysisResult]:
         """
         分析单只股票（增强版：含量比、换手率、筹码分析、多维度情报）
         
@@ -228,85 +309,124 @@ class StockAnalysisPipeline:
         
         Args:
             code: 股票代码
+            single_stock_notify: 是否启用单股推送模式（流式输出时先推送核心结论）
             
         Returns:
             AnalysisResult 或 None（如果分析失败）
         """
         try:
-            # 获取股票名称（优先从实时行情获取真实名称）
-            stock_name = STOCK_NAME_MAP.get(code, '')
-            
-            # Step 1: 获取实时行情（量比、换手率等）
-            realtime_quote: Optional[RealtimeQuote] = None
-            try:
-                realtime_quote = self.akshare_fetcher.get_realtime_quote(code)
-                if realtime_quote:
-                    # 使用实时行情返回的真实股票名称
-                    if realtime_quote.name:
-                        stock_name = realtime_quote.name
-                    logger.info(f"[{code}] {stock_name} 实时行情: 价格={realtime_quote.price}, "
-                              f"量比={realtime_quote.volume_ratio}, 换手率={realtime_quote.turnover_rate}%")
-            except Exception as e:
-                logger.warning(f"[{code}] 获取实时行情失败: {e}")
-            
-            # 如果还是没有名称，使用代码作为名称
-            if not stock_name:
-                stock_name = f'股票{code}'
-            
-            # Step 2: 获取筹码分布
-            chip_data: Optional[ChipDistribution] = None
-            try:
-                chip_data = self.akshare_fetcher.get_chip_distribution(code)
-                if chip_data:
-                    logger.info(f"[{code}] 筹码分布: 获利比例={chip_data.profit_ratio:.1%}, "
-                              f"90%集中度={chip_data.concentration_90:.2%}")
-            except Exception as e:
-                logger.warning(f"[{code}] 获取筹码分布失败: {e}")
-            
-            # Step 3: 趋势分析（基于交易理念）
-            trend_result: Optional[TrendAnalysisResult] = None
-            try:
-                # 获取历史数据进行趋势分析
-                context = self.db.get_analysis_context(code)
-                if context and 'raw_data' in context:
-                    import pandas as pd
-                    raw_data = context['raw_data']
-                    if isinstance(raw_data, list) and len(raw_data) > 0:
-                        df = pd.DataFrame(raw_data)
-                        trend_result = self.trend_analyzer.analyze(df, code)
-                        logger.info(f"[{code}] 趋势分析: {trend_result.trend_status.value}, "
-                                  f"买入信号={trend_result.buy_signal.value}, 评分={trend_result.signal_score}")
-            except Exception as e:
-                logger.warning(f"[{code}] 趋势分析失败: {e}")
-            
-            # Step 4: 获取分析上下文（技术面数据）
-            # 注意: context 在上一步趋势分析中已获取
-            if context is None:
-                context = self.db.get_analysis_context(code)
-            
-            if context is None:
-                logger.warning(f"[{code}] 无法获取分析上下文，跳过分析")
+            prepared = self.prepare_analysis_context(code)
+            if prepared is None:
                 return None
-            
-            # Step 5: 增强上下文数据（添加实时行情、筹码、趋势分析结果、股票名称）
-            enhanced_context = self._enhance_context(
-                context, 
-                realtime_quote, 
-                chip_data, 
-                trend_result,
-                stock_name  # 传入股票名称
-            )
-            
-            # Step 6: 调用 LLMOrchestrator 进行综合分析
-            result = self.orchestrator.analyze(enhanced_context, stock_name)
-            
-            return result
+            enhanced_context, stock_name = prepared
+            return self.analyze_prepared(code, enhanced_context, stock_name, single_stock_notify)
             
         except Exception as e:
             logger.error(f"[{code}] 分析失败: {e}")
             logger.exception(f"[{code}] 详细错误信息:")
             return None
     
+    def analyze_prepared(
+        self,
+        code: str,
+        context: Dict[str, Any],
+        stock_name: str,
+        single_stock_notify: bool = False
+    ) -> AnalysisResult:
+        """
+        对已准备好的上下文调用 LLMOrchestrator 进行综合分析（analyze_stock 的 Step 6）
+        
+        Args:
+            code: 股票代码
+            context: prepare_analysis_context 返回的增强上下文
+            stock_name: 股票名称
+            single_stock_notify: 是否启用单股推送模式（流式输出时先推送核心结论）
+        """
+        return self.orchestrator.analyze(
+            context, stock_name,
+            on_core_ready=self.make_core_handler(code, single_stock_notify),
+            use_cache=self.use_llm_cache
+        )
+    
+    def prepare_analysis_context(self, code: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """
+        准备 AI 分析所需的增强上下文（analyze_stock 的 Step 1-5，不含 LLM 调用）
+        
+        Args:
+            code: 股票代码
+            
+        Returns:
+            (增强后的上下文, 股票名称)；无法获取分析上下文时返回 None
+        """
+        # 获取股票名称（优先从实时行情获取真实名称）
+        stock_name = STOCK_NAME_MAP.get(code, '')
+        
+        # Step 1: 获取实时行情（量比、换手率等）
+        realtime_quote: Optional[RealtimeQuote] = None
+        try:
+            realtime_quote = self.akshare_fetcher.get_realtime_quote(code)
+            if realtime_quote:
+                # 使用实时行情返回的真实股票名称
+                if realtime_quote.name:
+                    stock_name = realtime_quote.name
+                logger.info(f"[{code}] {stock_name} 实时行情: 价格={realtime_quote.price}, "
+                          f"量比={realtime_quote.volume_ratio}, 换手率={realtime_quote.turnover_rate}%")
+        except Exception as e:
+            logger.warning(f"[{code}] 获取实时行情失败: {e}")
+        
+        # 如果还是没有名称，使用代码作为名称
+        if not stock_name:
+            stock_name = f'股票{code}'
+        
+        # Step 2: 获取筹码分布
+        chip_data: Optional[ChipDistribution] = None
+        try:
+            chip_data = self.akshare_fetcher.get_chip_distribution(code)
+            if chip_data:
+                logger.info(f"[{code}] 筹码分布: 获利比例={chip_data.profit_ratio:.1%}, "
+                          f"90%集中度={chip_data.concentration_90:.2%}")
+        except Exception as e:
+            logger.warning(f"[{code}] 获取筹码分布失败: {e}")
+        
+        # Step 3: 趋势分析（基于交易理念）
+        trend_result: Optional[TrendAnalysisResult] = None
+        context: Optional[Dict[str, Any]] = None
+        try:
+            # 获取历史数据进行趋势分析
+            context = self.db.get_analysis_context(code)
+            if context is not None:
+                # raw_data 为最近 N 条日线（按日期升序的 DataFrame）
+                raw_data = context.get('raw_data')
+                if raw_data is not None and not raw_data.empty:
+                    # 状态缺失或与数据库最新 K 线不一致（从 INDICATOR_STATE_PATH 加载的旧状态）时重建
+                    if not self.indicators.is_synced(code, raw_data):
+                        self.indicators.warm_up(code, raw_data)
+                    trend_result = self.trend_analyzer.analyze(raw_data, code)
+                    logger.info(f"[{code}] 趋势分析: {trend_result.trend_status.value}, "
+                              f"买入信号={trend_result.buy_signal.value}, 评分={trend_result.signal_score}")
+        except Exception as e:
+            logger.warning(f"[{code}] 趋势分析失败: {e}")
+        
+        # Step 4: 获取分析上下文（技术面数据）
+        # 注意: context 在上一步趋势分析中已获取
+        if context is None:
+            context = self.db.get_analysis_context(code)
+        
+        if context is None:
+            logger.warning(f"[{code}] 无法获取分析上下文，跳过分析")
+            return None
+        
+        # Step 5: 增强上下文数据（添加实时行情、筹码、趋势分析结果、股票名称）
+        enhanced_context = self._enhance_context(
+            context, 
+            realtime_quote, 
+            chip_data, 
+            trend_result,
+            stock_name  # 传入股票名称
+        )
+        
+        return enhanced_context, stock_name
+    
     def _enhance_context(
         self,
         context: Dict[str, Any],
@@ -352,6 +472,17 @@ class StockAnalysisPipeline:
                 'circ_mv': realtime_quote.circ_mv,
                 'change_60d': realtime_quote.change_60d,
             }
+            
+            # 盘中均线：以现价作为当日 K 线试算（不改变指标状态）
+            intraday = None
+            if realtime_quote.price and context.get('code'):
+                intraday = self.indicators.preview(context['code'], date.today(), realtime_quote.price)
+            if intraday:
+                enhanced['realtime'].update({
+                    'ma5': round(intraday['ma5'], 2),
+                    'ma10': round(intraday['ma10'], 2),
+                    'ma20': round(intraday['ma20'], 2),
+                })
         
         # 添加筹码分布
         if chip_data:
@@ -443,67 +574,19 @@ class StockAnalysisPipeline:
                 logger.info(f"[{code}] 跳过 AI 分析（dry-run 模式）")
                 return None
             
-            result = self.analyze_stock(code)
+            prepared = self.prepare_analysis_context(code)
+            if prepared is None:
+                return None
+            context, stock_name = prepared
+            result = self.analyze_prepared(code, context, stock_name, single_stock_notify)
             
             if result:
-                self.db.save_analysis_record(result)
-                logger.info(
-                    f"[{code}] 分析完成: {result.operation_advice}, "
-                    f"评分 {result.sentiment_score}"
-                )
-                
-                # ==== 交易引擎集成 ====
-                # 获取当前价格
-                current_price = 0.0
-                if 'realtime' in result.context and 'price' in result.context['realtime']:
-                    current_price = result.context['realtime']['price']
-                elif 'today' in result.context and 'close' in result.context['today']:
-                    current_price = result.context['today']['close']
-                
-                if current_price > 0:
-                    with self.db.get_session() as session: # 获取数据库会话
-                        # 根据配置的 trading_mode 决定 session_id
-                        if self.config.trading_mode == 'paper':
-                            session_id = "live_paper_session" # 固定的模拟会话ID
-                        elif self.config.trading_mode == 'live':
-                            session_id = "live_real_session" # 固定的实盘会话ID
-                        else: # 回测模式
-                            # 回测模式的 session_id 将由 Backtester 传递
-                            # 在此处，如果是单次运行，则默认到 paper 模式
-                            session_id = "live_paper_session"
-                            logger.warning(f"检测到非回测模式下 trading_mode 为 {self.config.trading_mode}，默认使用 'live_paper_session'。")
-
-                        trading_engine = TradingEngine(
-                            db_session=session, 
-                            config=self.config,
-                            session_id=session_id
-                        )
-                        order_id = trading_engine.process_analysis(code, result, current_price)
-                        if order_id:
-                            logger.info(f"[{code}] 交易决策已执行，订单ID: {order_id}")
-                else:
-                    logger.warning(f"[{code}] 未获取到有效当前价格，跳过交易决策。")
-                # ==== 交易引擎集成结束 ====
+                # 保存并按完整结果执行交易决策
+                self.persist_result(code, result, context)
                 
                 # 单股推送模式（#55）：每分析完一只股票立即推送
-                if single_stock_notify and self.notifier.is_available():
-                    try:
-                        # 根据报告类型选择生成方法
-                        if report_type == ReportType.FULL:
-                            # 完整报告：使用决策仪表盘格式
-                            report_content = self.notifier.generate_dashboard_report([result])
-                            logger.info(f"[{code}] 使用完整报告格式")
-                        else:
-                            # 精简报告：使用单股报告格式（默认）
-                            report_content = self.notifier.generate_single_stock_report(result)
-                            logger.info(f"[{code}] 使用精简报告格式")
-                        
-                        if self.notifier.send(report_content):
-                            logger.info(f"[{code}] 单股推送成功")
-                        else:
-                            logger.warning(f"[{code}] 单股推送失败")
-                    except Exception as e:
-                        logger.error(f"[{code}] 单股推送异常: {e}")
+                if single_stock_notify:
+                    self.notify_single_stock(code, result, report_type)
             
             return result
             
@@ -512,6 +595,256 @@ class StockAnalysisPipeline:
             logger.exception(f"[{code}] 处理过程发生未知异常: {e}")
             return None
     
+    def prepare_decision_input(self, code: str) -> Optional[Tuple[Dict[str, Any], str, Optional[str], List[str]]]:
+        """
+        批量决策的准备阶段：获取数据、构建上下文、搜索并摘要新闻（不调用决策 LLM）
+        
+        趋势信号明确（规则直出）的股票不搜索新闻。
+        
+        Args:
+            code: 股票代码
+            
+        Returns:
+            (context, stock_name, news_summary, route)，上下文缺失或异常时返回 None
+        """
+        logger.info(f"========== 开始处理 {code} ==========")
+        
+        try:
+            success, error = self.fetch_and_save_stock_data(code)
+            if not success:
+                logger.warning(f"[{code}] 数据获取失败: {error}")
+                # 即使获取失败，也尝试用已有数据分析
+            
+            prepared = self.prepare_analysis_context(code)
+            if prepared is None:
+                return None
+            context, stock_name = prepared
+            
+            news_summary, route = self.gather_news(code, context, stock_name)
+            return context, stock_name, news_summary, route
+            
+        except Exception as e:
+            logger.exception(f"[{code}] 处理过程发生未知异常: {e}")
+            return None
+    
+    def gather_news(
+        self,
+        code: str,
+        context: Dict[str, Any],
+        stock_name: str
+    ) -> Tuple[Optional[str], List[str]]:
+        """
+        搜索并摘要新闻（分阶段调度的搜索/摘要阶段）
+        
+        趋势信号明确时跳过（决策阶段按规则直接给出结论）；新闻情报缓存有效时不重新搜索，新闻较短时不摘要。
+        
+        Returns:
+            (news_summary, route)，route 为经过的节点，交给 LLMOrchestrator.decide / decide_batch 记录到结果上
+        """
+        if self.orchestrator.is_decisive(context):
+            return None, []
+        raw_news, route = self.orchestrator.search_news(code, stock_name, use_cache=self.use_llm_cache)
+        news_summary, summary_route = self.orchestrator.summarize_news(
+            code, stock_name, raw_news, use_cache=self.use_llm_cache
+        )
+        return news_summary, route + summary_route
+    
+    def run_batched(self, stock_codes: List[str], single_stock_notify: bool = False) -> List[AnalysisResult]:
+        """
+        批量决策调度：线程池并发准备数据和新闻，决策按 DECISION_BATCH_SIZE 合并请求
+        
+        每批决策完成后立即保存、执行交易决策和单股推送。
+        
+        Args:
+            stock_codes: 股票代码列表
+            single_stock_notify: 是否启用单股推送模式
+            
+        Returns:
+            分析结果列表
+        """
+        prepared = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for item in executor.map(self.prepare_decision_input, stock_codes):
+                if item:
+                    prepared.append(item)
+        
+        batch_size = self.config.decision_batch_size
+        logger.info(f"批量决策: {len(prepared)} 只股票，每批最多 {batch_size} 只")
+        
+        results = []
+        for start in range(0, len(prepared), batch_size):
+            batch = prepared[start:start + batch_size]
+            for (context, _, _, _), result in zip(batch, self.orchestrator.decide_batch(batch, use_cache=self.use_llm_cache)):
+                code = context.get('code', 'Unknown')
+                try:
+                    self.persist_result(code, result, context)
+                    if single_stock_notify:
+                        self.notify_single_stock(code, result)
+                    results.append(result)
+                except Exception as e:
+                    # 捕获所有异常，确保单股失败不影响整体
+                    logger.exception(f"[{code}] 处理过程发生未知异常: {e}")
+        return results
+    
+    def make_core_handler(
+        self,
+        code: str,
+        single_stock_notify: bool = False
+    ) -> Optional[Callable[[AnalysisResult], None]]:
+        """
+        构造核心结论预览回调（传给 LLMOrchestrator.analyze / decide 的 on_core_ready）
+        
+        流式输出的预览结果（partial=True）未经完整响应校验，只在单股推送模式下先推送核心结论；
+        交易决策由 persist_result 按完整结果执行，完整报告由调用方稍后推送。
+        
+        Args:
+            code: 股票代码
+            single_stock_notify: 是否启用单股推送模式
+            
+        Returns:
+            回调函数；非单股推送模式下无需预览，返回 None
+        """
+        if not single_stock_notify:
+            return None
+        
+        def on_core_ready(core: AnalysisResult) -> None:
+            if core.partial:
+                self.notify_core_decision(code, core)
+        return on_core_ready
+    
+    def persist_result(
+        self,
+        code: str,
+        result: AnalysisResult,
+        context: Optional[Dict[str, Any]] = None,
+        execute_trade: bool = True
+    ) -> None:
+        """
+        保存分析记录并交给交易引擎执行决策
+        
+        Args:
+            code: 股票代码
+            result: 分析结果
+            context: 分析上下文（提供当前价格）
+            execute_trade: 是否执行交易决策
+        """
+        self.db.save_analysis_record(result)
+        logger.info(
+            f"[{code}] 分析完成: {result.operation_advice}, "
+            f"评分 {result.sentiment_score}"
+        )
+        if execute_trade:
+            self.execute_trade_decision(code, result, context)
+    
+    def execute_trade_decision(
+        self,
+        code: str,
+        result: AnalysisResult,
+        context: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        交给交易引擎执行决策（只依赖评分/操作建议等核心字段）
+        
+        Args:
+            code: 股票代码
+            result: 完整分析结果（不可为流式输出的预览结果）
+            context: 分析上下文（提供当前价格）
+        """
+        if result.partial:
+            logger.warning(f"[{code}] 流式预览结果不执行交易决策，等待完整结果。")
+            return
+        
+        # ==== 交易引擎集成 ====
+        # 获取当前价格
+        context = context or {}
+        current_price = 0.0
+        if 'realtime' in context and 'price' in context['realtime']:
+            current_price = context['realtime']['price']
+        elif 'today' in context and 'close' in context['today']:
+            current_price = context['today']['close']
+        
+        if current_price > 0:
+            with self.db.get_session() as session: # 获取数据库会话
+                # 根据配置的 trading_mode 决定 session_id
+                if self.config.trading_mode == 'paper':
+                    session_id = "live_paper_session" # 固定的模拟会话ID
+                elif self.config.trading_mode == 'live':
+                    session_id = "live_real_session" # 固定的实盘会话ID
+                else: # 回测模式
+                    # 回测模式的 session_id 将由 Backtester 传递
+                    # 在此处，如果是单次运行，则默认到 paper 模式
+                    session_id = "live_paper_session"
+                    logger.warning(f"检测到非回测模式下 trading_mode 为 {self.config.trading_mode}，默认使用 'live_paper_session'。")
+
+                trading_engine = TradingEngine(
+                    db_session=session, 
+                    config=self.config,
+                    session_id=session_id
+                )
+                order_id = trading_engine.process_analysis(code, result.to_dict(), current_price)
+                if order_id:
+                    logger.info(f"[{code}] 交易决策已执行，订单ID: {order_id}")
+        else:
+            logger.warning(f"[{code}] 未获取到有效当前价格，跳过交易决策。")
+        # ==== 交易引擎集成结束 ====
+    
+    def notify_core_decision(self, code: str, core: AnalysisResult) -> None:
+        """
+        单股推送：流式输出的核心结论先行推送（完整报告生成后另行推送）
+        
+        Args:
+            code: 股票代码
+            core: 核心结论预览结果
+        """
+        if not self.notifier.is_available():
+            return
+        content = (
+            f"{core.get_emoji()} **{core.name}({code})** 核心结论\n"
+            f"操作建议: {core.operation_advice} | 趋势: {core.trend_prediction} | "
+            f"评分: {core.sentiment_score} | 置信度: {core.confidence_level}\n"
+            f"完整分析生成中..."
+        )
+        try:
+            if self.notifier.send(content):
+                logger.info(f"[{code}] 核心结论推送成功")
+            else:
+                logger.warning(f"[{code}] 核心结论推送失败")
+        except Exception as e:
+            logger.error(f"[{code}] 核心结论推送异常: {e}")
+    
+    def notify_single_stock(
+        self,
+        code: str,
+        result: AnalysisResult,
+        report_type: ReportType = ReportType.SIMPLE
+    ) -> None:
+        """
+        单股推送（#55）：按报告类型生成报告并立即推送
+        
+        Args:
+            code: 股票代码
+            result: 分析结果
+            report_type: 报告类型枚举
+        """
+        if self.notifier.is_available():
+            try:
+                # 根据报告类型选择生成方法
+                if report_type == ReportType.FULL:
+                    # 完整报告：使用决策仪表盘格式
+                    report_content = self.notifier.generate_dashboard_report([result])
+                    logger.info(f"[{code}] 使用完整报告格式")
+                else:
+                    # 精简报告：使用单股报告格式（默认）
+                    report_content = self.notifier.generate_single_stock_report(result)
+                    logger.info(f"[{code}] 使用精简报告格式")
+                
+                if self.notifier.send(report_content):
+                    logger.info(f"[{code}] 单股推送成功")
+                else:
+                    logger.warning(f"[{code}] 单股推送失败")
+            except Exception as e:
+                logger.error(f"[{code}] 单股推送异常: {e}")
+    
     def run(
         self, 
         stock_codes: Optional[List[str]] = None,
@@ -548,7 +881,8 @@ class StockAnalysisPipeline:
         
         logger.info(f"===== 开始分析 {len(stock_codes)} 只股票 =====")
         logger.info(f"股票列表: {', '.join(stock_codes)}")
-        logger.info(f"并发数: {self.max_workers}, 模式: {'仅获取数据' if dry_run else '完整分析'}")
+        logger.info(f"并发数: {self.max_workers}, 模式: {'仅获取数据' if dry_run else '完整分析'}, "
+                    f"调度: {self.config.pipeline_mode}, 决策批量: {self.config.decision_batch_size}")
         
         # 单股推送模式（#55）：从配置读取
         single_stock_notify = getattr(self.config, 'single_stock_notify', False)
@@ -557,29 +891,56 @@ class StockAnalysisPipeline:
         
         results: List[AnalysisResult] = []
         
-        # 使用线程池并发处理
-        # 注意：max_workers 设置较低（默认3）以避免触发反爬
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交任务
-            future_to_code = {
-                executor.submit(
-                    self.process_single_stock, 
-                    code, 
-                    skip_analysis=dry_run,
-                    single_stock_notify=single_stock_notify and send_notification
-                ): code
-                for code in stock_codes
-            }
-            
-            # 收集结果
-            for future in as_completed(future_to_code):
-                code = future_to_code[future]
-                try:
-                    result = future.result()
-                    if result:
-                        results.append(result)
-                except Exception as e:
-                    logger.error(f"[{code}] 任务执行失败: {e}")
+        # 批量预取日线数据（多只股票共用一次请求，减少限流等待）
+        if len(stock_codes) > 1:
+            self.prefetch_daily_data(stock_codes)
+        
+        if self.config.pipeline_mode == 'async':
+            # asyncio 模式：各阶段（数据/搜索/LLM/推送）分别限制并发
+            from async_pipeline import AsyncStockPipeline
+            results = asyncio.run(AsyncStockPipeline(self).run(
+                stock_codes,
+                skip_analysis=dry_run,
+                single_stock_notify=single_stock_notify and send_notification
+            ))
+        elif self.config.pipeline_mode == 'staged':
+            # 分阶段流水线：阶段间有界队列，各阶段独立工作线程
+            from staged_pipeline import StagedStockPipeline
+            results = StagedStockPipeline(self).run(
+                stock_codes,
+                skip_analysis=dry_run,
+                single_stock_notify=single_stock_notify and send_notification
+            )
+        elif self.config.decision_batch_size > 1 and not dry_run:
+            # 批量决策：多只股票合并为一次决策请求
+            results = self.run_batched(
+                stock_codes,
+                single_stock_notify=single_stock_notify and send_notification
+            )
+        else:
+            # 使用线程池并发处理
+            # 注意：max_workers 设置较低（默认3）以避免触发反爬
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # 提交任务
+                future_to_code = {
+                    executor.submit(
+                        self.process_single_stock, 
+                        code, 
+                        skip_analysis=dry_run,
+                        single_stock_notify=single_stock_notify and send_notification
+                    ): code
+                    for code in stock_codes
+                }
+                
+                # 收集结果
+                for future in as_completed(future_to_code):
+                    code = future_to_code[future]
+                    try:
+                        result = future.result()
+                        if result:
+                            results.append(result)
+                    except Exception as e:
+                        logger.error(f"[{code}] 任务执行失败: {e}")
         
         # 统计
         elapsed_time = time.time() - start_time
@@ -595,6 +956,13 @@ class StockAnalysisPipeline:
         
         logger.info(f"===== 分析完成 =====")
         logger.info(f"成功: {success_count}, 失败: {fail_count}, 耗时: {elapsed_time:.2f} 秒")
+        self._log_source_stats()
+        self._log_llm_cache_stats()
+        
+        try:
+            self.indicators.save()
+        except Exception as e:
+            logger.warning(f"保存指标状态失败: {e}")
         
         # 发送通知（单股推送模式下跳过汇总推送，避免重复）
         if results and send_notification and not dry_run:
@@ -607,6 +975,28 @@ class StockAnalysisPipeline:
         
         return results
     
+    def _log_source_stats(self) -> None:
+        """输出各数据源的成功率、耗时分位数与熔断状态"""
+        for name, stats in self.fetcher_manager.source_stats.items():
+            p50 = f"{stats['p50_latency']:.2f}s" if stats['p50_latency'] is not None else "-"
+            p95 = f"{stats['p95_latency']:.2f}s" if stats['p95_latency'] is not None else "-"
+            rate = f"{stats['success_rate']:.0%}" if stats['success_rate'] is not None else "-"
+            logger.info(
+                f"[数据源统计] {name}: 请求 {stats['requests']} 次, 成功率 {rate}, "
+                f"p50 {p50}, p95 {p95}, 近期限流 {stats['recent_rate_limits']} 次, 熔断状态 {stats['circuit']}"
+            )
+    
+    def _log_llm_cache_stats(self) -> None:
+        """输出 LLM 响应缓存的命中情况"""
+        cache = get_llm_cache()
+        if cache is None:
+            return
+        stats = cache.stats()
+        logger.info(
+            f"[LLM缓存] 命中 {stats['hits']} 次, 未命中 {stats['misses']} 次 (命中率 {stats['hit_rate']:.0%}), "
+            f"过期 {stats['expired']}, 淘汰 {stats['evictions']}, 现有 {stats['entries']} 条"
+        )
+    
     def _send_notifications(self, results: List[AnalysisResult], skip_push: bool = False) -> None:
         """
         发送分析结果通知
@@ -684,6 +1074,7 @@ def parse_arguments() -> argparse.Namespace:
   python main.py --stocks 600519,000001  # 指定分析特定股票
   python main.py --no-notify        # 不发送推送通知
   python main.py --single-notify    # 启用单股推送模式（每分析完一只立即推送）
+  python main.py --no-llm-cache     # 不使用 LLM 响应缓存，重新生成分析
   python main.py --schedule         # 启用定时任务模式
   python main.py --market-review    # 仅运行大盘复盘
         '''
@@ -719,6 +1110,12 @@ def parse_arguments() -> argparse.Namespace:
         help='启用单股推送模式：每分析完一只股票立即推送，而不是汇总推送'
     )
     
+    parser.add_argument(
+        '--no-llm-cache',
+        action='store_true',
+        help='本次运行不使用 LLM 响应缓存，重新生成新闻摘要和分析结论（新结果仍写入缓存）'
+    )
+    
     parser.add_argument(
         '--workers',
         type=int,
@@ -726,6 +1123,13 @@ def parse_arguments() -> argparse.Namespace:
         help='并发线程数（默认使用配置值）'
     )
     
+    parser.add_argument(
+        '--pipeline',
+        choices=['thread', 'async', 'staged'],
+        default=None,
+        help='调度模式：thread（线程池）、async（asyncio，按阶段限制并发）或 staged（分阶段流水线），默认使用配置值'
+    )
+    
     parser.add_argument(
         '--schedule',
         action='store_true',
@@ -826,10 +1230,15 @@ def run_full_analysis(
         if getattr(args, 'single_notify', False):
             config.single_stock_notify = True
         
+        # 命令行参数 --pipeline 覆盖配置
+        if getattr(args, 'pipeline', None):
+            config.pipeline_mode = args.pipeline
+        
         # 创建调度器
         pipeline = StockAnalysisPipeline(
             config=config,
-            max_workers=args.workers
+            max_workers=args.workers,
+            bypass_llm_cache=getattr(args, 'no_llm_cache', False)
         )
         
         # 1. 运行个股分析
@@ -20,6 +20,9 @@ import akshare as ak
 import pandas as pd
 
 from config import get_config
+from data_provider.akshare_fetcher import A_SPOT_SOURCE
+from data_provider.rate_limiter import HOST_EASTMONEY, get_rate_limiter
+from data_provider.spot_cache import get_spot_cache
 from search_service import SearchService
 
 logger = logging.getLogger(__name__)
@@ -133,10 +136,13 @@ class MarketAnalyzer:
         
         return overview
 
-    def _call_akshare_with_retry(self, fn, name: str, attempts: int = 2):
+    def _call_akshare_with_retry(self, fn, name: str, attempts: int = 2, host: Optional[str] = HOST_EASTMONEY):
         last_error: Optional[Exception] = None
         for attempt in range(1, attempts + 1):
             try:
+                # 与个股数据获取共享同一主机的全局限流器
+                if host is not None:
+                    get_rate_limiter(host).acquire()
                 return fn()
             except Exception as e:
                 last_error = e
@@ -154,7 +160,7 @@ class MarketAnalyzer:
             logger.info("[大盘] 获取主要指数实时行情...")
             
             # 使用 akshare 获取指数行情（新浪财经接口，包含深市指数）
-            df = self._call_akshare_with_retry(ak.stock_zh_index_spot_sina, "指数行情", attempts=2)
+            df = self._call_akshare_with_retry(ak.stock_zh_index_spot_sina, "指数行情", attempts=2, host=None)
             
             if df is not None and not df.empty:
                 for code, name in self.MAIN_INDICES.items():
@@ -196,27 +202,30 @@ class MarketAnalyzer:
         try:
             logger.info("[大盘] 获取市场涨跌统计...")
             
-            # 获取全部A股实时行情
-            df = self._call_akshare_with_retry(ak.stock_zh_a_spot_em, "A股实时行情", attempts=2)
+            # 获取全部A股实时行情（与个股实时行情共享同一份快照，快照只读）
+            snapshot = get_spot_cache().get(
+                A_SPOT_SOURCE,
+                lambda: self._call_akshare_with_retry(ak.stock_zh_a_spot_em, "A股实时行情", attempts=2)
+            )
+            df = snapshot.data
             
-            if df is not None and not df.empty:
+            if not df.empty:
                 # 涨跌统计
                 change_col = '涨跌幅'
                 if change_col in df.columns:
-                    df[change_col] = pd.to_numeric(df[change_col], errors='coerce')
-                    overview.up_count = len(df[df[change_col] > 0])
-                    overview.down_count = len(df[df[change_col] < 0])
-                    overview.flat_count = len(df[df[change_col] == 0])
+                    change = pd.to_numeric(df[change_col], errors='coerce')
+                    overview.up_count = int((change > 0).sum())
+                    overview.down_count = int((change < 0).sum())
+                    overview.flat_count = int((change == 0).sum())
                     
                     # 涨停跌停统计（涨跌幅 >= 9.9% 或 <= -9.9%）
-                    overview.limit_up_count = len(df[df[change_col] >= 9.9])
-                    overview.limit_down_count = len(df[df[change_col] <= -9.9])
+                    overview.limit_up_count = int((change >= 9.9).sum())
+                    overview.limit_down_count = int((change <= -9.9).sum())
                 
                 # 两市成交额
                 amount_col = '成交额'
                 if amount_col in df.columns:
-                    df[amount_col] = pd.to_numeric(df[amount_col], errors='coerce')
-                    overview.total_amount = df[amount_col].sum() / 1e8  # 转为亿元
+                    overview.total_amount = pd.to_numeric(df[amount_col], errors='coerce').sum() / 1e8  # 转为亿元
                 
                 logger.info(f"[大盘] 涨:{overview.up_count} 跌:{overview.down_count} 平:{overview.flat_count} "
                           f"涨停:{overview.limit_up_count} 跌停:{overview.limit_down_count} "
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 分阶段流水线调度
+===================================
+
+职责：
+1. 把单只股票的处理流程拆成多个阶段，阶段之间用有界队列连接（生产者/消费者）
+2. 每个阶段有独立的工作线程数：数据源限流等待不再占用 LLM 并发，反之亦然
+3. 下游处理不过来时上游阻塞在 put 上（背压），内存中的在途股票数有上限
+4. 统计各阶段的队列深度、处理数、失败数与吞吐，定期输出到日志
+
+阶段划分：
+    fetch  → enrich → search → decide → output
+    日线入库  实时行情/筹码/趋势  新闻搜索+摘要  决策 LLM  保存/交易/推送
+
+使用方式：
+    PIPELINE_MODE=staged python main.py
+    python main.py --pipeline staged
+"""
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from analysis.agents.decision import AnalysisResult
+from enums import ReportType
+
+if TYPE_CHECKING:
+    from main import StockAnalysisPipeline
+
+logger = logging.getLogger(__name__)
+
+
+# 队列结束标记
+_STOP = object()
+
+
+@dataclass
+class StockTask:
+    """在各阶段之间流转的单只股票任务"""
+    code: str
+    stock_name: str = ""
+    context: Optional[Dict[str, Any]] = None
+    news_summary: Optional[str] = None
+    route: List[str] = field(default_factory=list)  # 搜索/摘要阶段经过的节点
+    result: Optional[AnalysisResult] = None
+
+
+@dataclass
+class StageStats:
+    """单个阶段的运行统计"""
+    processed: int = 0          # 处理完成（含被丢弃）的任务数
+    failed: int = 0             # 处理异常的任务数
+    busy_seconds: float = 0.0   # 工作线程累计处理耗时
+    max_queue_depth: int = 0    # 观测到的最大输入队列深度
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def throughput(self) -> float:
+        """吞吐（只/分钟），从第一个任务开始计时"""
+        if self.started_at is None or self.processed == 0:
+            return 0.0
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return self.processed / elapsed * 60 if elapsed > 0 else 0.0
+
+
+class Stage:
+    """
+    流水线阶段：从输入队列取任务，调用 handler，把结果放入输出队列
+
+    handler 返回 None 表示任务到此结束（如上下文缺失、dry-run），不再传给下游。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[StockTask], Optional[StockTask]],
+        workers: int,
+        input_queue: "queue.Queue",
+        output_queue: Optional["queue.Queue"] = None
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.stats = StageStats()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"stage_{self.name}_{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """通知全部工作线程在处理完已入队的任务后退出，并等待退出"""
+        for _ in self._threads:
+            self.input_queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self.stats.finished_at = time.monotonic()
+
+    def _work(self) -> None:
+        while True:
+            depth = self.input_queue.qsize()
+            task = self.input_queue.get()
+            if task is _STOP:
+                break
+
+            started = time.monotonic()
+            output = None
+            failed = False
+            try:
+                output = self.handler(task)
+            except Exception as e:
+                # 捕获所有异常，确保单股失败不影响整体
+                failed = True
+                logger.exception(f"[{task.code}] 阶段 {self.name} 处理异常: {e}")
+
+            with self._lock:
+                if self.stats.started_at is None:
+                    self.stats.started_at = started
+                self.stats.max_queue_depth = max(self.stats.max_queue_depth, depth)
+                self.stats.processed += 1
+                self.stats.failed += int(failed)
+                self.stats.busy_seconds += time.monotonic() - started
+
+            if output is not None and self.output_queue is not None:
+                # 下游队列已满时阻塞（背压）
+                self.output_queue.put(output)
+
+    def observe_queue(self) -> int:
+        depth = self.input_queue.qsize()
+        with self._lock:
+            self.stats.max_queue_depth = max(self.stats.max_queue_depth, depth)
+        return depth
+
+    def snapshot(self) -> Dict[str, Any]:
+        depth = self.observe_queue()
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': depth,
+                'max_queue_depth': self.stats.max_queue_depth,
+                'processed': self.stats.processed,
+                'failed': self.stats.failed,
+                'busy_seconds': round(self.stats.busy_seconds, 2),
+                'throughput_per_min': round(self.stats.throughput(), 2),
+            }
+
+
+class StagedStockPipeline:
+    """
+    分阶段流水线调度器
+
+    复用 StockAnalysisPipeline 的各阶段方法，只替换调度方式：
+    fetch_and_save_stock_data → prepare_analysis_context → orchestrator.search_news/summarize_news
+    → orchestrator.decide → persist_result/notify_single_stock
+    """
+
+    def __init__(
+        self,
+        pipeline: "StockAnalysisPipeline",
+        queue_size: Optional[int] = None,
+        report_interval: Optional[float] = None
+    ):
+        """
+        Args:
+            pipeline: 同步调度器（提供各阶段的实现）
+            queue_size: 阶段间队列容量（可选，默认 STAGE_QUEUE_SIZE）
+            report_interval: 队列状态日志输出间隔（秒，可选，默认 STAGE_REPORT_INTERVAL，<=0 不输出）
+        """
+        config = pipeline.config
+        self.pipeline = pipeline
+        self.queue_size = queue_size if queue_size is not None else config.stage_queue_size
+        self.report_interval = report_interval if report_interval is not None else config.stage_report_interval
+        self.stages: List[Stage] = []
+        self._results: List[AnalysisResult] = []
+        self._results_lock = threading.Lock()
+
+    # === 阶段处理函数 ===
+
+    def _fetch(self, task: StockTask) -> Optional[StockTask]:
+        logger.info(f"========== 开始处理 {task.code} ==========")
+        success, error = self.pipeline.fetch_and_save_stock_data(task.code)
+        if not success:
+            logger.warning(f"[{task.code}] 数据获取失败: {error}")
+            # 即使获取失败，也尝试用已有数据分析
+        return task
+
+    def _enrich(self, task: StockTask) -> Optional[StockTask]:
+        prepared = self.pipeline.prepare_analysis_context(task.code)
+        if prepared is None:
+            return None
+        task.context, task.stock_name = prepared
+        return task
+
+    def _search(self, task: StockTask) -> Optional[StockTask]:
+        # 趋势信号明确时不搜索；新闻情报缓存有效时不重新搜索
+        task.news_summary, task.route = self.pipeline.gather_news(task.code, task.context, task.stock_name)
+        return task
+
+    def _make_decide(self, single_stock_notify: bool):
+        def decide(task: StockTask) -> Optional[StockTask]:
+            # 流式输出时核心结论预览先行推送
+            task.result = self.pipeline.orchestrator.decide(
+                task.context, task.stock_name, task.news_summary,
+                on_core_ready=self.pipeline.make_core_handler(task.code, single_stock_notify),
+                use_cache=self.pipeline.use_llm_cache,
+                route=task.route
+            )
+            return task if task.result else None
+        return decide
+
+    def _make_output(self, single_stock_notify: bool, report_type: ReportType):
+        def output(task: StockTask) -> None:
+            # 保存并按完整结果执行交易决策
+            self.pipeline.persist_result(task.code, task.result, task.context)
+            with self._results_lock:
+                self._results.append(task.result)
+            if single_stock_notify:
+                self.pipeline.notify_single_stock(task.code, task.result, report_type)
+            return None
+        return output
+
+    def _build_stages(self, skip_analysis: bool, single_stock_notify: bool, report_type: ReportType) -> None:
+        config = self.pipeline.config
+        specs = [('fetch', self._fetch, config.stage_data_workers)]
+        if not skip_analysis:
+            specs += [
+                ('enrich', self._enrich, config.stage_enrich_workers),
+                ('search', self._search, config.stage_search_workers),
+                ('decide', self._make_decide(single_stock_notify), config.stage_llm_workers),
+                ('output', self._make_output(single_stock_notify, report_type), config.stage_notify_workers),
+            ]
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in specs]
+        self.stages = [
+            Stage(name, handler, workers, queues[i], queues[i + 1] if i + 1 < len(queues) else None)
+            for i, (name, handler, workers) in enumerate(specs)
+        ]
+
+    # === 调度 ===
+
+    def run(
+        self,
+        stock_codes: List[str],
+        skip_analysis: bool = False,
+        single_stock_notify: bool = False,
+        report_type: ReportType = ReportType.SIMPLE
+    ) -> List[AnalysisResult]:
+        """
+        按流水线处理全部股票
+
+        Returns:
+            成功的分析结果列表（按完成顺序）
+        """
+        self._results = []
+        self._build_stages(skip_analysis, single_stock_notify, report_type)
+        stages_info = " → ".join(f"{stage.name}({stage.workers})" for stage in self.stages)
+        logger.info(f"分阶段流水线调度，队列容量 {self.queue_size}: {stages_info}")
+
+        for stage in self.stages:
+            stage.start()
+
+        done = threading.Event()
+        monitor = None
+        if self.report_interval > 0:
+            monitor = threading.Thread(target=self._monitor, args=(done,), name="stage_monitor", daemon=True)
+            monitor.start()
+
+        try:
+            # 投放任务（首个队列满时阻塞）
+            for code in stock_codes:
+                self.stages[0].input_queue.put(StockTask(code=code))
+            # 按顺序关闭各阶段：上游全部退出后，下游才会收到结束标记
+            for stage in self.stages:
+                stage.stop()
+        finally:
+            done.set()
+            if monitor is not None:
+                monitor.join()
+
+        self.log_stats()
+        return list(self._results)
+
+    def _monitor(self, done: threading.Event) -> None:
+        while not done.wait(self.report_interval):
+            self.log_stats(final=False)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        各阶段的运行统计
+
+        Returns:
+            {阶段名称: {workers, queue_depth, max_queue_depth, processed, failed,
+                        busy_seconds, throughput_per_min}}
+        """
+        return {stage.name: stage.snapshot() for stage in self.stages}
+
+    def log_stats(self, final: bool = True) -> None:
+        """输出各阶段的队列深度与吞吐"""
+        title = "流水线统计" if final else "流水线状态"
+        for name, s in self.stats().items():
+            logger.info(
+                f"[{title}] {name}: 队列 {s['queue_depth']}（峰值 {s['max_queue_depth']}）, "
+                f"已处理 {s['processed']}（失败 {s['failed']}）, "
+                f"吞吐 {s['throughput_per_min']:.1f} 只/分钟, 累计耗时 {s['busy_seconds']:.1f}s"
+            )
@@ -18,12 +18,14 @@
 
 import logging
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Mapping, Tuple
 from enum import Enum
 
 import pandas as pd
 import numpy as np
 
+from indicators import get_indicator_registry
+
 logger = logging.getLogger(__name__)
 
 
@@ -139,6 +141,52 @@ class StockTrendAnalyzer:
     VOLUME_HEAVY_RATIO = 1.5    # 放量判断阈值
     MA_SUPPORT_TOLERANCE = 0.02  # MA 支撑判断容忍度（2%）
     
+    # 趋势状态 → (均线排列描述, 趋势强度)
+    TREND_DESCRIPTIONS = {
+        TrendStatus.STRONG_BULL: ("强势多头排列，均线发散上行", 90),
+        TrendStatus.BULL: ("多头排列 MA5>MA10>MA20", 75),
+        TrendStatus.WEAK_BULL: ("弱势多头，MA5>MA10 但 MA10≤MA20", 55),
+        TrendStatus.CONSOLIDATION: ("均线缠绕，趋势不明", 50),
+        TrendStatus.WEAK_BEAR: ("弱势空头，MA5<MA10 但 MA10≥MA20", 40),
+        TrendStatus.BEAR: ("空头排列 MA5<MA10<MA20", 25),
+        TrendStatus.STRONG_BEAR: ("强势空头排列，均线发散下行", 10),
+    }
+    
+    # 量能状态 → 量能趋势描述
+    VOLUME_DESCRIPTIONS = {
+        VolumeStatus.HEAVY_VOLUME_UP: "放量上涨，多头力量强劲",
+        VolumeStatus.HEAVY_VOLUME_DOWN: "放量下跌，注意风险",
+        VolumeStatus.SHRINK_VOLUME_UP: "缩量上涨，上攻动能不足",
+        VolumeStatus.SHRINK_VOLUME_DOWN: "缩量回调，洗盘特征明显（好）",
+        VolumeStatus.NORMAL: "量能正常",
+    }
+    
+    # 趋势评分（40分）
+    TREND_SCORES = {
+        TrendStatus.STRONG_BULL: 40,
+        TrendStatus.BULL: 35,
+        TrendStatus.WEAK_BULL: 25,
+        TrendStatus.CONSOLIDATION: 15,
+        TrendStatus.WEAK_BEAR: 10,
+        TrendStatus.BEAR: 5,
+        TrendStatus.STRONG_BEAR: 0,
+    }
+    
+    # 量能评分（20分）
+    VOLUME_SCORES = {
+        VolumeStatus.SHRINK_VOLUME_DOWN: 20,  # 缩量回调最佳
+        VolumeStatus.HEAVY_VOLUME_UP: 15,     # 放量上涨次之
+        VolumeStatus.NORMAL: 12,
+        VolumeStatus.SHRINK_VOLUME_UP: 8,     # 无量上涨较差
+        VolumeStatus.HEAVY_VOLUME_DOWN: 0,    # 放量下跌最差
+    }
+    
+    # 逐只分析所需的指标（由指标注册表按严格窗口计算并缓存）
+    TREND_INDICATORS = ('ma5', 'ma10', 'ma20', 'ma60', 'volume_ma5', 'high_20')
+    
+    # 批量分析时每只股票保留的最近 K 线数（MA60 所需窗口）
+    BATCH_HISTORY_BARS = 60
+    
     def __init__(self):
         """初始化分析器"""
         pass
@@ -161,50 +209,304 @@ class StockTrendAnalyzer:
             result.risk_factors.append("数据不足，无法完成分析")
             return result
         
-        # 确保数据按日期排序
-        df = df.sort_values('date').reset_index(drop=True)
+        # 确保数据按日期排序（已排序时不复制）
+        if not df['date'].is_monotonic_increasing:
+            df = df.sort_values('date').reset_index(drop=True)
         
         # 计算均线
-        df = self._calculate_mas(df)
+        indicators = self._calculate_mas(df, code)
         
         # 获取最新数据
-        latest = df.iloc[-1]
-        result.current_price = float(latest['close'])
-        result.ma5 = float(latest['MA5'])
-        result.ma10 = float(latest['MA10'])
-        result.ma20 = float(latest['MA20'])
-        result.ma60 = float(latest.get('MA60', 0))
+        result.current_price = float(df['close'].iloc[-1])
+        result.ma5 = float(indicators['ma5'][-1])
+        result.ma10 = float(indicators['ma10'][-1])
+        result.ma20 = float(indicators['ma20'][-1])
+        ma60 = indicators['ma60'][-1]
+        result.ma60 = float(ma60 if not np.isnan(ma60) else indicators['ma20'][-1])  # 数据不足时使用 MA20 替代
         
         # 1. 趋势判断
-        self._analyze_trend(df, result)
+        self._analyze_trend(indicators, result)
         
         # 2. 乖离率计算
         self._calculate_bias(result)
         
         # 3. 量能分析
-        self._analyze_volume(df, result)
+        self._analyze_volume(df, indicators, result)
         
         # 4. 支撑压力分析
-        self._analyze_support_resistance(df, result)
+        self._analyze_support_resistance(indicators, result)
         
         # 5. 生成买入信号
         self._generate_signal(result)
         
         return result
     
-    def _calculate_mas(self, df: pd.DataFrame) -> pd.DataFrame:
-        """计算均线"""
-        df = df.copy()
-        df['MA5'] = df['close'].rolling(window=5).mean()
-        df['MA10'] = df['close'].rolling(window=10).mean()
-        df['MA20'] = df['close'].rolling(window=20).mean()
-        if len(df) >= 60:
-            df['MA60'] = df['close'].rolling(window=60).mean()
-        else:
-            df['MA60'] = df['MA20']  # 数据不足时使用 MA20 替代
-        return df
+    def analyze_batch(self, panel: Mapping[str, pd.DataFrame]) -> Dict[str, TrendAnalysisResult]:
+        """
+        批量分析整个股票池的趋势（向量化）
+        
+        结果与逐只调用 analyze 一致，但均线、乖离率、量比、趋势/量能状态和综合评分
+        都以 NumPy 数组运算一次算完全部股票，只有组装结果对象时逐只循环。
+        
+        Args:
+            panel: 宽表面板，panel['close'] / panel['high'] / panel['volume'] 均为
+                   行=日期、列=股票代码 的 DataFrame（dict 或两级列名的 DataFrame 均可）；
+                   停牌、未上市等缺失的交易日填 NaN
+            
+        Returns:
+            {股票代码: TrendAnalysisResult}，顺序与 panel['close'] 的列一致
+        """
+        close_df = panel['close'].sort_index()
+        index, columns = close_df.index, close_df.columns
+        close = close_df.to_numpy(dtype=np.float64)
+        high = panel['high'].reindex(index=index, columns=columns).to_numpy(dtype=np.float64)
+        volume = panel['volume'].reindex(index=index, columns=columns).to_numpy(dtype=np.float64)
+        close, high, volume, counts = self._align_panel(close, high, volume)
+        s = self._score_window(close, high, volume, counts)
+        
+        # 组装结果对象（tolist 一次性转换为 Python 标量）
+        columns_data = zip(*(s[key].tolist() for key in (
+            'counts', 'price', 'ma5', 'ma10', 'ma20', 'ma60', 'bias5', 'bias10', 'bias20', 'volume_ratio',
+            'recent_high', 'support_ma5', 'support_ma10', 'trend_codes', 'volume_codes', 'signal_codes', 'scores',
+        )))
+        results: Dict[str, TrendAnalysisResult] = {}
+        insufficient = []
+        for code, row in zip((str(c) for c in columns), columns_data):
+            (count, current, m5, m10, m20, m60, b5, b10, b20, vol_ratio, high_20,
+             sup5, sup10, trend_code, volume_code, signal_code, score) = row
+            result = TrendAnalysisResult(code=code)
+            results[code] = result
+            if count < 20:
+                insufficient.append(code)
+                result.risk_factors.append("数据不足，无法完成分析")
+                continue
+            
+            result.trend_status = _TREND_STATUSES[trend_code]
+            result.ma_alignment, result.trend_strength = self.TREND_DESCRIPTIONS[result.trend_status]
+            result.current_price = current
+            result.ma5, result.ma10, result.ma20, result.ma60 = m5, m10, m20, m60
+            result.bias_ma5, result.bias_ma10, result.bias_ma20 = b5, b10, b20
+            result.volume_status = _VOLUME_STATUSES[volume_code]
+            result.volume_ratio_5d = vol_ratio
+            result.volume_trend = self.VOLUME_DESCRIPTIONS[result.volume_status]
+            result.support_ma5, result.support_ma10 = sup5, sup10
+            if sup5:
+                result.support_levels.append(m5)
+            if sup10 and m10 not in result.support_levels:
+                result.support_levels.append(m10)
+            if m20 > 0 and current >= m20:
+                result.support_levels.append(m20)
+            if high_20 > current:
+                result.resistance_levels.append(high_20)
+            result.buy_signal = _SIGNAL_STATUSES[signal_code]
+            result.signal_score = score
+            result.signal_reasons, result.risk_factors = self._describe_signal(result)
+        
+        if insufficient:
+            logger.warning(f"{len(insufficient)} 只股票数据不足，无法进行趋势分析: {', '.join(insufficient[:10])}")
+        return results
+    
+    def signal_history(
+        self,
+        close: np.ndarray,
+        high: np.ndarray,
+        volume: np.ndarray,
+        block_size: int = 20000
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        计算每个交易日、每只股票的买入信号（回测用，无未来数据）
+        
+        第 t 行的信号只使用每只股票截至第 t 行（含）的有效 K 线，
+        与把该股票截至当日的历史交给 analyze 得到的 buy_signal / signal_score 一致。
+        多个交易日的窗口拼成一个宽面板一次评分，避免逐日逐股循环。
+        
+        Args:
+            close/high/volume: 行=交易日（升序）、列=股票 的数组，无 K 线处 close 为 NaN
+            block_size: 每次评分的 (交易日 × 股票) 窗口数上限，控制内存占用
+            
+        Returns:
+            (信号, 评分)：形状同 close 的 int 数组。信号为 list(BuySignal) 的下标，
+            当日无 K 线或有效 K 线不足 20 根时为 -1
+        """
+        close = np.asarray(close, dtype=np.float64)
+        high = np.asarray(high, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
+        days, n_codes = close.shape
+        rows = self.BATCH_HISTORY_BARS
+        
+        # 每只股票的有效 K 线压到顶部（保持日期顺序），上方补 rows 行 NaN
+        valid = ~np.isnan(close)
+        order = np.argsort(~valid, axis=0, kind='stable')
+        padded = []
+        for a in (close, high, volume):
+            a = np.take_along_axis(a, order, axis=0)
+            padded.append(np.vstack([np.full((rows, n_codes), np.nan), a]))
+        # 截至第 t 行的有效 K 线数 = 压紧后窗口的结束位置
+        counts = np.cumsum(valid, axis=0)
+        
+        signals = np.full((days, n_codes), -1, dtype=np.int64)
+        scores = np.zeros((days, n_codes), dtype=np.int64)
+        offsets = np.arange(rows)[:, None, None]
+        columns = np.arange(n_codes)[None, None, :]
+        step = max(1, block_size // max(n_codes, 1))
+        for start in range(0, days, step):
+            block = counts[start:start + step]
+            idx = block[None, :, :] + offsets
+            width = block.size
+            window = [a[idx, columns].reshape(rows, width) for a in padded]
+            s = self._score_window(window[0], window[1], window[2], block.reshape(width))
+            ok = valid[start:start + step] & (block >= 20)
+            signals[start:start + step] = np.where(ok, s['signal_codes'].reshape(block.shape), -1)
+            scores[start:start + step] = np.where(ok, s['scores'].reshape(block.shape), 0)
+        return signals, scores
+    
+    def _score_window(
+        self,
+        close: np.ndarray,
+        high: np.ndarray,
+        volume: np.ndarray,
+        counts: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        对已对齐的窗口（最近 BATCH_HISTORY_BARS 行在底部）逐列计算趋势、量能、评分和信号
+        
+        Returns:
+            {字段名: 每列一个值的数组}
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # 均线（最新一日与 5 个交易日前）
+            ma5, ma10, ma20 = (close[-w:].mean(axis=0) for w in (5, 10, 20))
+            ma60 = np.where(counts >= 60, close[-60:].mean(axis=0), ma20)
+            prev_ma5 = close[-9:-4].mean(axis=0)
+            prev_ma20 = close[-24:-4].mean(axis=0)
+            price = close[-1]
+            
+            # 1. 趋势判断
+            bull_prev = np.where(prev_ma20 > 0, (prev_ma5 - prev_ma20) / prev_ma20 * 100, 0.0)
+            bull_curr = np.where(ma20 > 0, (ma5 - ma20) / ma20 * 100, 0.0)
+            bear_prev = np.where(prev_ma5 > 0, (prev_ma20 - prev_ma5) / prev_ma5 * 100, 0.0)
+            bear_curr = np.where(ma5 > 0, (ma20 - ma5) / ma5 * 100, 0.0)
+            bull = (ma5 > ma10) & (ma10 > ma20)
+            bear = (ma5 < ma10) & (ma10 < ma20)
+            trend_codes = np.select(
+                [
+                    bull & (bull_curr > bull_prev) & (bull_curr > 5),
+                    bull,
+                    (ma5 > ma10) & (ma10 <= ma20),
+                    bear & (bear_curr > bear_prev) & (bear_curr > 5),
+                    bear,
+                    (ma5 < ma10) & (ma10 >= ma20),
+                ],
+                [_TREND_INDEX[s] for s in (
+                    TrendStatus.STRONG_BULL, TrendStatus.BULL, TrendStatus.WEAK_BULL,
+                    TrendStatus.STRONG_BEAR, TrendStatus.BEAR, TrendStatus.WEAK_BEAR,
+                )],
+                _TREND_INDEX[TrendStatus.CONSOLIDATION],
+            )
+            
+            # 2. 乖离率
+            bias5, bias10, bias20 = (
+                np.where(ma > 0, (price - ma) / ma * 100, 0.0) for ma in (ma5, ma10, ma20)
+            )
+            
+            # 3. 量能（前 5 日均量忽略缺失值，与 pandas mean 一致）
+            prev_volume = volume[-6:-1]
+            valid_volume = ~np.isnan(prev_volume)
+            vol_5d_avg = np.nansum(prev_volume, axis=0) / valid_volume.sum(axis=0)
+            volume_ratio = np.where(vol_5d_avg > 0, volume[-1] / vol_5d_avg, 0.0)
+            price_up = (price - close[-2]) / close[-2] * 100 > 0
+            heavy = volume_ratio >= self.VOLUME_HEAVY_RATIO
+            shrink = ~heavy & (volume_ratio <= self.VOLUME_SHRINK_RATIO)
+            volume_codes = np.select(
+                [heavy & price_up, heavy, shrink & price_up, shrink],
+                [_VOLUME_INDEX[s] for s in (
+                    VolumeStatus.HEAVY_VOLUME_UP, VolumeStatus.HEAVY_VOLUME_DOWN,
+                    VolumeStatus.SHRINK_VOLUME_UP, VolumeStatus.SHRINK_VOLUME_DOWN,
+                )],
+                _VOLUME_INDEX[VolumeStatus.NORMAL],
+            )
+            
+            # 4. 支撑压力
+            support_ma5 = (ma5 > 0) & (np.abs(price - ma5) / ma5 <= self.MA_SUPPORT_TOLERANCE) & (price >= ma5)
+            support_ma10 = (ma10 > 0) & (np.abs(price - ma10) / ma10 <= self.MA_SUPPORT_TOLERANCE) & (price >= ma10)
+            recent_high = np.fmax.reduce(high[-20:], axis=0)
+            
+            # 5. 综合评分与买入信号
+            trend_score_table = np.array([self.TREND_SCORES[s] for s in _TREND_STATUSES])
+            volume_score_table = np.array([self.VOLUME_SCORES[s] for s in _VOLUME_STATUSES])
+            bias_score = np.select(
+                [bias5 < 0, bias5 < 2, bias5 < self.BIAS_THRESHOLD],
+                [np.select([bias5 > -3, bias5 > -5], [30, 25], 10), 28, 20],
+                5,
+            )
+            scores = (
+                trend_score_table[trend_codes] + bias_score + volume_score_table[volume_codes]
+                + support_ma5 * 5 + support_ma10 * 5
+            )
+            bull_codes = np.isin(trend_codes, [_TREND_INDEX[TrendStatus.STRONG_BULL], _TREND_INDEX[TrendStatus.BULL]])
+            bear_codes = np.isin(trend_codes, [_TREND_INDEX[TrendStatus.BEAR], _TREND_INDEX[TrendStatus.STRONG_BEAR]])
+            signal_codes = np.select(
+                [
+                    (scores >= 80) & bull_codes,
+                    (scores >= 65) & (bull_codes | (trend_codes == _TREND_INDEX[TrendStatus.WEAK_BULL])),
+                    scores >= 50,
+                    scores >= 35,
+                    bear_codes,
+                ],
+                [_SIGNAL_INDEX[s] for s in (
+                    BuySignal.STRONG_BUY, BuySignal.BUY, BuySignal.HOLD, BuySignal.WAIT, BuySignal.STRONG_SELL,
+                )],
+                _SIGNAL_INDEX[BuySignal.SELL],
+            )
+        
+        return {
+            'counts': counts, 'price': price, 'ma5': ma5, 'ma10': ma10, 'ma20': ma20, 'ma60': ma60,
+            'bias5': bias5, 'bias10': bias10, 'bias20': bias20, 'volume_ratio': volume_ratio,
+            'recent_high': recent_high, 'support_ma5': support_ma5, 'support_ma10': support_ma10,
+            'trend_codes': trend_codes, 'volume_codes': volume_codes, 'signal_codes': signal_codes,
+            'scores': scores,
+        }
+    
+    def _align_panel(
+        self,
+        close: np.ndarray,
+        high: np.ndarray,
+        volume: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        把每只股票的有效 K 线压到面板底部并截取最近 BATCH_HISTORY_BARS 行
+        
+        面板中收盘价为 NaN 的交易日视为该股票没有这根 K 线（停牌、未上市），
+        压紧后每一列等价于单只股票按日期排序的 DataFrame，顶部不足的部分填 NaN。
+        
+        Returns:
+            (close, high, volume, 每只股票的有效 K 线数)
+        """
+        valid = ~np.isnan(close)
+        counts = valid.sum(axis=0)
+        if not valid.all():
+            # 稳定排序：缺失行排在前面，有效行保持原有日期顺序
+            order = np.argsort(valid, axis=0, kind='stable')
+            close, high, volume = (np.take_along_axis(a, order, axis=0) for a in (close, high, volume))
+        
+        rows = self.BATCH_HISTORY_BARS
+        arrays = []
+        for a in (close, high, volume):
+            a = a[-rows:]
+            if a.shape[0] < rows:
+                a = np.vstack([np.full((rows - a.shape[0], a.shape[1]), np.nan), a])
+            arrays.append(a)
+        return arrays[0], arrays[1], arrays[2], counts
     
-    def _analyze_trend(self, df: pd.DataFrame, result: TrendAnalysisResult) -> None:
+    def _calculate_mas(self, df: pd.DataFrame, code: str) -> Dict[str, np.ndarray]:
+        """
+        计算均线、5日均量、20日最高价（严格窗口，不足窗口为 NaN）
+        
+        由指标注册表按 (代码, 最新日期) 缓存，与上下文构建、回测等共用计算结果。
+        """
+        return get_indicator_registry().compute(df, self.TREND_INDICATORS, code=code, strict=True)
+    
+    def _analyze_trend(self, indicators: Dict[str, np.ndarray], result: TrendAnalysisResult) -> None:
         """
         分析趋势状态
         
@@ -213,49 +515,40 @@ class StockTrendAnalyzer:
         ma5, ma10, ma20 = result.ma5, result.ma10, result.ma20
         
         # 判断均线排列
+        # 5 个交易日前的均线（用于判断间距是否扩大）
+        prev = -5 if len(indicators['ma5']) >= 5 else -1
+        prev_ma5, prev_ma20 = indicators['ma5'][prev], indicators['ma20'][prev]
+        
         if ma5 > ma10 > ma20:
             # 检查间距是否在扩大（强势）
-            prev = df.iloc[-5] if len(df) >= 5 else df.iloc[-1]
-            prev_spread = (prev['MA5'] - prev['MA20']) / prev['MA20'] * 100 if prev['MA20'] > 0 else 0
+            prev_spread = (prev_ma5 - prev_ma20) / prev_ma20 * 100 if prev_ma20 > 0 else 0
             curr_spread = (ma5 - ma20) / ma20 * 100 if ma20 > 0 else 0
             
             if curr_spread > prev_spread and curr_spread > 5:
-                result.trend_status = TrendStatus.STRONG_BULL
-                result.ma_alignment = "强势多头排列，均线发散上行"
-                result.trend_strength = 90
+                status = TrendStatus.STRONG_BULL
             else:
-                result.trend_status = TrendStatus.BULL
-                result.ma_alignment = "多头排列 MA5>MA10>MA20"
-                result.trend_strength = 75
+                status = TrendStatus.BULL
                 
         elif ma5 > ma10 and ma10 <= ma20:
-            result.trend_status = TrendStatus.WEAK_BULL
-            result.ma_alignment = "弱势多头，MA5>MA10 但 MA10≤MA20"
-            result.trend_strength = 55
+            status = TrendStatus.WEAK_BULL
             
         elif ma5 < ma10 < ma20:
-            prev = df.iloc[-5] if len(df) >= 5 else df.iloc[-1]
-            prev_spread = (prev['MA20'] - prev['MA5']) / prev['MA5'] * 100 if prev['MA5'] > 0 else 0
+            prev_spread = (prev_ma20 - prev_ma5) / prev_ma5 * 100 if prev_ma5 > 0 else 0
             curr_spread = (ma20 - ma5) / ma5 * 100 if ma5 > 0 else 0
             
             if curr_spread > prev_spread and curr_spread > 5:
-                result.trend_status = TrendStatus.STRONG_BEAR
-                result.ma_alignment = "强势空头排列，均线发散下行"
-                result.trend_strength = 10
+                status = TrendStatus.STRONG_BEAR
             else:
-                result.trend_status = TrendStatus.BEAR
-                result.ma_alignment = "空头排列 MA5<MA10<MA20"
-                result.trend_strength = 25
+                status = TrendStatus.BEAR
                 
         elif ma5 < ma10 and ma10 >= ma20:
-            result.trend_status = TrendStatus.WEAK_BEAR
-            result.ma_alignment = "弱势空头，MA5<MA10 但 MA10≥MA20"
-            result.trend_strength = 40
+            status = TrendStatus.WEAK_BEAR
             
         else:
-            result.trend_status = TrendStatus.CONSOLIDATION
-            result.ma_alignment = "均线缠绕，趋势不明"
-            result.trend_strength = 50
+            status = TrendStatus.CONSOLIDATION
+        
+        result.trend_status = status
+        result.ma_alignment, result.trend_strength = self.TREND_DESCRIPTIONS[status]
     
     def _calculate_bias(self, result: TrendAnalysisResult) -> None:
         """
@@ -274,7 +567,12 @@ class StockTrendAnalyzer:
         if result.ma20 > 0:
             result.bias_ma20 = (price - result.ma20) / result.ma20 * 100
     
-    def _analyze_volume(self, df: pd.DataFrame, result: TrendAnalysisResult) -> None:
+    def _analyze_volume(
+        self,
+        df: pd.DataFrame,
+        indicators: Dict[str, np.ndarray],
+        result: TrendAnalysisResult
+    ) -> None:
         """
         分析量能
         
@@ -283,36 +581,32 @@ class StockTrendAnalyzer:
         if len(df) < 5:
             return
         
-        latest = df.iloc[-1]
-        vol_5d_avg = df['volume'].iloc[-6:-1].mean()
+        # 前 5 日均量 = 前一交易日的 5 日均量
+        vol_5d_avg = indicators['volume_ma5'][-2]
         
         if vol_5d_avg > 0:
-            result.volume_ratio_5d = float(latest['volume']) / vol_5d_avg
+            result.volume_ratio_5d = float(df['volume'].iloc[-1]) / vol_5d_avg
         
         # 判断价格变化
-        prev_close = df.iloc[-2]['close']
-        price_change = (latest['close'] - prev_close) / prev_close * 100
+        prev_close = df['close'].iloc[-2]
+        price_change = (df['close'].iloc[-1] - prev_close) / prev_close * 100
         
         # 量能状态判断
         if result.volume_ratio_5d >= self.VOLUME_HEAVY_RATIO:
             if price_change > 0:
                 result.volume_status = VolumeStatus.HEAVY_VOLUME_UP
-                result.volume_trend = "放量上涨，多头力量强劲"
             else:
                 result.volume_status = VolumeStatus.HEAVY_VOLUME_DOWN
-                result.volume_trend = "放量下跌，注意风险"
         elif result.volume_ratio_5d <= self.VOLUME_SHRINK_RATIO:
             if price_change > 0:
                 result.volume_status = VolumeStatus.SHRINK_VOLUME_UP
-                result.volume_trend = "缩量上涨，上攻动能不足"
             else:
                 result.volume_status = VolumeStatus.SHRINK_VOLUME_DOWN
-                result.volume_trend = "缩量回调，洗盘特征明显（好）"
         else:
             result.volume_status = VolumeStatus.NORMAL
-            result.volume_trend = "量能正常"
+        result.volume_trend = self.VOLUME_DESCRIPTIONS[result.volume_status]
     
-    def _analyze_support_resistance(self, df: pd.DataFrame, result: TrendAnalysisResult) -> None:
+    def _analyze_support_resistance(self, indicators: Dict[str, np.ndarray], result: TrendAnalysisResult) -> None:
         """
         分析支撑压力位
         
@@ -340,8 +634,8 @@ class StockTrendAnalyzer:
             result.support_levels.append(result.ma20)
         
         # 近期高点作为压力
-        if len(df) >= 20:
-            recent_high = df['high'].iloc[-20:].max()
+        if len(indicators['high_20']) >= 20:
+            recent_high = float(indicators['high_20'][-1])
             if recent_high > price:
                 result.resistance_levels.append(recent_high)
     
@@ -356,26 +650,9 @@ class StockTrendAnalyzer:
         - 支撑（10分）：获得均线支撑得分高
         """
         score = 0
-        reasons = []
-        risks = []
         
         # === 趋势评分（40分）===
-        trend_scores = {
-            TrendStatus.STRONG_BULL: 40,
-            TrendStatus.BULL: 35,
-            TrendStatus.WEAK_BULL: 25,
-            TrendStatus.CONSOLIDATION: 15,
-            TrendStatus.WEAK_BEAR: 10,
-            TrendStatus.BEAR: 5,
-            TrendStatus.STRONG_BEAR: 0,
-        }
-        trend_score = trend_scores.get(result.trend_status, 15)
-        score += trend_score
-        
-        if result.trend_status in [TrendStatus.STRONG_BULL, TrendStatus.BULL]:
-            reasons.append(f"✅ {result.trend_status.value}，顺势做多")
-        elif result.trend_status in [TrendStatus.BEAR, TrendStatus.STRONG_BEAR]:
-            risks.append(f"⚠️ {result.trend_status.value}，不宜做多")
+        score += self.TREND_SCORES.get(result.trend_status, 15)
         
         # === 乖离率评分（30分）===
         bias = result.bias_ma5
@@ -383,51 +660,29 @@ class StockTrendAnalyzer:
             # 价格在 MA5 下方（回调中）
             if bias > -3:
                 score += 30
-                reasons.append(f"✅ 价格略低于MA5({bias:.1f}%)，回踩买点")
             elif bias > -5:
                 score += 25
-                reasons.append(f"✅ 价格回踩MA5({bias:.1f}%)，观察支撑")
             else:
                 score += 10
-                risks.append(f"⚠️ 乖离率过大({bias:.1f}%)，可能破位")
         elif bias < 2:
             score += 28
-            reasons.append(f"✅ 价格贴近MA5({bias:.1f}%)，介入好时机")
         elif bias < self.BIAS_THRESHOLD:
             score += 20
-            reasons.append(f"⚡ 价格略高于MA5({bias:.1f}%)，可小仓介入")
         else:
             score += 5
-            risks.append(f"❌ 乖离率过高({bias:.1f}%>5%)，严禁追高！")
         
         # === 量能评分（20分）===
-        volume_scores = {
-            VolumeStatus.SHRINK_VOLUME_DOWN: 20,  # 缩量回调最佳
-            VolumeStatus.HEAVY_VOLUME_UP: 15,     # 放量上涨次之
-            VolumeStatus.NORMAL: 12,
-            VolumeStatus.SHRINK_VOLUME_UP: 8,     # 无量上涨较差
-            VolumeStatus.HEAVY_VOLUME_DOWN: 0,    # 放量下跌最差
-        }
-        vol_score = volume_scores.get(result.volume_status, 10)
-        score += vol_score
-        
-        if result.volume_status == VolumeStatus.SHRINK_VOLUME_DOWN:
-            reasons.append("✅ 缩量回调，主力洗盘")
-        elif result.volume_status == VolumeStatus.HEAVY_VOLUME_DOWN:
-            risks.append("⚠️ 放量下跌，注意风险")
+        score += self.VOLUME_SCORES.get(result.volume_status, 10)
         
         # === 支撑评分（10分）===
         if result.support_ma5:
             score += 5
-            reasons.append("✅ MA5支撑有效")
         if result.support_ma10:
             score += 5
-            reasons.append("✅ MA10支撑有效")
         
         # === 综合判断 ===
         result.signal_score = score
-        result.signal_reasons = reasons
-        result.risk_factors = risks
+        result.signal_reasons, result.risk_factors = self._describe_signal(result)
         
         # 生成买入信号
         if score >= 80 and result.trend_status in [TrendStatus.STRONG_BULL, TrendStatus.BULL]:
@@ -443,6 +698,48 @@ class StockTrendAnalyzer:
         else:
             result.buy_signal = BuySignal.SELL
     
+    def _describe_signal(self, result: TrendAnalysisResult) -> Tuple[List[str], List[str]]:
+        """
+        生成评分对应的买入理由与风险因素
+        
+        Returns:
+            (买入理由列表, 风险因素列表)
+        """
+        reasons = []
+        risks = []
+        
+        if result.trend_status in [TrendStatus.STRONG_BULL, TrendStatus.BULL]:
+            reasons.append(f"✅ {result.trend_status.value}，顺势做多")
+        elif result.trend_status in [TrendStatus.BEAR, TrendStatus.STRONG_BEAR]:
+            risks.append(f"⚠️ {result.trend_status.value}，不宜做多")
+        
+        bias = result.bias_ma5
+        if bias < 0:
+            if bias > -3:
+                reasons.append(f"✅ 价格略低于MA5({bias:.1f}%)，回踩买点")
+            elif bias > -5:
+                reasons.append(f"✅ 价格回踩MA5({bias:.1f}%)，观察支撑")
+            else:
+                risks.append(f"⚠️ 乖离率过大({bias:.1f}%)，可能破位")
+        elif bias < 2:
+            reasons.append(f"✅ 价格贴近MA5({bias:.1f}%)，介入好时机")
+        elif bias < self.BIAS_THRESHOLD:
+            reasons.append(f"⚡ 价格略高于MA5({bias:.1f}%)，可小仓介入")
+        else:
+            risks.append(f"❌ 乖离率过高({bias:.1f}%>5%)，严禁追高！")
+        
+        if result.volume_status == VolumeStatus.SHRINK_VOLUME_DOWN:
+            reasons.append("✅ 缩量回调，主力洗盘")
+        elif result.volume_status == VolumeStatus.HEAVY_VOLUME_DOWN:
+            risks.append("⚠️ 放量下跌，注意风险")
+        
+        if result.support_ma5:
+            reasons.append("✅ MA5支撑有效")
+        if result.support_ma10:
+            reasons.append("✅ MA10支撑有效")
+        
+        return reasons, risks
+    
     def format_analysis(self, result: TrendAnalysisResult) -> str:
         """
         格式化分析结果为文本
@@ -489,6 +786,15 @@ class StockTrendAnalyzer:
         return "\n".join(lines)
 
 
+# 枚举 ⇄ 整数编码（批量分析时用整数数组表示状态）
+_TREND_STATUSES = list(TrendStatus)
+_VOLUME_STATUSES = list(VolumeStatus)
+_SIGNAL_STATUSES = list(BuySignal)
+_TREND_INDEX = {status: i for i, status in enumerate(_TREND_STATUSES)}
+_VOLUME_INDEX = {status: i for i, status in enumerate(_VOLUME_STATUSES)}
+_SIGNAL_INDEX = {status: i for i, status in enumerate(_SIGNAL_STATUSES)}
+
+
 def analyze_stock(df: pd.DataFrame, code: str) -> TrendAnalysisResult:
     """
     便捷函数：分析单只股票
@@ -13,9 +13,10 @@ A股自选股智能分析系统 - 存储层
 
 import logging
 from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import (
     create_engine,
@@ -31,6 +32,7 @@ from sqlalchemy import (
     and_,
     desc,
 )
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import (
     declarative_base,
     sessionmaker,
@@ -38,7 +40,9 @@ from sqlalchemy.orm import (
 )
 from sqlalchemy.exc import IntegrityError
 
+from bar_store import ParquetBarStore, get_bar_store
 from config import get_config
+from indicators import get_indicator_registry
 
 logger = logging.getLogger(__name__)
 
@@ -184,12 +188,13 @@ class DatabaseManager:
             cls._instance._initialized = False
         return cls._instance
     
-    def __init__(self, db_url: Optional[str] = None):
+    def __init__(self, db_url: Optional[str] = None, bar_store: Optional["ParquetBarStore"] = None):
         """
         初始化数据库管理器
         
         Args:
             db_url: 数据库连接 URL（可选，默认从配置读取）
+            bar_store: 列式行情存储（可选，默认按 BAR_STORE_ENABLED 配置创建）
         """
         if self._initialized:
             return
@@ -197,6 +202,11 @@ class DatabaseManager:
         if db_url is None:
             config = get_config()
             db_url = config.get_db_url()
+            if bar_store is None:
+                bar_store = get_bar_store()
+        
+        # 列式行情存储（未启用或未安装 pyarrow 时为 None）
+        self._bar_store = bar_store
         
         # 创建数据库引擎
         self._engine = create_engine(
@@ -303,6 +313,50 @@ class DatabaseManager:
             
             return list(results)
     
+    def get_latest_data_df(
+        self,
+        code: str,
+        days: int = 30,
+        end_date: Optional[date] = None
+    ) -> pd.DataFrame:
+        """
+        获取最近 N 条日线数据（DataFrame 形式）
+        
+        用于增量获取（最新已存日期、复权校验的重叠区间、指标预热窗口）
+        和分析上下文（趋势分析所需的历史 K 线）。
+        启用列式存储时按日期区间内存映射读取，不足 N 条时回退到 SQLite。
+        
+        Args:
+            code: 股票代码
+            days: 获取条数
+            end_date: 截止日期（含，可选，默认不限）
+            
+        Returns:
+            按日期升序的 DataFrame（date 为 datetime64），无数据时为空 DataFrame
+        """
+        if self._bar_store is not None and self._bar_store.has_code(code):
+            # 交易日约占自然日的 2/3，多读一段以覆盖长假
+            end = end_date or date.today()
+            start = end - timedelta(days=days * 2 + 15)
+            df = self._bar_store.read_frame(code, start, end)
+            if len(df) >= days:
+                return df.iloc[-days:].reset_index(drop=True)
+        
+        conditions = [StockDaily.code == code]
+        if end_date is not None:
+            conditions.append(StockDaily.date <= end_date)
+        
+        columns = ['date'] + self.DAILY_VALUE_COLUMNS
+        with self.get_session() as session:
+            rows = session.execute(
+                select(*[getattr(StockDaily, col) for col in columns])
+                .where(and_(*conditions))
+                .order_by(desc(StockDaily.date))
+                .limit(days)
+            ).all()
+        
+        return self._rows_to_frame(rows[::-1], columns)
+    
     def get_data_range(
         self, 
         code: str, 
@@ -335,6 +389,97 @@ class DatabaseManager:
             
             return list(results)
     
+    def get_data_range_df(
+        self,
+        code: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> pd.DataFrame:
+        """
+        获取指定日期范围的数据（DataFrame 形式）
+        
+        启用列式存储时直接按年份分区内存映射读取，不再逐行构造 ORM 对象；
+        首次读取某只股票时会从 SQLite 回填其全部历史。
+        
+        Args:
+            code: 股票代码
+            start_date: 开始日期（可选）
+            end_date: 结束日期（可选）
+            
+        Returns:
+            按日期升序的 DataFrame（date 为 datetime64），无数据时为空 DataFrame
+        """
+        if self._bar_store is not None:
+            if not self._bar_store.has_code(code):
+                self._backfill_bar_store(code)
+            return self._bar_store.read_frame(code, start_date, end_date)
+        
+        return self._query_daily_frame(code, start_date, end_date)
+    
+    def _query_daily_frame(
+        self,
+        code: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> pd.DataFrame:
+        """按列查询 stock_daily（不构造 ORM 对象）"""
+        conditions = [StockDaily.code == code]
+        if start_date is not None:
+            conditions.append(StockDaily.date >= start_date)
+        if end_date is not None:
+            conditions.append(StockDaily.date <= end_date)
+        
+        columns = ['date'] + self.DAILY_VALUE_COLUMNS
+        with self.get_session() as session:
+            rows = session.execute(
+                select(*[getattr(StockDaily, col) for col in columns])
+                .where(and_(*conditions))
+                .order_by(StockDaily.date)
+            ).all()
+        
+        return self._rows_to_frame(rows, columns)
+    
+    def _rows_to_frame(self, rows: List[Any], columns: List[str]) -> pd.DataFrame:
+        """将列查询结果转换为 DataFrame（date 为 datetime64，数值列为 float64）"""
+        if not rows:
+            return pd.DataFrame()
+        
+        # 数值列一次性转换为单个 float64 块（None -> NaN），避免逐列 astype 的开销
+        table = np.array([tuple(row) for row in rows], dtype=object)
+        df = pd.DataFrame(table[:, 1:].astype(np.float64), columns=columns[1:])
+        df.insert(0, 'date', np.array(table[:, 0], dtype='datetime64[D]').astype('datetime64[ns]'))
+        return df
+    
+    def _backfill_bar_store(self, code: str) -> None:
+        """将某只股票在 SQLite 中的全部历史写入列式存储"""
+        history = self._query_daily_frame(code)
+        if not history.empty:
+            self._bar_store.write(code, history)
+            logger.debug(f"{code} 历史数据已回填至列式存储，共 {len(history)} 条")
+    
+    def _sync_bar_store(self, code: str, df: pd.DataFrame) -> None:
+        """
+        日线写入 SQLite 后同步到列式存储
+        
+        列式存储中尚无该股票时回填全部历史（已包含本次数据），否则只合并本次数据。
+        同步失败仅记录警告，不影响 SQLite 主存储。
+        """
+        if self._bar_store is None:
+            return
+        try:
+            if self._bar_store.has_code(code):
+                self._bar_store.write(code, df)
+            else:
+                self._backfill_bar_store(code)
+        except Exception as e:
+            logger.warning(f"同步 {code} 到列式存储失败: {e}")
+    
+    # save_daily_data 写入的行情/指标列（与 StockDaily 字段一一对应）
+    DAILY_VALUE_COLUMNS = [
+        'open', 'high', 'low', 'close', 'volume', 'amount', 'pct_chg',
+        'ma5', 'ma10', 'ma20', 'volume_ratio',
+    ]
+    
     def save_daily_data(
         self, 
         df: pd.DataFrame, 
@@ -346,7 +491,7 @@ class DatabaseManager:
         
         策略：
         - 使用 UPSERT 逻辑（存在则更新，不存在则插入）
-        - 跳过已存在的数据，避免重复
+        - SQLite 下走批量路径（单条 INSERT ... ON CONFLICT），其他数据库回退逐行写入
         
         Args:
             df: 包含日线数据的 DataFrame
@@ -354,13 +499,141 @@ class DatabaseManager:
             data_source: 数据来源名称
             
         Returns:
-            新增/更新的记录数
+            新增的记录数
+        """
+        inserted, _ = self.upsert_daily_data(df, code, data_source)
+        return inserted
+    
+    def upsert_daily_data(
+        self,
+        df: pd.DataFrame,
+        code: str,
+        data_source: str = "Unknown"
+    ) -> Tuple[int, int]:
+        """
+        批量 UPSERT 日线数据
+        
+        流程：
+        1. 一次性向量化转换日期与数值列（不再 iterrows）
+        2. 一次范围查询统计已存在的日期，得到真实的新增/更新条数
+        3. 一条 INSERT ... ON CONFLICT(code, date) DO UPDATE 通过 executemany 写入整个 DataFrame
+        
+        Args:
+            df: 包含日线数据的 DataFrame
+            code: 股票代码
+            data_source: 数据来源名称
+            
+        Returns:
+            Tuple[新增条数, 更新条数]
         """
         if df is None or df.empty:
             logger.warning(f"保存数据为空，跳过 {code}")
-            return 0
+            return 0, 0
+        
+        if self._engine.dialect.name != 'sqlite':
+            counts = self._save_daily_data_rowwise(df, code, data_source)
+            self._sync_bar_store(code, df)
+            return counts
+        
+        records = self._build_daily_records(df, code, data_source)
+        if not records:
+            logger.warning(f"保存数据无有效日期，跳过 {code}")
+            return 0, 0
+        
+        dates = [r['date'] for r in records]
+        
+        with self.get_session() as session:
+            try:
+                existing_dates = set(session.execute(
+                    select(StockDaily.date).where(
+                        and_(
+                            StockDaily.code == code,
+                            StockDaily.date >= min(dates),
+                            StockDaily.date <= max(dates)
+                        )
+                    )
+                ).scalars().all())
+                
+                stmt = sqlite_insert(StockDaily)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['code', 'date'],
+                    set_={
+                        **{col: stmt.excluded[col] for col in self.DAILY_VALUE_COLUMNS},
+                        'data_source': stmt.excluded.data_source,
+                        'updated_at': stmt.excluded.updated_at,
+                    },
+                )
+                session.execute(stmt, records)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"保存 {code} 数据失败: {e}")
+                raise
+        
+        updated_count = sum(1 for d in dates if d in existing_dates)
+        inserted_count = len(dates) - updated_count
+        logger.info(f"保存 {code} 数据成功，新增 {inserted_count} 条，更新 {updated_count} 条")
+        self._sync_bar_store(code, df)
+        return inserted_count, updated_count
+    
+    def _build_daily_records(
+        self,
+        df: pd.DataFrame,
+        code: str,
+        data_source: str
+    ) -> List[Dict[str, Any]]:
+        """
+        将 DataFrame 一次性转换为批量写入用的记录列表
+        
+        - 日期列整体转换为 date，无法解析的行丢弃
+        - 同一日期出现多次时保留最后一条（与逐行 UPSERT 的最终结果一致）
+        - NaN 转为 None，numpy 标量转为 Python 原生类型
+        """
+        frame = pd.DataFrame(index=df.index)
+        frame['date'] = pd.to_datetime(df['date'], errors='coerce')
+        for col in self.DAILY_VALUE_COLUMNS:
+            if col in df.columns:
+                frame[col] = pd.to_numeric(df[col], errors='coerce')
+            else:
+                frame[col] = None
+        
+        frame = frame.dropna(subset=['date'])
+        frame['date'] = frame['date'].dt.date
+        frame = frame.drop_duplicates(subset=['date'], keep='last')
+        
+        now = datetime.now()
+        columns = {'date': frame['date'].tolist()}
+        for col in self.DAILY_VALUE_COLUMNS:
+            values = frame[col].astype(object).where(frame[col].notna(), None)
+            columns[col] = values.tolist()
+        
+        return [
+            {
+                'code': code,
+                **{col: columns[col][i] for col in columns},
+                'data_source': data_source,
+                'created_at': now,
+                'updated_at': now,
+            }
+            for i in range(len(frame))
+        ]
+    
+    def _save_daily_data_rowwise(
+        self,
+        df: pd.DataFrame,
+        code: str,
+        data_source: str
+    ) -> Tuple[int, int]:
+        """
+        逐行 UPSERT（非 SQLite 数据库的兼容路径）
         
+        每行先 SELECT 再 INSERT/UPDATE，适用于不支持 ON CONFLICT 语法的方言
+        
+        Returns:
+            Tuple[新增条数, 更新条数]
+        """
         saved_count = 0
+        updated_count = 0
         
         with self.get_session() as session:
             try:
@@ -399,6 +672,7 @@ class DatabaseManager:
                         existing.volume_ratio = row.get('volume_ratio')
                         existing.data_source = data_source
                         existing.updated_at = datetime.now()
+                        updated_count += 1
                     else:
                         # 创建新记录
                         record = StockDaily(
@@ -421,14 +695,14 @@ class DatabaseManager:
                         saved_count += 1
                 
                 session.commit()
-                logger.info(f"保存 {code} 数据成功，新增 {saved_count} 条")
+                logger.info(f"保存 {code} 数据成功，新增 {saved_count} 条，更新 {updated_count} 条")
                 
             except Exception as e:
                 session.rollback()
                 logger.error(f"保存 {code} 数据失败: {e}")
                 raise
         
-        return saved_count
+        return saved_count, updated_count
     
     def save_analysis_record(self, result: "AnalysisResult") -> None:
         """
@@ -492,54 +766,81 @@ class DatabaseManager:
             ).scalars().all()
             return list(results)
     
+    # 分析上下文附带的历史 K 线条数（趋势分析至少需要 20 条，MA60 需要 60 条）
+    ANALYSIS_HISTORY_BARS = 60
+    
     def get_analysis_context(
         self, 
         code: str,
-        target_date: Optional[date] = None
+        target_date: Optional[date] = None,
+        history_bars: Optional[int] = None
     ) -> Optional[Dict[str, Any]]:
         """
         获取分析所需的上下文数据
         
-        返回今日数据 + 昨日数据的对比信息
+        返回今日数据 + 昨日数据的对比信息，以及最近 history_bars 条日线（raw_data）。
+        全部来自一次范围查询（启用列式存储时为内存映射读取），不构造 ORM 对象。
         
         Args:
             code: 股票代码
-            target_date: 目标日期（默认今天）
+            target_date: 目标日期（默认今天），只使用该日及之前的数据
+            history_bars: 附带的历史 K 线条数（默认 ANALYSIS_HISTORY_BARS）
             
         Returns:
-            包含今日数据、昨日对比等信息的字典
+            包含今日数据、昨日对比、raw_data（按日期升序的 DataFrame）等信息的字典
         """
         if target_date is None:
             target_date = date.today()
+        if history_bars is None:
+            history_bars = self.ANALYSIS_HISTORY_BARS
         
-        # 获取最近2天数据
-        recent_data = self.get_latest_data(code, days=2)
+        history = self.get_latest_data_df(code, days=max(2, history_bars), end_date=target_date)
         
-        if not recent_data:
+        if history.empty:
             logger.warning(f"未找到 {code} 的数据")
             return None
         
-        today_data = recent_data[0]
-        yesterday_data = recent_data[1] if len(recent_data) > 1 else None
+        # 入库时缺失的指标由注册表补齐（按代码+日期缓存，趋势分析复用同一份结果）
+        get_indicator_registry().fill_missing(history, code=code)
+        return self.build_analysis_context(code, history)
+    
+    def build_analysis_context(self, code: str, history: pd.DataFrame) -> Dict[str, Any]:
+        """
+        由日线构建分析上下文（不访问数据库）
+        
+        以 history 的最后一行为"今日"、倒数第二行为"昨日"，history 本身作为 raw_data。
+        回测按交易日传入预加载数据的切片即可得到与 get_analysis_context 相同结构的上下文。
+        
+        Args:
+            code: 股票代码
+            history: 按日期升序的日线（含 date 列与 DAILY_VALUE_COLUMNS），不能为空
+            
+        Returns:
+            与 get_analysis_context 结构相同的字典
+        """
+        recent = history.iloc[-2:][['date'] + self.DAILY_VALUE_COLUMNS].to_numpy()
+        today_data = self._bar_to_dict(code, recent[-1])
+        yesterday_data = self._bar_to_dict(code, recent[-2]) if len(recent) > 1 else None
         
         context = {
             'code': code,
-            'date': today_data.date.isoformat(),
-            'today': today_data.to_dict(),
+            'date': today_data['date'].isoformat(),
+            'today': today_data,
+            'raw_data': history,
         }
         
         if yesterday_data:
-            context['yesterday'] = yesterday_data.to_dict()
+            context['yesterday'] = yesterday_data
             
             # 计算相比昨日的变化
-            if yesterday_data.volume and yesterday_data.volume > 0:
+            if yesterday_data['volume'] and yesterday_data['volume'] > 0 and today_data['volume'] is not None:
                 context['volume_change_ratio'] = round(
-                    today_data.volume / yesterday_data.volume, 2
+                    today_data['volume'] / yesterday_data['volume'], 2
                 )
             
-            if yesterday_data.close and yesterday_data.close > 0:
+            if yesterday_data['close'] and yesterday_data['close'] > 0 and today_data['close'] is not None:
                 context['price_change_ratio'] = round(
-                    (today_data.close - yesterday_data.close) / yesterday_data.close * 100, 2
+                    (today_data['close'] - yesterday_data['close']) / yesterday_data['close'] * 100, 2
                 )
             
             # 均线形态判断
@@ -547,7 +848,18 @@ class DatabaseManager:
         
         return context
     
-    def _analyze_ma_status(self, data: StockDaily) -> str:
+    def _bar_to_dict(self, code: str, bar: np.ndarray) -> Dict[str, Any]:
+        """
+        将一条日线（date + DAILY_VALUE_COLUMNS 顺序的数组）转换为字典
+        
+        行情/指标字段与 StockDaily.to_dict() 一致，缺失值为 None
+        """
+        record: Dict[str, Any] = {'code': code, 'date': pd.Timestamp(bar[0]).date()}
+        for col, value in zip(self.DAILY_VALUE_COLUMNS, bar[1:].tolist()):
+            record[col] = None if pd.isna(value) else float(value)
+        return record
+    
+    def _analyze_ma_status(self, data: Dict[str, Any]) -> str:
         """
         分析均线形态
         
@@ -556,10 +868,10 @@ class DatabaseManager:
         - 空头排列：close < ma5 < ma10 < ma20
         - 震荡整理：其他情况
         """
-        close = data.close or 0
-        ma5 = data.ma5 or 0
-        ma10 = data.ma10 or 0
-        ma20 = data.ma20 or 0
+        close = data.get('close') or 0
+        ma5 = data.get('ma5') or 0
+        ma10 = data.get('ma10') or 0
+        ma20 = data.get('ma20') or 0
         
         if close > ma5 > ma10 > ma20 > 0:
             return "多头排列 📈"
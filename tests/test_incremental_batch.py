@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+批量增量获取测试
+
+验证本地最新日期不同的股票共用一次批量请求时：
+1. 每只股票只写入自己开始日期之后的数据
+2. 写入数据的 ma5/ma10/ma20/volume_ratio 与完整历史计算的结果一致
+
+运行方式：
+    pytest tests/test_incremental_batch.py -v
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicator_engine import IndicatorEngine
+
+base = pytest.importorskip("data_provider.base")
+
+INDICATOR_COLUMNS = ['ma5', 'ma10', 'ma20', 'volume_ratio']
+
+
+def make_series(code_seed: int, dates: pd.DatetimeIndex) -> pd.DataFrame:
+    rng = np.random.default_rng(code_seed)
+    close = 10 + np.cumsum(rng.normal(0, 0.2, len(dates)))
+    volume = rng.integers(1_000, 5_000, len(dates)).astype(float)
+    return pd.DataFrame({
+        'date': dates,
+        'open': close,
+        'high': close + 0.1,
+        'low': close - 0.1,
+        'close': np.round(close, 2),
+        'volume': volume,
+        'amount': volume * close,
+        'pct_chg': 0.0,
+    })
+
+
+class FakeManager(base.DataFetcherManager):
+    """批量请求直接返回合成的全量行情（从请求的开始日期起）"""
+
+    def __init__(self, series):
+        self.series = series
+        self.requests = []
+
+    def get_daily_data_batch(self, stock_codes, start_date=None, end_date=None, days=30):
+        self.requests.append((list(stock_codes), start_date))
+        return {
+            code: (self.series[code].loc[self.series[code]['date'] >= pd.Timestamp(start_date)].copy(), 'Fake')
+            for code in stock_codes
+        }
+
+
+def test_batch_trims_delta_to_each_code_start():
+    dates = pd.bdate_range(end=datetime.now().date(), periods=60)
+    series = {'600519': make_series(1, dates), '000001': make_series(2, dates)}
+    # 600519 本地数据停在 10 个交易日前，000001 停在 2 个交易日前
+    stored_until = {'600519': dates[-11], '000001': dates[-3]}
+    bars = base.DataFetcherManager.INCREMENTAL_HISTORY_BARS
+    histories = {
+        code: series[code].loc[series[code]['date'] <= stored_until[code]].tail(bars).reset_index(drop=True)
+        for code in series
+    }
+
+    manager = FakeManager(series)
+    results = manager.get_daily_data_incremental_batch(histories, days=30)
+
+    # 两只股票共用一次批量请求（最早的开始日期）
+    assert len(manager.requests) == 1
+    assert sorted(results) == sorted(series)
+
+    overlap = base.DataFetcherManager.DELTA_OVERLAP_BARS
+    for code, (merged, source_name) in results.items():
+        assert source_name == 'Fake'
+        expected_start = histories[code]['date'].iloc[-overlap]
+        assert merged['date'].min() == expected_start
+
+        # 与完整历史计算的指标一致（流式累加与逐窗口求和的舍入差异在 0.01 以内）
+        reference = IndicatorEngine().annotate(code, series[code])
+        reference = reference.loc[reference['date'] >= expected_start].reset_index(drop=True)
+        pd.testing.assert_frame_equal(
+            merged[INDICATOR_COLUMNS].reset_index(drop=True),
+            reference[INDICATOR_COLUMNS],
+            check_exact=False,
+            atol=0.011,
+        )
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+交易决策执行时机测试
+
+验证 asyncio / 分阶段流水线模式：
+1. 交易决策按完整结果执行（persist_result 收到分析上下文，execute_trade 未关闭）
+2. 流式输出的核心结论预览（partial=True）只用于推送，不会被保存或交易
+
+运行方式：
+    pytest tests/test_pipeline_trading.py -v
+"""
+
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from analysis.agents.decision import AnalysisResult
+from async_pipeline import AsyncStockPipeline
+from config import Config
+from staged_pipeline import StagedStockPipeline
+
+
+def make_result(code: str, advice: str, partial: bool = False) -> AnalysisResult:
+    return AnalysisResult(
+        code=code,
+        name=f"股票{code}",
+        sentiment_score=80 if advice == '买入' else 40,
+        trend_prediction='看多' if advice == '买入' else '震荡',
+        operation_advice=advice,
+        partial=partial,
+    )
+
+
+class FakeOrchestrator:
+    """决策时先回调一次与最终结论不同的预览结果（模拟流式请求中途重试）"""
+
+    def is_decisive(self, context) -> bool:
+        return False
+
+    def search_news(self, code: str, stock_name: str, use_cache: bool = True):
+        return "短新闻", ["search"]
+
+    def summarize_news(self, code: str, stock_name: str, raw_news: Optional[str], use_cache: bool = True):
+        return raw_news, []
+
+    def decide(self, context, stock_name, news_summary=None, on_core_ready=None, use_cache=True, route=None):
+        code = context['code']
+        if on_core_ready is not None:
+            on_core_ready(make_result(code, '买入', partial=True))
+        result = make_result(code, '持有')
+        result.route = ">".join((route or []) + ["decision"])
+        return result
+
+
+class FakePipeline:
+    """记录 StockAnalysisPipeline 各阶段方法的调用"""
+
+    def __init__(self):
+        self.config = Config(stage_report_interval=0)
+        self.orchestrator = FakeOrchestrator()
+        self.use_llm_cache = True
+        self.persisted: List[Dict[str, Any]] = []
+        self.previews: List[AnalysisResult] = []
+        self._lock = threading.Lock()
+
+    def fetch_and_save_stock_data(self, code: str):
+        return True, None
+
+    def prepare_analysis_context(self, code: str):
+        return {'code': code, 'realtime': {'price': 10.0}}, f"股票{code}"
+
+    def gather_news(self, code: str, context, stock_name: str):
+        raw_news, route = self.orchestrator.search_news(code, stock_name)
+        news_summary, summary_route = self.orchestrator.summarize_news(code, stock_name, raw_news)
+        return news_summary, route + summary_route
+
+    def make_core_handler(self, code: str, single_stock_notify: bool = False):
+        def on_core_ready(core: AnalysisResult) -> None:
+            with self._lock:
+                self.previews.append(core)
+        return on_core_ready
+
+    def persist_result(self, code, result, context=None, execute_trade=True) -> None:
+        with self._lock:
+            self.persisted.append({
+                'code': code, 'result': result, 'context': context, 'execute_trade': execute_trade,
+            })
+
+    def notify_single_stock(self, code, result, report_type=None) -> None:
+        pass
+
+
+CODES = ['600519', '000001', '300750']
+
+
+def assert_traded_on_final_results(pipeline: FakePipeline, results: List[AnalysisResult]) -> None:
+    assert sorted(r.code for r in results) == sorted(CODES)
+    assert sorted(p['code'] for p in pipeline.persisted) == sorted(CODES)
+    for record in pipeline.persisted:
+        assert record['execute_trade'] is True
+        assert record['context'] == {'code': record['code'], 'realtime': {'price': 10.0}}
+        assert record['result'].partial is False
+        assert record['result'].operation_advice == '持有'
+        # 搜索阶段经过的节点记录在结果上
+        assert record['result'].route == 'search>decision'
+    # 预览已推送，但没有进入保存/交易
+    assert len(pipeline.previews) == len(CODES)
+    assert all(p.partial for p in pipeline.previews)
+
+
+def test_async_pipeline_trades_on_final_result():
+    pipeline = FakePipeline()
+    results = asyncio.run(AsyncStockPipeline(pipeline).run(CODES, single_stock_notify=True))
+    assert_traded_on_final_results(pipeline, results)
+
+
+def test_staged_pipeline_trades_on_final_result():
+    pipeline = FakePipeline()
+    results = StagedStockPipeline(pipeline).run(CODES, single_stock_notify=True)
+    assert_traded_on_final_results(pipeline, results)
+
+
+class TestStockAnalysisPipelineTrading:
+    """StockAnalysisPipeline 的预览回调与交易入口（需要完整依赖环境）"""
+
+    @pytest.fixture
+    def pipeline(self):
+        main = pytest.importorskip("main")
+        instance = main.StockAnalysisPipeline.__new__(main.StockAnalysisPipeline)
+        instance.config = Config()
+        instance.db = None  # 访问数据库即失败
+        instance.notified = []
+        instance.notify_core_decision = lambda code, core: instance.notified.append(core)
+        return instance
+
+    def test_core_handler_only_notifies_previews(self, pipeline):
+        assert pipeline.make_core_handler('600519', single_stock_notify=False) is None
+
+        handler = pipeline.make_core_handler('600519', single_stock_notify=True)
+        handler(make_result('600519', '买入', partial=True))
+        handler(make_result('600519', '持有'))
+        assert [core.partial for core in pipeline.notified] == [True]
+
+    def test_partial_result_is_never_traded(self, pipeline):
+        # db 为 None，若进入交易流程会抛出异常
+        pipeline.execute_trade_decision(
+            '600519', make_result('600519', '买入', partial=True), {'realtime': {'price': 10.0}}
+        )
@@ -10,10 +10,15 @@ A股自选股智能分析系统 - 交易回测引擎
 3. 生成策略绩效报告。
 """
 
+import dataclasses
+import inspect
+import itertools
 import logging
+import tempfile
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path # 导入 Path
 
 import pandas as pd
@@ -22,16 +27,73 @@ from sqlalchemy.orm import Session
 
 from config import get_config, Config
 from storage import DatabaseManager
+from indicators import get_indicator_registry
+from stock_analyzer import StockTrendAnalyzer, BuySignal
 from trading.engine import TradingEngine
-from analysis.orchestrator import LLMOrchestrator
-from analysis.agents.decision import AnalysisResult # 导入AnalysisResult
+from trading.brokers.memory_broker import MemoryBroker
+from trading.strategy import strategy_registry
 
 logger = logging.getLogger(__name__)
 
+# 参数扫描中作用于 StockTrendAnalyzer 的参数名 → 类属性
+SWEEP_ANALYZER_PARAMS = {
+    'bias_threshold': 'BIAS_THRESHOLD',
+    'volume_shrink_ratio': 'VOLUME_SHRINK_RATIO',
+    'volume_heavy_ratio': 'VOLUME_HEAVY_RATIO',
+    'ma_support_tolerance': 'MA_SUPPORT_TOLERANCE',
+}
+
+class PointInTimeContext:
+    """
+    回测用的时点分析上下文构建器
+
+    预加载的日线转换一次后按行号切片：第 row 行的上下文只包含该股票第 row 行及之前的
+    history_bars 根 K 线（iloc[row - history_bars + 1 : row + 1]），结构与
+    DatabaseManager.get_analysis_context 相同，构建过程不访问数据库，也不会读到当日之后的数据。
+    """
+
+    def __init__(self, db: DatabaseManager, all_history_data: Dict[str, pd.DataFrame], history_bars: Optional[int] = None):
+        """
+        Args:
+            db: 数据库管理器（只使用其上下文格式化方法）
+            all_history_data: {股票代码: 以日期为索引、按日期升序的日线}（Backtester._load_historical_data 的返回值）
+            history_bars: 上下文附带的历史 K 线条数（默认 DatabaseManager.ANALYSIS_HISTORY_BARS）
+        """
+        self.db = db
+        self.history_bars = history_bars or DatabaseManager.ANALYSIS_HISTORY_BARS
+        self._frames: Dict[str, pd.DataFrame] = {}
+        for code, df in all_history_data.items():
+            frame = df.rename_axis('date').reset_index()
+            frame['date'] = pd.to_datetime(frame['date'])
+            self._frames[code] = frame
+
+    def build(self, code: str, row: int) -> Dict[str, Any]:
+        """
+        构建某股票第 row 行（即当前交易日）的分析上下文。
+
+        Args:
+            code: 股票代码
+            row: 当日 K 线在该股票日线中的行号（见 Backtester._trading_calendar）
+
+        Returns:
+            分析上下文字典，raw_data 为截至当日的切片
+        """
+        history = self._frames[code].iloc[max(0, row + 1 - self.history_bars):row + 1]
+        return self.db.build_analysis_context(code, history)
+
+
 class Backtester:
     """
     交易回测引擎
+
+    两种模式：
+    - signal：预加载全部行情为 NumPy 数组，由 StockTrendAnalyzer 一次算出每个交易日的买入信号，
+      交易引擎使用内存经纪商，不调用 LLM、不访问数据库，数百只股票、数年数据可在数秒内完成
+    - llm：逐日逐股调用 LLMOrchestrator 分析（搜索 + 摘要 + 决策），结果最接近实盘但很慢
     """
+
+    # 额外加载的开始日期之前的自然日数（MA60 等指标预热、首个交易日的分析上下文）
+    HISTORY_WARMUP_DAYS = 120
     
     def __init__(self, config: Optional[Config] = None):
         """
@@ -48,26 +110,31 @@ class Backtester:
 
     def _load_historical_data(self, stock_codes: List[str], start_date: date, end_date: date) -> Dict[str, pd.DataFrame]:
         """
-        加载历史数据，优先使用文件缓存。
+        加载历史数据。
+
+        列式存储（BAR_STORE_ENABLED）初始化成功时直接按区间读取 Parquet 分区，无需 pickle 缓存；
+        否则优先使用文件缓存，未命中时按列查询数据库并写入缓存。
+        ma5/ma10/ma20/volume_ratio 缺失的行由指标注册表补齐。
         """
         all_history_data: Dict[str, pd.DataFrame] = {}
+        use_file_cache = self.db._bar_store is None
         for code in stock_codes:
             cache_filename = f"{code}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.pkl"
             cache_path = self.cache_dir / cache_filename
 
-            if cache_path.exists():
+            if use_file_cache and cache_path.exists():
                 df = pd.read_pickle(cache_path)
                 logger.info(f"[{code}] 从缓存文件加载了 {len(df)} 条历史数据。")
             else:
-                stock_data = self.db.get_data_range(code, start_date, end_date)
-                if stock_data:
-                    df = pd.DataFrame([s.to_dict() for s in stock_data])
-                    df['date'] = pd.to_datetime(df['date']).dt.date
+                df = self.db.get_data_range_df(code, start_date, end_date)
+                if not df.empty:
+                    # 入库时缺失的指标由注册表补齐（与分析流程共享同一口径）
+                    get_indicator_registry().fill_missing(df, code=code)
+                    df['date'] = df['date'].dt.date
                     df = df.set_index('date')
-                    df.to_pickle(cache_path)
-                    logger.info(f"[{code}] 从数据库加载了 {len(df)} 条历史数据，并已缓存。")
-                else:
-                    df = pd.DataFrame()
+                    if use_file_cache:
+                        df.to_pickle(cache_path)
+                    logger.info(f"[{code}] 从数据库加载了 {len(df)} 条历史数据。")
             
             if not df.empty:
                 all_history_data[code] = df
@@ -78,7 +145,9 @@ class Backtester:
             stock_codes: List[str],
             start_date: date,
             end_date: date,
-            strategy_name: str = "FollowLLMStrategy"
+            strategy_name: str = "FollowLLMStrategy",
+            mode: Optional[str] = None,
+            persist_trades: Optional[bool] = None
             ) -> Dict[str, Any]:
         """
         运行回测。
@@ -88,76 +157,354 @@ class Backtester:
             start_date (date): 回测开始日期。
             end_date (date): 回测结束日期。
             strategy_name (str): 要使用的策略名称。
+            mode (Optional[str]): 回测模式 'signal' 或 'llm'，未提供时使用配置 backtest_mode。
+            persist_trades (Optional[bool]): 回测结束后是否把成交日志写入数据库，未提供时使用配置 backtest_persist_trades。
+
+        Returns:
+            Dict[str, Any]: 包含绩效报告的字典。
+        """
+        mode = (mode or self.config.backtest_mode).lower()
+        if persist_trades is None:
+            persist_trades = self.config.backtest_persist_trades
+        if mode == 'signal':
+            return self.run_signals(stock_codes, start_date, end_date, strategy_name, persist_trades=persist_trades)
+        if mode != 'llm':
+            raise ValueError(f"不支持的回测模式: '{mode}'，可选 'signal' 或 'llm'")
+        return self._run_llm(stock_codes, start_date, end_date, strategy_name, persist_trades)
+
+    def run_signals(self,
+                    stock_codes: List[str],
+                    start_date: date,
+                    end_date: date,
+                    strategy_name: str = "FollowLLMStrategy",
+                    analyzer: Optional[StockTrendAnalyzer] = None,
+                    persist_trades: bool = False
+                    ) -> Dict[str, Any]:
+        """
+        运行趋势信号回测（不调用 LLM）。
+
+        每个交易日传给策略的分析结果为：
+        {'operation_advice': 买入信号, 'buy_signal': 买入信号, 'signal_score': 综合评分}，
+        因此 FollowLLMStrategy、TrendSignalStrategy 等按 operation_advice / buy_signal 决策的策略均可直接使用。
+        信号只使用当日及之前的 K 线（见 StockTrendAnalyzer.signal_history）。
+
+        Args:
+            stock_codes (List[str]): 要回测的股票代码列表。
+            start_date (date): 回测开始日期。
+            end_date (date): 回测结束日期。
+            strategy_name (str): 要使用的策略名称。
+            analyzer (Optional[StockTrendAnalyzer]): 趋势分析器（可调整 BIAS_THRESHOLD 等参数）。
+            persist_trades (bool): 回测结束后是否把成交日志一次性写入数据库。
 
         Returns:
             Dict[str, Any]: 包含绩效报告的字典。
         """
+        session_id = f"backtest_{uuid.uuid4().hex[:8]}"
+        logger.info(f"开始趋势信号回测，会话ID: {session_id}，策略: {strategy_name}，时间范围: {start_date} 到 {end_date}")
+
+        warmup_start = start_date - timedelta(days=self.HISTORY_WARMUP_DAYS)
+        all_history_data = self._load_historical_data(stock_codes, warmup_start, end_date)
+        if not all_history_data:
+            logger.warning("未加载到任何历史数据，无法进行回测。")
+            return {}
+
+        dates, codes, close, high, volume = self._build_panel(all_history_data)
+        analyzer = analyzer or StockTrendAnalyzer()
+        signals, scores = analyzer.signal_history(close, high, volume)
+        daily_assets, broker = self._simulate_signals(
+            self.config, session_id, strategy_name, dates, codes, close, signals, scores, start_date
+        )
+
+        if persist_trades:
+            self._persist_trades(broker)
+
+        report = self.generate_report(session_id, start_date, end_date, daily_assets)
+        report["trade_count"] = len(broker.trades)
+        return report
+
+    @staticmethod
+    def _simulate_signals(config: Config,
+                          session_id: str,
+                          strategy_name: str,
+                          dates: np.ndarray,
+                          codes: List[str],
+                          close: np.ndarray,
+                          signals: np.ndarray,
+                          scores: np.ndarray,
+                          start_date: date,
+                          strategy_params: Optional[Dict[str, Any]] = None
+                          ) -> Tuple[List[float], MemoryBroker]:
+        """
+        按预先算好的信号逐交易日驱动交易引擎（不访问数据库，可在子进程中运行）。
+
+        Returns:
+            (每个交易日的总资产, 内存经纪商)
+        """
+        broker = MemoryBroker(initial_capital=config.trading_capital, session_id=session_id)
+        trading_engine = TradingEngine(
+            db_session=None,
+            config=config,
+            session_id=session_id,
+            strategy_name=strategy_name,
+            broker=broker,
+            strategy_params=strategy_params
+        )
+        advices = [status.value for status in BuySignal]
+        code_index = {code: j for j, code in enumerate(codes)}
+
+        daily_assets = []
+        for t in np.flatnonzero(dates >= start_date):
+            trade_time = datetime.combine(dates[t], datetime.min.time())
+            broker.current_time = trade_time
+            prices = close[t].tolist()
+
+            # 按当日收盘价更新持仓市价（停牌股票沿用最近价格）
+            for code in list(broker.positions):
+                price = prices[code_index[code]]
+                if not np.isnan(price):
+                    broker._update_position_current_price(code, price)
+
+            # 交易决策（只处理当日有 K 线且有信号的股票）
+            day_signals = signals[t].tolist()
+            day_scores = scores[t].tolist()
+            for j in np.flatnonzero(signals[t] >= 0).tolist():
+                advice = advices[day_signals[j]]
+                trading_engine.process_analysis(
+                    stock_code=codes[j],
+                    analysis_result={'operation_advice': advice, 'buy_signal': advice, 'signal_score': day_scores[j]},
+                    current_price=prices[j],
+                    trade_time=trade_time
+                )
+
+            daily_assets.append(broker.get_account_balance().total_assets)
+
+        return daily_assets, broker
+
+    def sweep(self,
+              stock_codes: List[str],
+              start_date: date,
+              end_date: date,
+              strategy_names: Optional[List[str]] = None,
+              param_grid: Optional[Dict[str, List[Any]]] = None,
+              max_workers: Optional[int] = None
+              ) -> pd.DataFrame:
+        """
+        参数扫描：在多个进程中对 策略 × 参数网格 的每个组合运行趋势信号回测，返回对比表。
+
+        行情只加载一次，写入临时目录下的 .npy 文件，各子进程以只读内存映射（mmap）方式共享，
+        不重复读库、不复制数组。同一组趋势分析参数的信号在每个子进程内只计算一次。
+
+        参数网格的键：
+        - bias_threshold / volume_shrink_ratio / volume_heavy_ratio / ma_support_tolerance：趋势分析参数
+        - Config 字段（如 trading_max_position_per_stock、trading_capital）：覆盖该次回测的配置
+        - 其他键作为策略构造参数（如 TrendSignalStrategy 的 min_buy_score），每个参与扫描的策略都必须接受该参数
+
+        Args:
+            stock_codes (List[str]): 要回测的股票代码列表。
+            start_date (date): 回测开始日期。
+            end_date (date): 回测结束日期。
+            strategy_names (Optional[List[str]]): strategy_registry 中的策略名，默认全部。
+            param_grid (Optional[Dict[str, List[Any]]]): 参数名 → 候选值列表。
+            max_workers (Optional[int]): 进程数，默认 CPU 核数；为 1 时在当前进程内顺序执行。
+
+        Returns:
+            pd.DataFrame: 每个组合一行（策略、参数、收益率、年化、最大回撤、夏普、成交笔数、期末资产），按夏普比率降序。
+
+        Raises:
+            ValueError: 策略不存在，或参数网格中有无法识别的键（拼写错误、策略不接受的参数）。
+        """
+        strategy_names = strategy_names or list(strategy_registry)
+        unknown = [name for name in strategy_names if name not in strategy_registry]
+        if unknown:
+            raise ValueError(f"未找到名为 {', '.join(unknown)} 的策略")
+        param_grid = param_grid or {}
+        keys = list(param_grid)
+        # 策略会静默忽略不认识的构造参数，不校验的话拼写错误会被当成一个扫描维度，得到重复的结果
+        config_fields = {f.name for f in dataclasses.fields(Config)}
+        strategy_keys = [key for key in keys if key not in SWEEP_ANALYZER_PARAMS and key not in config_fields]
+        for strategy_name in strategy_names:
+            invalid = [key for key in strategy_keys if key not in _strategy_params(strategy_registry[strategy_name])]
+            if invalid:
+                raise ValueError(
+                    f"参数 {', '.join(invalid)} 既不是趋势分析参数或 Config 字段，也不是策略 {strategy_name} 的构造参数"
+                )
+        tasks = [
+            (strategy_name, dict(zip(keys, values)))
+            for strategy_name in strategy_names
+            for values in itertools.product(*(param_grid[key] for key in keys))
+        ]
+        logger.info(f"开始参数扫描：{len(strategy_names)} 个策略，{len(tasks)} 个组合，时间范围: {start_date} 到 {end_date}")
+
+        warmup_start = start_date - timedelta(days=self.HISTORY_WARMUP_DAYS)
+        all_history_data = self._load_historical_data(stock_codes, warmup_start, end_date)
+        if not all_history_data:
+            logger.warning("未加载到任何历史数据，无法进行参数扫描。")
+            return pd.DataFrame()
+        dates, codes, close, high, volume = self._build_panel(all_history_data)
+        job = (self.config, start_date, end_date)
+
+        if max_workers == 1 or len(tasks) == 1:
+            _init_sweep_worker(None, dates, codes, {'close': close, 'high': high, 'volume': volume})
+            rows = [_run_sweep_task(job, task) for task in tasks]
+        else:
+            with tempfile.TemporaryDirectory(prefix="backtest_sweep_") as tmp_dir:
+                for name, array in (('close', close), ('high', high), ('volume', volume)):
+                    np.save(Path(tmp_dir) / f"{name}.npy", array)
+                with ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    initializer=_init_sweep_worker,
+                    initargs=(tmp_dir, dates, codes, None)
+                ) as executor:
+                    rows = list(executor.map(_run_sweep_task, itertools.repeat(job), tasks))
+
+        table = pd.DataFrame(rows)
+        if 'sharpe_ratio' in table.columns:
+            table = table.sort_values('sharpe_ratio', ascending=False, kind='stable').reset_index(drop=True)
+        return table
+
+    def _build_panel(self, all_history_data: Dict[str, pd.DataFrame]) -> Tuple[np.ndarray, List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """
+        把各股票的日线对齐为 交易日 × 股票 的数组。
+
+        Returns:
+            (交易日数组（升序，datetime.date）, 股票代码列表, close, high, volume)，
+            某股票在某交易日无 K 线时对应位置为 NaN
+        """
+        codes = list(all_history_data)
+        dates, row_index = self._trading_calendar(all_history_data)
+        close, high, volume = (np.full((len(dates), len(codes)), np.nan) for _ in range(3))
+        for j, code in enumerate(codes):
+            df = all_history_data[code]
+            days = np.flatnonzero(row_index[:, j] >= 0)
+            close[days, j] = df['close'].to_numpy(dtype=np.float64)
+            high[days, j] = df['high'].to_numpy(dtype=np.float64)
+            volume[days, j] = df['volume'].to_numpy(dtype=np.float64)
+        return dates, codes, close, high, volume
+
+    @staticmethod
+    def _trading_calendar(all_history_data: Dict[str, pd.DataFrame]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        以已加载数据中所有股票交易日的并集作为回测日历（自动跳过周末和节假日）。
+
+        Args:
+            all_history_data: {股票代码: 按日期升序、以日期为索引的日线}
+
+        Returns:
+            (交易日数组（升序，datetime.date）, 行号数组)。行号数组形状为 交易日 × 股票
+            （列顺序同 all_history_data），元素为该股票当日 K 线在其 DataFrame 中的行号，
+            当日无 K 线（停牌、未上市）为 -1
+        """
+        dates = np.array(sorted(set().union(*(df.index for df in all_history_data.values()))), dtype=object)
+        date_pos = {d: i for i, d in enumerate(dates)}
+        row_index = np.full((len(dates), len(all_history_data)), -1, dtype=np.int64)
+        for j, df in enumerate(all_history_data.values()):
+            days = np.fromiter((date_pos[d] for d in df.index), dtype=np.int64, count=len(df))
+            row_index[days, j] = np.arange(len(df))
+        return dates, row_index
+
+    def _run_llm(self,
+                 stock_codes: List[str],
+                 start_date: date,
+                 end_date: date,
+                 strategy_name: str,
+                 persist_trades: bool = False
+                 ) -> Dict[str, Any]:
+        """
+        运行 LLM 回测：逐日逐股调用 LLMOrchestrator 分析后交给交易引擎。
+        """
+        # 延迟导入：signal 模式不依赖 LLM 相关依赖
+        from analysis.orchestrator import LLMOrchestrator
+
         session_id = f"backtest_{uuid.uuid4().hex[:8]}"
         logger.info(f"开始回测，会话ID: {session_id}，策略: {strategy_name}，时间范围: {start_date} 到 {end_date}")
 
-        # 使用新方法加载数据
-        all_history_data = self._load_historical_data(stock_codes, start_date, end_date)
+        # 一次性加载（含预热区间），循环内的上下文全部由预加载数据切片得到
+        warmup_start = start_date - timedelta(days=self.HISTORY_WARMUP_DAYS)
+        all_history_data = self._load_historical_data(stock_codes, warmup_start, end_date)
 
         if not all_history_data:
             logger.warning("未加载到任何历史数据，无法进行回测。")
             return {}
 
+        # 交易日历与各股票的 日期→行号 映射预先算好，循环内只做数组访问
+        dates, row_index = self._trading_calendar(all_history_data)
+        contexts = PointInTimeContext(self.db, all_history_data)
+        codes = list(all_history_data)
+        code_index = {code: j for j, code in enumerate(codes)}
+        closes = [df['close'].to_numpy(dtype=np.float64) for df in all_history_data.values()]
+        names = [
+            df['name'].tolist() if 'name' in df.columns else None
+            for df in all_history_data.values()
+        ]
         daily_assets = []
-        current_date = start_date
 
-        with self.db.get_session() as session:
-            # 在循环外初始化一次 TradingEngine
-            trading_engine = TradingEngine(
-                db_session=session,
-                config=self.config,
-                session_id=session_id,
-                strategy_name=strategy_name
-            )
-            orchestrator = LLMOrchestrator(config=self.config)
-
-            while current_date <= end_date:
-                logger.debug(f"--- 回测日期: {current_date} ---")
-
-                # 更新所有持仓的市价
-                positions = trading_engine.broker.list_positions()
-                for pos in positions:
-                    if pos.stock_code in all_history_data and current_date in all_history_data[pos.stock_code].index:
-                        current_price = all_history_data[pos.stock_code].loc[current_date]['close']
-                        trading_engine.broker._update_position_current_price(pos.stock_code, current_price)
-
-                # 交易决策
-                for code in stock_codes:
-                    if code not in all_history_data or current_date not in all_history_data[code].index:
-                        continue
-
-                    context = self.db.get_analysis_context(code, target_date=current_date)
-                    if not context:
-                        continue
-
-                    current_price = all_history_data[code].loc[current_date]['close']
-                    stock_name = all_history_data[code].loc[current_date].get('name', f"股票{code}")
-
-                    # 运行分析 (在回测中，我们可能跳过新闻搜索以加速，仅依赖技术指标)
-                    analysis_result = orchestrator.analyze(context, stock_name)
-
-                    # 执行交易
-                    if analysis_result and analysis_result.success:
-                        trading_engine.process_analysis(
-                            stock_code=code,
-                            analysis_result=analysis_result,
-                            current_price=current_price,
-                            trade_time=datetime.combine(current_date, datetime.min.time())
-                        )
-
-                # 记录每日总资产
-                balance = trading_engine.broker.get_account_balance()
-                daily_assets.append(balance.total_assets)
-
-                current_date += timedelta(days=1)
+        # 内存经纪商：下单和查询不访问数据库，成交日志在回测结束后按需一次性落库
+        broker = MemoryBroker(initial_capital=self.config.trading_capital, session_id=session_id)
+        # 在循环外初始化一次 TradingEngine
+        trading_engine = TradingEngine(
+            db_session=None,
+            config=self.config,
+            session_id=session_id,
+            strategy_name=strategy_name,
+            broker=broker
+        )
+        orchestrator = LLMOrchestrator(config=self.config)
+
+        for t in np.flatnonzero(dates >= start_date):
+            current_date, rows = dates[t], row_index[t].tolist()
+            trade_time = datetime.combine(current_date, datetime.min.time())
+            broker.current_time = trade_time
+            logger.debug(f"--- 回测日期: {current_date} ---")
+
+            # 更新所有持仓的市价（停牌股票沿用最近价格）
+            positions = trading_engine.broker.list_positions()
+            for pos in positions:
+                j = code_index.get(pos.stock_code)
+                if j is not None and rows[j] >= 0:
+                    trading_engine.broker._update_position_current_price(pos.stock_code, closes[j][rows[j]])
+
+            # 交易决策（只处理当日有 K 线的股票）
+            for j, code in enumerate(codes):
+                row = rows[j]
+                if row < 0:
+                    continue
+
+                context = contexts.build(code, row)
+
+                current_price = float(closes[j][row])
+                stock_name = names[j][row] if names[j] else f"股票{code}"
+
+                # 运行分析 (在回测中，我们可能跳过新闻搜索以加速，仅依赖技术指标)
+                analysis_result = orchestrator.analyze(context, stock_name)
+
+                # 执行交易
+                if analysis_result and analysis_result.success:
+                    trading_engine.process_analysis(
+                        stock_code=code,
+                        analysis_result=analysis_result.to_dict(),
+                        current_price=current_price,
+                        trade_time=trade_time
+                    )
+
+            # 记录每日总资产（仅交易日）
+            balance = trading_engine.broker.get_account_balance()
+            daily_assets.append(balance.total_assets)
+
+        if persist_trades:
+            self._persist_trades(broker)
 
         # 生成报告
         report = self.generate_report(session_id, start_date, end_date, daily_assets)
+        report["trade_count"] = len(broker.trades)
         return report
+
+    def _persist_trades(self, broker: MemoryBroker) -> None:
+        """
+        把内存经纪商的成交日志一次性写入数据库。
+        """
+        with self.db.get_session() as session:
+            broker.flush_to_db(session)
+
     def generate_report(self, session_id: str, start_date: date, end_date: date, daily_assets: List[float]) -> Dict[str, Any]:
         """
         生成回测绩效报告。
@@ -167,6 +514,24 @@ class Backtester:
         if not daily_assets:
             return {"error": "没有每日资产数据，无法生成报告。"}
 
+        metrics = self._performance_metrics(start_date, end_date, daily_assets)
+        return {
+            "session_id": session_id,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "initial_capital": f"{metrics['initial_capital']:,.2f}",
+            "final_assets": f"{metrics['final_assets']:,.2f}",
+            "total_return_rate": f"{metrics['total_return_rate']:.2f}%",
+            "annualized_return": f"{metrics['annualized_return']:.2f}%",
+            "max_drawdown": f"{metrics['max_drawdown']:.2f}%",
+            "sharpe_ratio": f"{metrics['sharpe_ratio']:.2f}",
+        }
+
+    @staticmethod
+    def _performance_metrics(start_date: date, end_date: date, daily_assets: List[float]) -> Dict[str, float]:
+        """
+        计算绩效指标（数值形式，百分比指标以 % 为单位）。
+        """
         initial_capital = daily_assets[0]
         final_assets = daily_assets[-1]
         total_return_rate = ((final_assets - initial_capital) / initial_capital) * 100
@@ -189,13 +554,69 @@ class Backtester:
             sharpe_ratio = 0.0
 
         return {
-            "session_id": session_id,
-            "start_date": start_date.isoformat(),
-            "end_date": end_date.isoformat(),
-            "initial_capital": f"{initial_capital:,.2f}",
-            "final_assets": f"{final_assets:,.2f}",
-            "total_return_rate": f"{total_return_rate:.2f}%",
-            "annualized_return": f"{annualized_return:.2f}%",
-            "max_drawdown": f"{max_drawdown:.2f}%",
-            "sharpe_ratio": f"{sharpe_ratio:.2f}",
+            "initial_capital": float(initial_capital),
+            "final_assets": float(final_assets),
+            "total_return_rate": float(total_return_rate),
+            "annualized_return": float(annualized_return),
+            "max_drawdown": float(max_drawdown),
+            "sharpe_ratio": float(sharpe_ratio),
         }
+
+
+# === 参数扫描子进程 ===
+# 每个子进程持有一份只读行情（内存映射）和按趋势分析参数缓存的信号
+_sweep_data: Dict[str, Any] = {}
+_sweep_signals: Dict[Tuple, Tuple[np.ndarray, np.ndarray]] = {}
+
+
+def _init_sweep_worker(tmp_dir: Optional[str], dates: np.ndarray, codes: List[str], arrays: Optional[Dict[str, np.ndarray]]) -> None:
+    """子进程初始化：以只读方式映射行情数组（进程内执行时直接使用传入的数组）"""
+    if arrays is None:
+        arrays = {name: np.load(Path(tmp_dir) / f"{name}.npy", mmap_mode='r') for name in ('close', 'high', 'volume')}
+        # 子进程中逐笔成交的 INFO 日志只会拖慢扫描
+        logging.getLogger('trading').setLevel(logging.WARNING)
+    _sweep_data.clear()
+    _sweep_data.update(arrays, dates=dates, codes=codes)
+    _sweep_signals.clear()
+
+
+def _strategy_params(strategy_class: type) -> set:
+    """策略类（含父类）构造函数显式声明的参数名（不含 config 和 **kwargs）"""
+    names = set()
+    for cls in strategy_class.__mro__:
+        if '__init__' not in cls.__dict__ or cls is object:
+            continue
+        for name, param in inspect.signature(cls.__dict__['__init__']).parameters.items():
+            if name not in ('self', 'config') and param.kind not in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                names.add(name)
+    return names
+
+
+def _run_sweep_task(job: Tuple[Config, date, date], task: Tuple[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """运行一个 策略 × 参数 组合，返回对比表中的一行"""
+    config, start_date, end_date = job
+    strategy_name, params = task
+    config_fields = {f.name for f in dataclasses.fields(Config)}
+    analyzer_params = {k: v for k, v in params.items() if k in SWEEP_ANALYZER_PARAMS}
+    config_params = {k: v for k, v in params.items() if k in config_fields}
+    strategy_params = {k: v for k, v in params.items() if k not in analyzer_params and k not in config_params}
+
+    signal_key = tuple(sorted(analyzer_params.items()))
+    if signal_key not in _sweep_signals:
+        analyzer = StockTrendAnalyzer()
+        for key, value in analyzer_params.items():
+            setattr(analyzer, SWEEP_ANALYZER_PARAMS[key], value)
+        _sweep_signals[signal_key] = analyzer.signal_history(_sweep_data['close'], _sweep_data['high'], _sweep_data['volume'])
+    signals, scores = _sweep_signals[signal_key]
+
+    session_id = f"sweep_{uuid.uuid4().hex[:8]}"
+    daily_assets, broker = Backtester._simulate_signals(
+        dataclasses.replace(config, **config_params) if config_params else config,
+        session_id, strategy_name, _sweep_data['dates'], _sweep_data['codes'], _sweep_data['close'],
+        signals, scores, start_date, strategy_params=strategy_params
+    )
+    row: Dict[str, Any] = {'strategy': strategy_name, **params}
+    if daily_assets:
+        row.update(Backtester._performance_metrics(start_date, end_date, daily_assets))
+    row['trade_count'] = len(broker.trades)
+    return row
@@ -0,0 +1,301 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from config import get_config
+from trading.brokers.base import AbstractBroker
+from trading.models import Order, Position, Trade, AccountBalance, PaperAccount
+
+logger = logging.getLogger(__name__)
+
+class TradeJournal:
+    """
+    列式成交日志
+
+    每笔成交追加到预分配的 NumPy 数组（容量不足时翻倍），不创建 ORM 对象；
+    需要时再按行号还原为 Order / Trade，或整体导出为 DataFrame、批量写入数据库。
+    订单与成交一一对应（立即全部成交），订单ID与成交ID均为 "{session_id}-{行号}"。
+    """
+
+    def __init__(self, session_id: str, capacity: int = 1024):
+        self.session_id = session_id
+        self._size = 0
+        self._codes = np.empty(capacity, dtype=object)
+        self._buys = np.empty(capacity, dtype=bool)
+        self._quantities = np.empty(capacity, dtype=np.int64)
+        self._prices = np.empty(capacity, dtype=np.float64)
+        self._times = np.empty(capacity, dtype='datetime64[us]')
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, stock_code: str, direction: str, quantity: int, price: float, trade_time: datetime) -> int:
+        """追加一笔成交，返回行号"""
+        i = self._size
+        if i == len(self._prices):
+            self._grow()
+        self._codes[i] = stock_code
+        self._buys[i] = direction == 'BUY'
+        self._quantities[i] = quantity
+        self._prices[i] = price
+        self._times[i] = trade_time
+        self._size = i + 1
+        return i
+
+    def _grow(self) -> None:
+        capacity = len(self._prices) * 2
+        for name in ('_codes', '_buys', '_quantities', '_prices', '_times'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def order_id(self, index: int) -> str:
+        return f"{self.session_id}-{index}"
+
+    def index_of(self, order_id: str) -> Optional[int]:
+        """由订单ID解析行号，不属于本日志的订单返回 None"""
+        prefix, _, index = order_id.rpartition('-')
+        if prefix != self.session_id or not index.isdigit() or int(index) >= self._size:
+            return None
+        return int(index)
+
+    def to_frame(self) -> pd.DataFrame:
+        """导出全部成交为 DataFrame（每行一笔，列与 Trade 模型同名）"""
+        n = self._size
+        quantities, prices = self._quantities[:n], self._prices[:n]
+        return pd.DataFrame({
+            'order_id': [self.order_id(i) for i in range(n)],
+            'stock_code': self._codes[:n],
+            'direction': np.where(self._buys[:n], 'BUY', 'SELL'),
+            'quantity': quantities,
+            'price': prices,
+            'amount': quantities * prices,
+            'trade_time': self._times[:n],
+        })
+
+    def order_rows(self) -> List[Dict[str, Any]]:
+        """trading_orders 表的批量插入参数"""
+        return [self._order_values(i) for i in range(self._size)]
+
+    def trade_rows(self) -> List[Dict[str, Any]]:
+        """trading_trades 表的批量插入参数"""
+        return [self._trade_values(i) for i in range(self._size)]
+
+    def get_order(self, index: int) -> Order:
+        return Order(**self._order_values(index))
+
+    def get_trade(self, index: int) -> Trade:
+        return Trade(**self._trade_values(index))
+
+    def _order_values(self, index: int) -> Dict[str, Any]:
+        trade_time = self._times[index].item()
+        return {
+            'order_id': self.order_id(index),
+            'stock_code': self._codes[index],
+            'order_type': 'MARKET',
+            'direction': 'BUY' if self._buys[index] else 'SELL',
+            'quantity': int(self._quantities[index]),
+            'price': float(self._prices[index]),
+            'status': 'FILLED',
+            'created_at': trade_time,
+            'updated_at': trade_time,
+        }
+
+    def _trade_values(self, index: int) -> Dict[str, Any]:
+        amount = float(self._quantities[index] * self._prices[index])
+        return {
+            'order_id': self.order_id(index),
+            'trade_id': self.order_id(index),
+            'stock_code': self._codes[index],
+            'direction': 'BUY' if self._buys[index] else 'SELL',
+            'quantity': int(self._quantities[index]),
+            'price': float(self._prices[index]),
+            'amount': amount,
+            'commission': 0.0,
+            'stamp_duty': 0.0,
+            'other_fees': 0.0,
+            'net_amount': amount,
+            'trade_time': self._times[index].item(),
+        }
+
+
+class MemoryBroker(AbstractBroker):
+    """
+    内存模拟经纪商 (In-Memory Broker)
+
+    继承自 AbstractBroker，资金和持仓保存在内存字典中，成交记入列式日志，下单和查询都不访问数据库。
+    成交规则与 PaperBroker 一致（按指定价格立即全部成交），用于回测。
+    回测结束后可调用 flush_to_db 把成交日志一次性批量写入数据库。
+    """
+
+    def __init__(self, initial_capital: Optional[float] = None, session_id: str = "memory_session"):
+        """
+        初始化 MemoryBroker。
+
+        Args:
+            initial_capital (Optional[float]): 初始资金，未提供时使用配置 trading_capital。
+            session_id (str): 会话ID，用作订单ID前缀和落库时的模拟账户ID。
+        """
+        self.session_id = session_id
+        self.initial_capital = float(initial_capital if initial_capital is not None else get_config().trading_capital)
+        self.available_cash = self.initial_capital
+        self.frozen_cash = 0.0
+        self.positions: Dict[str, Position] = {}
+        self.trades = TradeJournal(session_id)
+        # 各持仓市值（普通 float，避免每次汇总都读取 ORM 属性）
+        self._market_values: Dict[str, float] = {}
+        # 模拟时钟：回测时由调用方设置为当前交易日，成交时间取该值
+        self.current_time: Optional[datetime] = None
+
+    def get_account_balance(self) -> AccountBalance:
+        """
+        获取当前账户的资金余额信息（持仓市值按 Position.current_price 计算）。
+        """
+        market_value = sum(self._market_values.values())
+        return AccountBalance(
+            total_assets=self.available_cash + self.frozen_cash + market_value,
+            available_cash=self.available_cash,
+            market_value=market_value,
+            frozen_cash=self.frozen_cash,
+            currency="CNY"
+        )
+
+    def list_positions(self) -> List[Position]:
+        """
+        获取当前所有持仓列表。
+        """
+        return list(self.positions.values())
+
+    def get_position(self, stock_code: str) -> Optional[Position]:
+        """
+        获取指定股票的持仓信息。
+        """
+        return self.positions.get(stock_code)
+
+    def place_order(self, stock_code: str, direction: str, quantity: int, order_type: str, price: Optional[float] = None) -> Order:
+        """
+        提交模拟交易订单，按指定价格立即成交。
+        """
+        if price is None:
+            logger.warning(f"市价单 {stock_code} 无指定价格，无法模拟成交。")
+            raise ValueError(f"Market order {stock_code} requires an execution price for simulation.")
+
+        amount = price * quantity
+        position = self.positions.get(stock_code)
+        if direction == 'BUY':
+            if self.available_cash < amount:
+                logger.warning(f"模拟买入失败: 资金不足。可用资金: {self.available_cash}, 需要: {amount}")
+                raise ValueError("Insufficient cash for BUY order.")
+        elif direction == 'SELL':
+            if not position or position.quantity < quantity:
+                logger.warning(f"模拟卖出失败: 持仓不足。持有: {position.quantity if position else 0}, 卖出: {quantity}")
+                raise ValueError("Insufficient position for SELL order.")
+        else:
+            raise ValueError("Invalid direction. Must be 'BUY' or 'SELL'.")
+
+        trade_time = self.current_time or datetime.now()
+        index = self.trades.append(stock_code, direction, quantity, price, trade_time)
+
+        if direction == 'BUY':
+            self.available_cash -= amount
+            if position:
+                total_quantity = position.quantity + quantity
+                position.cost_price = (position.quantity * position.cost_price + amount) / total_quantity
+                position.quantity = total_quantity
+            else:
+                position = Position(stock_code=stock_code, quantity=quantity, cost_price=price, created_at=trade_time)
+                self.positions[stock_code] = position
+            position.current_price = price
+            position.market_value = position.quantity * price
+            position.updated_at = trade_time
+            self._market_values[stock_code] = position.market_value
+        else:
+            self.available_cash += amount
+            position.quantity -= quantity
+            if position.quantity == 0:
+                del self.positions[stock_code]
+                del self._market_values[stock_code]
+            else:
+                position.market_value = position.quantity * position.current_price
+                position.updated_at = trade_time
+                self._market_values[stock_code] = position.market_value
+
+        logger.debug(f"模拟交易成功: {direction} {quantity} {stock_code} @ {price}")
+        return self.trades.get_order(index)
+
+    def get_order(self, order_id: str) -> Optional[Order]:
+        """
+        查询指定订单。
+        """
+        index = self.trades.index_of(order_id)
+        return self.trades.get_order(index) if index is not None else None
+
+    def cancel_order(self, order_id: str) -> bool:
+        """
+        订单均立即成交，无法取消。
+        """
+        if self.trades.index_of(order_id) is not None:
+            logger.warning(f"模拟订单 {order_id} 已成交，无法取消。")
+        else:
+            logger.warning(f"模拟订单 {order_id} 不存在。")
+        return False
+
+    def get_trades_by_order(self, order_id: str) -> List[Trade]:
+        """
+        获取指定订单的所有成交记录。
+        """
+        index = self.trades.index_of(order_id)
+        return [self.trades.get_trade(index)] if index is not None else []
+
+    def connect(self, **kwargs) -> bool:
+        return True
+
+    def disconnect(self) -> bool:
+        return True
+
+    def flush_to_db(self, session: Session) -> int:
+        """
+        把全部订单、成交和期末账户在一个事务内批量写入数据库。
+
+        Args:
+            session (Session): SQLAlchemy 数据库会话。
+
+        Returns:
+            int: 写入的成交笔数。
+        """
+        balance = self.get_account_balance()
+        try:
+            if len(self.trades):
+                session.execute(insert(Order), self.trades.order_rows())
+                session.execute(insert(Trade), self.trades.trade_rows())
+            session.add(PaperAccount(
+                session_id=self.session_id,
+                initial_capital=self.initial_capital,
+                available_cash=balance.available_cash,
+                frozen_cash=balance.frozen_cash,
+                total_assets=balance.total_assets,
+            ))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        logger.info(f"会话 {self.session_id} 的 {len(self.trades)} 笔成交已写入数据库")
+        return len(self.trades)
+
+    def _update_position_current_price(self, stock_code: str, current_price: float) -> bool:
+        """
+        更新指定股票的持仓最新价和市值（回测中每日按收盘价调用）。
+        """
+        position = self.positions.get(stock_code)
+        if position:
+            position.current_price = current_price
+            position.market_value = position.quantity * current_price
+            self._market_values[stock_code] = position.market_value
+            return True
+        return False
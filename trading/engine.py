@@ -22,19 +22,23 @@ class TradingEngine:
     """
 
     def __init__(self, 
-                 db_session: Session, 
+                 db_session: Optional[Session], 
                  config: Optional[Config] = None,
                  session_id: str = "default_paper_session",
-                 strategy_name: str = "FollowLLMStrategy"
+                 strategy_name: str = "FollowLLMStrategy",
+                 broker: Optional[AbstractBroker] = None,
+                 strategy_params: Optional[Dict[str, Any]] = None
                  ):
         """
         初始化交易引擎。
 
         Args:
-            db_session (Session): SQLAlchemy 数据库会话。
+            db_session (Optional[Session]): SQLAlchemy 数据库会话；使用不访问数据库的 broker 时可为 None。
             config (Optional[Config]): 配置实例，如果未提供则从全局获取。
             session_id (str): 模拟或回测会话ID，用于隔离数据。
             strategy_name (str): 要使用的策略名称。
+            broker (Optional[AbstractBroker]): 指定经纪商实例（如回测用的 MemoryBroker），未提供时按配置初始化。
+            strategy_params (Optional[Dict[str, Any]]): 传给策略构造函数的额外参数（如 min_buy_score）。
         """
         self.db_session = db_session
         self.config = config if config else get_config()
@@ -43,9 +47,9 @@ class TradingEngine:
         strategy_class = strategy_registry.get(strategy_name)
         if not strategy_class:
             raise ValueError(f"未找到名为 '{strategy_name}' 的策略")
-        self.strategy: BaseStrategy = strategy_class(config=self.config)
+        self.strategy: BaseStrategy = strategy_class(config=self.config, **(strategy_params or {}))
         
-        self.broker: AbstractBroker = self._initialize_broker()
+        self.broker: AbstractBroker = broker if broker is not None else self._initialize_broker()
         logger.info(f"交易引擎初始化完成，策略: {self.strategy.name}, 模式: {self.config.trading_mode}，经纪商: {self.config.trading_broker}，会话ID: {self.session_id}")
 
     def _initialize_broker(self) -> AbstractBroker:
@@ -174,10 +178,12 @@ class TradingEngine:
             
             # TODO: 实盘模式下，这里的 commit 可能需要更精细的控制，
             # 例如在收到订单成交回报后再更新数据库，而不是在提交订单后立即提交。
-            self.db_session.commit()
+            if self.db_session is not None:
+                self.db_session.commit()
 
         except Exception as e:
-            self.db_session.rollback()
+            if self.db_session is not None:
+                self.db_session.rollback()
             logger.error(f"处理 {stock_code} 交易决策时发生错误: {e}")
 
         return order_id
@@ -48,8 +48,11 @@ class BaseStrategy(ABC):
 class FollowLLMStrategy(BaseStrategy):
     """跟随 LLM 分析结果的策略"""
 
+    def _recommendation(self, analysis_result: Dict[str, Any]) -> Optional[str]:
+        return analysis_result.get('operation_advice')
+
     def should_buy(self, stock_code: str, analysis_result: Dict[str, Any], current_positions: List[Position], account_balance: AccountBalance, current_price: float) -> bool:
-        recommendation = analysis_result.get('operation_advice')
+        recommendation = self._recommendation(analysis_result)
         if recommendation not in ['买入', '加仓', '强烈买入']:
             return False
 
@@ -72,7 +75,7 @@ class FollowLLMStrategy(BaseStrategy):
         return True
 
     def should_sell(self, stock_code: str, analysis_result: Dict[str, Any], current_positions: List[Position], account_balance: AccountBalance, current_price: float) -> bool:
-        recommendation = analysis_result.get('operation_advice')
+        recommendation = self._recommendation(analysis_result)
         if recommendation not in ['卖出', '减仓', '强烈卖出']:
             return False
 
@@ -85,6 +88,20 @@ class FollowLLMStrategy(BaseStrategy):
         return True
 
 
+class TrendSignalStrategy(FollowLLMStrategy):
+    """跟随 StockTrendAnalyzer 买入信号的策略（不依赖 LLM，用于离线回测）"""
+
+    def __init__(self, config: Optional[Config] = None, min_buy_score: int = 0, **kwargs):
+        super().__init__(config=config, **kwargs)
+        self.min_buy_score = min_buy_score  # 买入信号的最低综合评分
+
+    def _recommendation(self, analysis_result: Dict[str, Any]) -> Optional[str]:
+        signal = analysis_result.get('buy_signal')
+        if signal in ['买入', '强烈买入'] and analysis_result.get('signal_score', 0) < self.min_buy_score:
+            return '观望'
+        return signal
+
+
 class BuyAndHoldStrategy(BaseStrategy):
     """买入并持有策略"""
 
@@ -109,6 +126,7 @@ class BuyAndHoldStrategy(BaseStrategy):
 # 策略注册表
 strategy_registry: Dict[str, Type[BaseStrategy]] = {
     "FollowLLMStrategy": FollowLLMStrategy,
+    "TrendSignalStrategy": TrendSignalStrategy,
     "BuyAndHoldStrategy": BuyAndHoldStrategy,
 }
 
@@ -89,6 +89,7 @@ class BacktestRequest(BaseModel):
     start_date: str
     end_date: str
     strategy_name: str
+    mode: Optional[str] = None  # signal (趋势信号，默认) / llm
 
 
 @router.post("/backtest")
@@ -103,5 +104,6 @@ def run_backtest(backtest_request: BacktestRequest):
         start_date=datetime.strptime(backtest_request.start_date, "%Y-%m-%d").date(),
         end_date=datetime.strptime(backtest_request.end_date, "%Y-%m-%d").date(),
         strategy_name=backtest_request.strategy_name,
+        mode=backtest_request.mode,
     )
     return report
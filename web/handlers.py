@@ -151,7 +151,7 @@ class ApiHandler:
     
     def handle_analysis(self, query: Dict[str, list]) -> Response:
         """
-        触发股票分析 GET /analysis?code=xxx
+        触发股票分析 GET /analysis?code=xxx[&report_type=simple|full][&no_cache=true]
         
         Args:
             query: URL 查询参数
@@ -187,9 +187,14 @@ class ApiHandler:
         report_type_str = query.get("report_type", ["simple"])[0]
         report_type = ReportType.from_str(report_type_str)
         
+        # 是否跳过 LLM 响应缓存重新生成（默认使用缓存）
+        bypass_llm_cache = query.get("no_cache", ["false"])[0].lower() in ("1", "true", "yes")
+        
         # 提交异步分析任务
         try:
-            result = self.analysis_service.submit_analysis(code, report_type=report_type)
+            result = self.analysis_service.submit_analysis(
+                code, report_type=report_type, bypass_llm_cache=bypass_llm_cache
+            )
             return JsonResponse(result)
         except Exception as e:
             logger.error(f"[ApiHandler] 提交分析任务失败: {e}")
@@ -171,7 +171,8 @@ class AnalysisService:
     def submit_analysis(
         self, 
         code: str, 
-        report_type: Union[ReportType, str] = ReportType.SIMPLE
+        report_type: Union[ReportType, str] = ReportType.SIMPLE,
+        bypass_llm_cache: bool = False
     ) -> Dict[str, Any]:
         """
         提交异步分析任务
@@ -179,6 +180,7 @@ class AnalysisService:
         Args:
             code: 股票代码
             report_type: 报告类型枚举
+            bypass_llm_cache: 是否跳过 LLM 响应缓存重新生成分析
             
         Returns:
             任务信息字典
@@ -190,7 +192,7 @@ class AnalysisService:
         task_id = f"{code}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
         
         # 提交到线程池
-        self.executor.submit(self._run_analysis, code, task_id, report_type)
+        self.executor.submit(self._run_analysis, code, task_id, report_type, bypass_llm_cache)
         
         logger.info(f"[AnalysisService] 已提交股票 {code} 的分析任务, task_id={task_id}, report_type={report_type.value}")
         
@@ -219,7 +221,8 @@ class AnalysisService:
         self, 
         code: str, 
         task_id: str, 
-        report_type: ReportType = ReportType.SIMPLE
+        report_type: ReportType = ReportType.SIMPLE,
+        bypass_llm_cache: bool = False
     ) -> Dict[str, Any]:
         """
         执行单只股票分析
@@ -230,6 +233,7 @@ class AnalysisService:
             code: 股票代码
             task_id: 任务ID
             report_type: 报告类型枚举
+            bypass_llm_cache: 是否跳过 LLM 响应缓存重新生成分析
         """
         # 初始化任务状态
         with self._tasks_lock:
@@ -252,7 +256,7 @@ class AnalysisService:
             
             # 创建分析管道
             config = get_config()
-            pipeline = StockAnalysisPipeline(config=config, max_workers=1)
+            pipeline = StockAnalysisPipeline(config=config, max_workers=1, bypass_llm_cache=bypass_llm_cache)
             
             # 执行单只股票分析（启用单股推送）
             result = pipeline.process_single_stock(
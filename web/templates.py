@@ -251,6 +251,16 @@ button:active {
     box-shadow: 0 0 0 3px rgba(37, 99, 235, 0.1);
 }
 
+.refresh-option {
+    display: flex;
+    align-items: center;
+    gap: 0.25rem;
+    font-size: 0.8rem;
+    color: var(--text-light);
+    white-space: nowrap;
+    cursor: pointer;
+}
+
 .btn-analysis {
     background-color: var(--success);
 }
@@ -860,7 +870,9 @@ def render_config_page(
         submitBtn.textContent = '提交中...';
         
         const reportType = reportTypeSelect.value;
-        fetch('/analysis?code=' + encodeURIComponent(code) + '&report_type=' + encodeURIComponent(reportType))
+        const noLlmCache = document.getElementById('no_llm_cache').checked;
+        fetch('/analysis?code=' + encodeURIComponent(code) + '&report_type=' + encodeURIComponent(reportType) +
+              (noLlmCache ? '&no_cache=true' : ''))
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
@@ -930,6 +942,9 @@ def render_config_page(
             <option value="simple">📝 精简报告</option>
             <option value="full">📊 完整报告</option>
           </select>
+          <label class="refresh-option" title="不使用 LLM 响应缓存，重新生成分析">
+            <input type="checkbox" id="no_llm_cache" /> 重新生成
+          </label>
           <button type="button" id="analysis_btn" class="btn-analysis" onclick="submitAnalysis()" disabled>
             🚀 分析
           </button>